@@ -0,0 +1,158 @@
+"""
+Accept-Encoding'e göre br / gzip sıkıştırma middleware'i.
+
+Eşik altındaki cevaplar, SSE (text/event-stream) ve zaten Content-Encoding
+taşıyan cevaplar olduğu gibi geçer. Brotli yalnızca `brotli` paketi kuruluysa
+önerilir (pip install 'alarmfw-api[fast]'); yoksa gzip'e düşülür.
+"""
+from __future__ import annotations
+
+import zlib
+from typing import Callable, Dict, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from async_utils import run_blocking
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - opsiyonel bağımlılık
+    brotli = None
+
+_EXCLUDED_TYPES = ("text/event-stream", "application/gzip", "application/zip", "image/")
+# Bundan büyük parçalar loop'u bloke etmesin diye executor'da sıkıştırılır
+_THREAD_MIN_BYTES = 256 * 1024
+
+
+def _parse_accept_encoding(header: str) -> Dict[str, float]:
+    out: Dict[str, float] = {}
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        out[name] = q
+    return out
+
+
+def negotiate(header: str, available: Tuple[str, ...]) -> Optional[str]:
+    """İstemcinin kabul ettiği (q > 0) en yüksek öncelikli kodlama; eşitlikte sunucu sırası."""
+    accepted = _parse_accept_encoding(header)
+    best: Optional[str] = None
+    best_q = 0.0
+    for enc in available:
+        q = accepted.get(enc, accepted.get("*", 0.0))
+        if q > best_q:
+            best, best_q = enc, q
+    return best
+
+
+class _Compressor:
+    def __init__(self, encoding: str, level: Optional[int]) -> None:
+        self.encoding = encoding
+        if encoding == "br":
+            self._br = brotli.Compressor(quality=5 if level is None else level)
+            self.compress: Callable[[bytes], bytes] = self._br.process
+            self.flush: Callable[[], bytes] = self._br.flush
+            self.finish: Callable[[], bytes] = self._br.finish
+        else:
+            self._gz = zlib.compressobj(6 if level is None else level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            self.compress = self._gz.compress
+            self.flush = lambda: self._gz.flush(zlib.Z_SYNC_FLUSH)
+            self.finish = self._gz.flush
+
+
+class CompressionMiddleware:
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, level: Optional[int] = None) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.level = level
+        self.encodings: Tuple[str, ...] = ("br", "gzip") if brotli is not None else ("gzip",)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""), self.encodings)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await _Responder(self.app, encoding, self.minimum_size, self.level)(scope, receive, send)
+
+
+class _Responder:
+    def __init__(self, app: ASGIApp, encoding: str, minimum_size: int, level: Optional[int]) -> None:
+        self.app = app
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.level = level
+        self.send: Send
+        self.start: Optional[Message] = None
+        self.passthrough = False
+        self.compressor: Optional[_Compressor] = None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.send = send
+        await self.app(scope, receive, self._send)
+
+    async def _send(self, message: Message) -> None:
+        kind = message["type"]
+        if kind == "http.response.start":
+            headers = Headers(raw=message["headers"])
+            ctype = headers.get("content-type", "").lower()
+            self.passthrough = (
+                "content-encoding" in headers
+                or message["status"] in (204, 206, 304)
+                or any(ctype.startswith(t) for t in _EXCLUDED_TYPES)
+            )
+            if self.passthrough:
+                await self.send(message)
+            else:
+                self.start = message
+            return
+        if kind != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body: bytes = message.get("body", b"")
+        more = message.get("more_body", False)
+        if self.start is not None:
+            start, self.start = self.start, None
+            headers = MutableHeaders(raw=start["headers"])
+            headers.add_vary_header("Accept-Encoding")
+            if not more and len(body) < self.minimum_size:
+                self.passthrough = True
+                await self.send(start)
+                await self.send(message)
+                return
+            self.compressor = _Compressor(self.encoding, self.level)
+            headers["Content-Encoding"] = self.encoding
+            body = await self._compress(body, more)
+            if more:
+                del headers["Content-Length"]
+            else:
+                headers["Content-Length"] = str(len(body))
+            await self.send(start)
+            await self.send({"type": "http.response.body", "body": body, "more_body": more})
+            return
+
+        body = await self._compress(body, more)
+        await self.send({"type": "http.response.body", "body": body, "more_body": more})
+
+    def _compress_chunk(self, body: bytes, more: bool) -> bytes:
+        assert self.compressor is not None
+        out = self.compressor.compress(body)
+        return out + (self.compressor.flush() if more else self.compressor.finish())
+
+    async def _compress(self, body: bytes, more: bool) -> bytes:
+        if len(body) >= _THREAD_MIN_BYTES:
+            return await run_blocking(self._compress_chunk, body, more)
+        return self._compress_chunk(body, more)
@@ -8,3 +8,47 @@ ALARMFW_STATE   = Path(os.getenv("ALARMFW_STATE",   str(ALARMFW_ROOT / "state"))
 ALARMFW_SECRETS = Path(os.getenv("ALARMFW_SECRETS", "/home/cnbrkgrcn/alarmfw-secrets"))
 
 COMPOSE_RUN_CONFIG = os.getenv("COMPOSE_RUN_CONFIG", "/config/run_local.yaml")
+
+# alarmfw.sqlite read-only bağlantı havuzu ayarları
+STATE_DB_POOL_SIZE    = int(os.getenv("STATE_DB_POOL_SIZE",    "4"))
+STATE_DB_POOL_TIMEOUT = float(os.getenv("STATE_DB_POOL_TIMEOUT", "5"))
+STATE_DB_MMAP_MB      = int(os.getenv("STATE_DB_MMAP_MB",      "64"))
+STATE_DB_CACHE_MB     = int(os.getenv("STATE_DB_CACHE_MB",     "16"))
+
+# alarm_history rollup/metrik arka plan güncelleme aralığı (sn)
+ROLLUP_INTERVAL_SEC = float(os.getenv("ROLLUP_INTERVAL_SEC", "10"))
+
+# /api/alarms/metrics bildirim sayaçlarına sayılan alarm_history.event_type değerleri (virgülle ayrılmış).
+# Engine her durum geçişinde bir STATE_CHANGE event'i yazar ve bildirimi o geçişte gönderir;
+# bastırılan bildirim için ayrı bir event yazmaz (boş = sayaç 0 kalır).
+METRICS_SENT_EVENT_TYPES       = [t.strip().upper() for t in os.getenv("METRICS_SENT_EVENT_TYPES", "STATE_CHANGE").split(",") if t.strip()]
+METRICS_SUPPRESSED_EVENT_TYPES = [t.strip().upper() for t in os.getenv("METRICS_SUPPRESSED_EVENT_TYPES", "").split(",") if t.strip()]
+
+# alarm_history retention: bu günden eski event'ler state/archive/ altına taşınır (0 = kapalı).
+# alarmfw.sqlite engine'e ait; taşıma yalnızca açıkça etkinleştirilirse yapılır.
+HISTORY_RETENTION_DAYS       = int(os.getenv("HISTORY_RETENTION_DAYS",       "0"))
+HISTORY_ARCHIVE_INTERVAL_SEC = float(os.getenv("HISTORY_ARCHIVE_INTERVAL_SEC", "3600"))
+
+# Event loop lag izleyicisi: ölçüm aralığı ve "yavaş" sayılma eşiği (ms)
+LOOP_LAG_INTERVAL_MS  = float(os.getenv("LOOP_LAG_INTERVAL_MS",  "250"))
+LOOP_LAG_THRESHOLD_MS = float(os.getenv("LOOP_LAG_THRESHOLD_MS", "100"))
+
+# Cevap sıkıştırma (br/gzip, Accept-Encoding'e göre); eşik altındaki cevaplar sıkıştırılmaz
+RESPONSE_COMPRESSION  = os.getenv("RESPONSE_COMPRESSION", "true").lower() in ("1", "true", "yes")
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+
+# generated/ocp_pod_health çıktı düzeni: "single" (tek yaml) | "sharded" (cluster başına yaml)
+GENERATED_LAYOUT = os.getenv("GENERATED_LAYOUT", "single").strip().lower()
+# "per_namespace" (namespace × cluster başına ocp_pod_health) | "cluster_snapshot" (cluster başına tek check)
+GENERATED_MODE   = os.getenv("GENERATED_MODE",   "per_namespace").strip().lower()
+
+# Generated check üretimi: son değişiklikten bu kadar sessizlik olunca tek üretim (0 = istekte senkron);
+# sürekli değişiklik akışında ilk bildirimden en geç GENERATE_MAX_DELAY_MS sonra
+GENERATE_DEBOUNCE_MS  = float(os.getenv("GENERATE_DEBOUNCE_MS",  "500"))
+GENERATE_MAX_DELAY_MS = float(os.getenv("GENERATE_MAX_DELAY_MS", "5000"))
+
+# /api/run kuyruğu: aynı anda en çok bu kadar run (aynı config için en çok bir), run başına zaman aşımı,
+# state/runs.sqlite'ta tutulan bitmiş run sayısı
+RUN_MAX_CONCURRENT = int(os.getenv("RUN_MAX_CONCURRENT", "2"))
+RUN_TIMEOUT_SEC    = float(os.getenv("RUN_TIMEOUT_SEC",  "120"))
+RUN_HISTORY_KEEP   = int(os.getenv("RUN_HISTORY_KEEP",   "500"))
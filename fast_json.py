@@ -0,0 +1,54 @@
+"""
+Büyük liste cevapları için hızlı JSON yolu.
+
+FastAPI varsayılan olarak dönen değeri önce response_model'e göre doğrular,
+sonra jsonable_encoder ile kopyalayıp json.dumps'tan geçirir. Sıcak endpoint'ler
+bunun yerine fast_json(...) döndürür: içerik tek adımda bytes'a çevrilir
+(orjson kuruluysa orjson, değilse stdlib json). orjson opsiyoneldir:
+
+    pip install 'alarmfw-api[fast]'
+"""
+from __future__ import annotations
+
+import json
+from typing import Any, Optional
+
+from fastapi import Response
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - opsiyonel bağımlılık
+    orjson = None
+
+_ORJSON_OPTS = orjson.OPT_NON_STR_KEYS if orjson is not None else 0
+
+# Yanıt gövdesine göre yeniden hesaplanan header'lar kopyalanmaz
+_SKIP_HEADERS = {b"content-length", b"content-type"}
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=str, option=_ORJSON_OPTS)
+    return json.dumps(
+        content, ensure_ascii=False, separators=(",", ":"), default=str,
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def fast_json(content: Any, response: Optional[Response] = None, status_code: int = 200) -> FastJSONResponse:
+    """
+    İçeriği doğrudan FastJSONResponse olarak döner. Endpoint'e enjekte edilen
+    `response` üzerinde set edilmiş header'lar (ETag, X-Next-Cursor, ...) taşınır;
+    Response döndürüldüğünde FastAPI bunları kendisi birleştirmez.
+    """
+    out = FastJSONResponse(content, status_code=status_code)
+    if response is not None:
+        out.raw_headers.extend(
+            (k, v) for k, v in response.raw_headers if k.lower() not in _SKIP_HEADERS
+        )
+    return out
@@ -0,0 +1,112 @@
+"""
+Event loop gecikme (lag) izleyicisi.
+
+Loop üzerinde periyodik bir timer, planlanan uyanma ile gerçek uyanma arasındaki
+farkı ölçer. Ayrı bir watchdog thread'i loop'un kalp atışını izler; loop eşikten
+uzun süre takılırsa loop thread'inin o anki stack'ini alır, böylece gecikme
+raporunda hangi handler'ın (dosya:fonksiyon:satır) loop'u bloke ettiği görünür.
+
+    GET /api/health/loop → örnek sayısı, max/p95 lag ve son yavaş olaylar
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from types import FrameType
+from typing import Any, Deque, Dict, List, Optional
+
+log = logging.getLogger(__name__)
+
+_APP_ROOT = str(Path(__file__).resolve().parent)
+_RECENT = 20
+_WINDOW = 512
+
+
+def _describe(frame: Optional[FrameType], depth: int = 3) -> List[str]:
+    """Stack'teki en içteki uygulama frame'leri ('routers/x.py:func:line')."""
+    out: List[str] = []
+    while frame is not None and len(out) < depth:
+        filename = frame.f_code.co_filename
+        if filename.startswith(_APP_ROOT) and "site-packages" not in filename and filename != __file__:
+            rel = filename[len(_APP_ROOT) + 1:]
+            out.append(f"{rel}:{frame.f_code.co_name}:{frame.f_lineno}")
+        frame = frame.f_back
+    return out
+
+
+class LoopLagMonitor:
+    def __init__(self, interval: float = 0.25, threshold: float = 0.1) -> None:
+        self.interval = interval
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._lags: Deque[float] = deque(maxlen=_WINDOW)
+        self._recent: Deque[Dict[str, Any]] = deque(maxlen=_RECENT)
+        self._samples = 0
+        self._slow = 0
+        self._max = 0.0
+        self._beat = time.monotonic()
+        self._culprit: Optional[List[str]] = None
+        self._loop_thread: Optional[int] = None
+        self._stop = threading.Event()
+
+    # ── watchdog ──────────────────────────────────────
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.interval / 2):
+            stalled = time.monotonic() - self._beat
+            if stalled < self.interval + self.threshold or self._culprit is not None:
+                continue
+            frame = sys._current_frames().get(self._loop_thread or 0)
+            culprit = _describe(frame)
+            if culprit:
+                self._culprit = culprit
+
+    # ── loop side ─────────────────────────────────────
+
+    def _record(self, lag: float) -> None:
+        culprit, self._culprit = self._culprit, None
+        with self._lock:
+            self._samples += 1
+            self._lags.append(lag)
+            self._max = max(self._max, lag)
+            if lag < self.threshold:
+                return
+            self._slow += 1
+            event = {"ts": time.time(), "lag_ms": round(lag * 1000, 1), "culprit": culprit or []}
+            self._recent.append(event)
+        log.warning("event loop blocked for %.0f ms in %s", lag * 1000, " <- ".join(culprit or ["?"]))
+
+    async def run(self) -> None:
+        """App lifespan'inden başlatılır; iptal edilene kadar çalışır."""
+        self._loop_thread = threading.get_ident()
+        self._stop.clear()
+        watchdog = threading.Thread(target=self._watch, name="loop-lag-watchdog", daemon=True)
+        watchdog.start()
+        try:
+            while True:
+                self._beat = start = time.monotonic()
+                await asyncio.sleep(self.interval)
+                now = time.monotonic()
+                self._beat = now
+                self._record(max(0.0, now - start - self.interval))
+        finally:
+            self._stop.set()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lags = sorted(self._lags)
+            p95 = lags[max(0, -(-len(lags) * 95 // 100) - 1)] if lags else 0.0
+            return {
+                "interval_ms":  round(self.interval * 1000, 1),
+                "threshold_ms": round(self.threshold * 1000, 1),
+                "samples":      self._samples,
+                "slow":         self._slow,
+                "max_lag_ms":   round(self._max * 1000, 1),
+                "p95_lag_ms":   round(p95 * 1000, 1),
+                "recent":       list(self._recent),
+            }
@@ -1,10 +1,55 @@
+import asyncio
 import os
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+import state_db
+from compression import CompressionMiddleware
+from loop_monitor import LoopLagMonitor
+from async_utils import run_blocking
+from config import (
+    COMPRESSION_MIN_BYTES,
+    HISTORY_ARCHIVE_INTERVAL_SEC,
+    HISTORY_RETENTION_DAYS,
+    LOOP_LAG_INTERVAL_MS,
+    LOOP_LAG_THRESHOLD_MS,
+    RESPONSE_COMPRESSION,
+    ROLLUP_INTERVAL_SEC,
+)
+from routers import _archive, _rollup
 from routers import checks, notifiers, secrets, alarms, runner, policies, config, monitor, terminal, admin
 
-app = FastAPI(title="AlarmFW API", version="0.1.0")
+loop_monitor = LoopLagMonitor(LOOP_LAG_INTERVAL_MS / 1000, LOOP_LAG_THRESHOLD_MS / 1000)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # alarm_history şeması/index'leri okuma yolunda değil, açılışta (ve DB yeniden
+    # oluşturulursa arka planda, watch_schema) kurulur
+    await run_blocking(state_db.pool.bootstrap)
+    # Restart'tan kalan run kuyruğu kaldığı yerden devam eder
+    await run_blocking(runner.run_queue.start)
+    tasks = [
+        asyncio.create_task(loop_monitor.run()),
+        asyncio.create_task(state_db.watch_schema()),
+        asyncio.create_task(_rollup.run_forever(ROLLUP_INTERVAL_SEC)),
+        asyncio.create_task(config.generation.run()),
+    ]
+    if HISTORY_RETENTION_DAYS > 0:
+        tasks.append(asyncio.create_task(
+            _archive.run_forever(HISTORY_RETENTION_DAYS, HISTORY_ARCHIVE_INTERVAL_SEC)
+        ))
+    yield
+    for task in tasks:
+        task.cancel()
+    # Üretim worker'ı iptalde bekleyen değişiklikleri yazar; bitmesini bekle
+    await asyncio.gather(*tasks, return_exceptions=True)
+    state_db.pool.close()
+
+
+app = FastAPI(title="AlarmFW API", version="0.1.0", lifespan=lifespan)
 
 _cors_origins = [o.strip() for o in os.getenv("CORS_ORIGINS", "http://localhost:3000").split(",") if o.strip()]
 app.add_middleware(
@@ -12,7 +57,10 @@ app.add_middleware(
     allow_origins=_cors_origins,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor"],
 )
+if RESPONSE_COMPRESSION:
+    app.add_middleware(CompressionMiddleware, minimum_size=COMPRESSION_MIN_BYTES)
 
 app.include_router(checks.router)
 app.include_router(notifiers.router)
@@ -29,3 +77,15 @@ app.include_router(admin.router)
 @app.get("/api/health")
 async def health():
     return {"status": "ok"}
+
+
+@app.get("/api/health/db")
+async def health_db():
+    """Paylaşılan alarmfw.sqlite read-only havuzunun bağlantı/bekleme istatistikleri."""
+    return state_db.pool.stats()
+
+
+@app.get("/api/health/loop")
+async def health_loop():
+    """Event loop gecikme istatistikleri ve loop'u bloke eden son handler'lar."""
+    return loop_monitor.stats()
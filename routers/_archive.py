@@ -0,0 +1,195 @@
+"""
+alarm_history retention ve soğuk arşiv.
+
+N günden eski event'ler alarmfw.sqlite'tan ay başına ayrı SQLite dosyalarına
+(state/archive/alarm_history_YYYY-MM.sqlite) taşınır. Segment dosyaları aynı
+şemayı ve index'leri taşır; history sorguları zaman aralığı örtüşen segmentleri
+aynı SQL ile okur, örtüşmeyenleri hiç açmaz.
+
+Rollup (stats/metrics) sıcak tablodan okuduğu için yalnızca rollup'ın işlediği
+satırlar (id <= high-water) taşınır; geride kalan satırlar bir sonraki tura kalır.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import re
+import sqlite3
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from async_utils import run_blocking
+from config import ALARMFW_STATE
+from routers import _rollup
+from state_db import STATE_DB
+
+log = logging.getLogger(__name__)
+
+ARCHIVE_DIR = ALARMFW_STATE / "archive"
+
+_SEGMENT_RE = re.compile(r"^alarm_history_(\d{4})-(\d{2})\.sqlite$")
+_BATCH = 5000
+
+_SEGMENT_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS alarm_history (
+        id            INTEGER PRIMARY KEY,
+        event_ts      INTEGER NOT NULL,
+        timestamp_utc TEXT,
+        event_type    TEXT NOT NULL,
+        dedup_key     TEXT NOT NULL,
+        alarm_name    TEXT,
+        status        TEXT NOT NULL,
+        prev_status   TEXT,
+        severity      TEXT,
+        cluster       TEXT,
+        namespace     TEXT,
+        message       TEXT,
+        payload_json  TEXT
+    );
+    CREATE INDEX IF NOT EXISTS idx_alarm_history_event_ts        ON alarm_history(event_ts);
+    CREATE INDEX IF NOT EXISTS idx_alarm_history_cluster_ns_ts   ON alarm_history(cluster, namespace, event_ts);
+    CREATE INDEX IF NOT EXISTS idx_alarm_history_ns_ts           ON alarm_history(namespace, event_ts);
+    CREATE INDEX IF NOT EXISTS idx_alarm_history_dedup_ts        ON alarm_history(dedup_key, event_ts);
+    CREATE INDEX IF NOT EXISTS idx_alarm_history_alarm_ts        ON alarm_history(alarm_name, event_ts);
+    CREATE INDEX IF NOT EXISTS idx_alarm_history_status_ts       ON alarm_history(status, event_ts);
+"""
+
+_COLUMNS = (
+    "id, event_ts, timestamp_utc, event_type, dedup_key, alarm_name, "
+    "status, prev_status, severity, cluster, namespace, message, payload_json"
+)
+
+_archive_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class Segment:
+    path: Path
+    start_ts: int   # dahil
+    end_ts: int     # hariç
+
+    def overlaps(self, since_ts: Optional[int], until_ts: Optional[int] = None) -> bool:
+        if since_ts is not None and self.end_ts <= since_ts:
+            return False
+        if until_ts is not None and self.start_ts > until_ts:
+            return False
+        return True
+
+    def connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, timeout=5)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+
+def _month_bounds(year: int, month: int) -> Tuple[int, int]:
+    start = datetime(year, month, 1, tzinfo=timezone.utc)
+    end = datetime(year + 1, 1, 1, tzinfo=timezone.utc) if month == 12 else \
+        datetime(year, month + 1, 1, tzinfo=timezone.utc)
+    return int(start.timestamp()), int(end.timestamp())
+
+
+def _segment_path(ts: int) -> Path:
+    dt = datetime.fromtimestamp(ts, tz=timezone.utc)
+    return ARCHIVE_DIR / f"alarm_history_{dt.year:04d}-{dt.month:02d}.sqlite"
+
+
+def segments(since_ts: Optional[int] = None, until_ts: Optional[int] = None) -> List[Segment]:
+    """Zaman aralığıyla örtüşen segmentler, yeniden eskiye."""
+    if not ARCHIVE_DIR.exists():
+        return []
+    out = []
+    for p in ARCHIVE_DIR.glob("alarm_history_*.sqlite"):
+        m = _SEGMENT_RE.match(p.name)
+        if not m:
+            continue
+        start, end = _month_bounds(int(m.group(1)), int(m.group(2)))
+        seg = Segment(p, start, end)
+        if seg.overlaps(since_ts, until_ts):
+            out.append(seg)
+    out.sort(key=lambda s: s.start_ts, reverse=True)
+    return out
+
+
+def archive_older_than(days: int, now: Optional[float] = None) -> Dict[str, Any]:
+    """
+    event_ts'i `days` günden eski ve rollup'a işlenmiş history satırlarını aylık
+    segmentlere taşır. Her parça önce segmente yazılıp commit edilir, sonra sıcak tablodan silinir;
+    yarıda kesilirse tekrar çalıştırmak güvenlidir (INSERT OR IGNORE, id korunur).
+    """
+    if days <= 0 or not STATE_DB.exists():
+        return {"moved": 0, "segments": []}
+    cutoff = int((now if now is not None else datetime.now(timezone.utc).timestamp()) - days * 86400)
+    moved = 0
+    touched: List[str] = []
+
+    # Rollup geride kalmışsa önce yakalasın; işlenmemiş satır sıcak tablodan silinmez
+    _rollup.refresh()
+    max_id = _rollup.high_water()
+    if max_id <= 0:
+        return {"moved": 0, "cutoff_ts": cutoff, "segments": []}
+
+    with _archive_lock:
+        hot = sqlite3.connect(str(STATE_DB), timeout=30)
+        try:
+            seg_conns: Dict[Path, sqlite3.Connection] = {}
+            try:
+                while True:
+                    try:
+                        rows = hot.execute(
+                            f"SELECT {_COLUMNS} FROM alarm_history WHERE event_ts < ? AND id <= ? "
+                            "ORDER BY id LIMIT ?",
+                            (cutoff, max_id, _BATCH),
+                        ).fetchall()
+                    except sqlite3.OperationalError as e:
+                        if "no such table" in str(e):
+                            break
+                        raise
+                    if not rows:
+                        break
+
+                    by_segment: Dict[Path, List[tuple]] = {}
+                    for r in rows:
+                        by_segment.setdefault(_segment_path(r[1]), []).append(r)
+                    for path, seg_rows in by_segment.items():
+                        conn = seg_conns.get(path)
+                        if conn is None:
+                            ARCHIVE_DIR.mkdir(parents=True, exist_ok=True)
+                            conn = seg_conns[path] = sqlite3.connect(str(path), timeout=30)
+                            conn.executescript(_SEGMENT_SCHEMA)
+                            if path.name not in touched:
+                                touched.append(path.name)
+                        conn.executemany(
+                            f"INSERT OR IGNORE INTO alarm_history({_COLUMNS}) VALUES({','.join('?' * 13)})",
+                            seg_rows,
+                        )
+                        conn.commit()
+
+                    hot.executemany("DELETE FROM alarm_history WHERE id = ?", [(r[0],) for r in rows])
+                    hot.commit()
+                    moved += len(rows)
+                    if len(rows) < _BATCH:
+                        break
+            finally:
+                for conn in seg_conns.values():
+                    conn.close()
+            if moved:
+                hot.execute("PRAGMA wal_checkpoint(PASSIVE);")
+        finally:
+            hot.close()
+
+    return {"moved": moved, "cutoff_ts": cutoff, "max_id": max_id, "segments": touched}
+
+
+async def run_forever(days: int, interval_sec: float) -> None:
+    """Retention'ı arka planda periyodik çalıştırır (app lifespan'inden başlatılır)."""
+    while True:
+        try:
+            result = await run_blocking(archive_older_than, days)
+            if result["moved"]:
+                log.info("archived %d alarm_history rows into %s", result["moved"], result["segments"])
+        except Exception:
+            log.exception("alarm_history archive failed")
+        await asyncio.sleep(interval_sec)
@@ -0,0 +1,201 @@
+"""
+Config dosyaları için dosya başına kilit ve atomik yazma.
+
+file_lock(path) aynı dosyaya yapılan read-modify-write'ları sıraya sokar; farklı
+dosyalar birbirini beklemez. Kilit süreç içinde threading.Lock, süreçler arası
+(birden çok uvicorn worker'ı) ALARMFW_STATE/locks altındaki, dosyanın tam yolundan
+türetilen .lock dosyası üzerinde flock ile alınır; kullanıcının yönettiği config
+dizinlerinde kilit dosyası bırakılmaz. atomic_write_text önce aynı dizinde geçici dosyaya yazar,
+fsync eder ve os.replace ile yerine koyar; engine hiçbir zaman yarım dosya görmez.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+from config import ALARMFW_STATE
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+log = logging.getLogger(__name__)
+
+LOCK_DIR = ALARMFW_STATE / "locks"
+
+_locks_guard = threading.Lock()
+_locks: Dict[str, threading.Lock] = {}
+
+
+def _thread_lock(path: Path) -> threading.Lock:
+    key = os.path.abspath(path)
+    with _locks_guard:
+        lock = _locks.get(key)
+        if lock is None:
+            lock = _locks[key] = threading.Lock()
+        return lock
+
+
+@contextmanager
+def file_locks(paths: Iterable[Path]) -> Iterator[None]:
+    """Birden çok dosyayı deadlock'suz (sabit sırada) kilitler."""
+    ordered = sorted({os.path.abspath(p): p for p in paths}.items())
+    with ExitStack() as stack:
+        for _, path in ordered:
+            stack.enter_context(file_lock(path))
+        yield
+
+
+def _lock_path(path: Path) -> Path:
+    digest = hashlib.sha1(os.path.abspath(path).encode()).hexdigest()[:16]
+    return LOCK_DIR / f"{path.name}.{digest}.lock"
+
+
+@contextmanager
+def file_lock(path: Path) -> Iterator[None]:
+    with _thread_lock(path):
+        fd = None
+        if fcntl is not None:
+            try:
+                LOCK_DIR.mkdir(parents=True, exist_ok=True)
+                fd = os.open(_lock_path(path), os.O_RDWR | os.O_CREAT, 0o644)
+            except OSError as e:
+                # State dizini yazılamıyorsa yalnızca süreç içi kilitle devam edilir
+                log.warning("file lock unavailable for %s: %s", path, e)
+        if fd is None:
+            yield
+            return
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+
+def _stage(path: Path, text: str, encoding: str, mode: Optional[int] = None) -> str:
+    """
+    Hedefin yanına fsync edilmiş geçici dosya yazar, yolunu döner. İzinler mode
+    verilmişse o, yoksa mevcut dosyanınki (yeni dosyada 0644); token gibi gizli
+    dosyalar hiçbir an geniş izinle görünmez.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding=encoding) as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        if mode is None:
+            try:
+                mode = os.stat(path).st_mode & 0o777
+            except FileNotFoundError:
+                mode = 0o644
+        os.chmod(tmp, mode)
+    except BaseException:
+        _unlink(tmp)
+        raise
+    return tmp
+
+
+def _unlink(path: str) -> None:
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+def atomic_write_text(path: Path, text: str, encoding: str = "utf-8", mode: Optional[int] = None) -> None:
+    tmp = _stage(path, text, encoding, mode)
+    try:
+        os.replace(tmp, path)
+    except BaseException:
+        _unlink(tmp)
+        raise
+    _fsync_dir(path.parent)
+
+
+def _backup(path: Path) -> Optional[str]:
+    """Mevcut dosyanın aynı dizinde hard link (olmazsa kopya) yedeği; dosya yoksa None."""
+    if not path.exists():
+        return None
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".bak")
+    os.close(fd)
+    try:
+        os.unlink(tmp)
+        os.link(path, tmp)
+    except OSError:
+        shutil.copy2(path, tmp)
+    return tmp
+
+
+def atomic_write_many(
+    changes: Mapping[Path, Optional[str]], encoding: str = "utf-8", mode: Optional[int] = None,
+) -> None:
+    """
+    Birden çok dosyayı birlikte yazar (None = sil). Önce tüm içerikler geçici
+    dosyalara yazılıp fsync edilir ve değişecek mevcut dosyaların yedeği alınır;
+    ardından rename/silme'ler art arda yapılır. Herhangi bir adım hata verirse o ana
+    kadar uygulananlar yedeklerden geri alınır ve hata yükseltilir; dosyalar ya
+    hep birlikte yeni ya da hep birlikte eski haliyle kalır (süreç çökmesi hariç).
+    """
+    staged: List[Tuple[str, Path]] = []
+    backups: Dict[Path, Optional[str]] = {}
+    applied: List[Path] = []
+    try:
+        for path, text in changes.items():
+            if text is not None:
+                staged.append((_stage(path, text, encoding, mode), path))
+        for path in changes:
+            backups[path] = _backup(path)
+        for tmp, path in staged:
+            os.replace(tmp, path)
+            applied.append(path)
+        for path, text in changes.items():
+            if text is None:
+                _unlink(str(path))
+                applied.append(path)
+    except BaseException:
+        _rollback(applied, backups)
+        for tmp, _ in staged:
+            _unlink(tmp)
+        raise
+    finally:
+        for backup in backups.values():
+            if backup is not None:
+                _unlink(backup)
+    for directory in {p.parent for p in changes}:
+        _fsync_dir(directory)
+
+
+def _rollback(applied: List[Path], backups: Mapping[Path, Optional[str]]) -> None:
+    for path in reversed(applied):
+        backup = backups.get(path)
+        try:
+            if backup is None:
+                _unlink(str(path))
+            else:
+                os.replace(backup, path)
+        except OSError as e:
+            log.error("rollback failed for %s: %s", path, e)
+
+
+def _fsync_dir(directory: Path) -> None:
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
@@ -0,0 +1,246 @@
+"""
+config/checks/ ve config/generated/ altındaki check'lerin süreç içi kataloğu.
+
+Her yaml dosyası (mtime_ns, size, inode) parmak iziyle tutulur; refresh() yalnızca
+parmak izi değişen dosyaları yeniden parse eder. Üstünde name → (dosya, index)
+haritası ve type / cluster / namespace / enabled ikincil index'leri kurulur.
+Katalogdaki dict'ler paylaşılır; değiştirmek isteyen çağıran dosyayı kendisi okur.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import yaml
+
+from config import ALARMFW_CONFIG
+
+CHECK_DIRS = ("checks", "generated")
+
+Fingerprint = Tuple[int, int, int]
+
+# libyaml varsa C loader/dumper (binlerce check'lik generated dosyalarda ~4x hızlı)
+_Loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+_Dumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
+
+def load_yaml(text: str) -> Any:
+    return yaml.load(text, Loader=_Loader)
+
+
+def dump_yaml(data: Any) -> str:
+    return yaml.dump(data, Dumper=_Dumper, allow_unicode=True, default_flow_style=False)
+
+
+@dataclass
+class _FileEntry:
+    path: Path
+    fingerprint: Fingerprint
+    checks: List[Dict[str, Any]] = field(default_factory=list)
+    error: Optional[str] = None
+
+
+def file_fingerprint(path: Path) -> Optional[Fingerprint]:
+    """(mtime_ns, size, inode); dosya yoksa None. Generator da aynı parmak izini kullanır."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size, st.st_ino
+
+
+def generated_files(d: Path) -> List[Path]:
+    """generated/*.yaml ve shard dizinleri (generated/<ad>/*.yaml), isim sırasıyla."""
+    if not d.exists():
+        return []
+    return sorted(d.glob("*.yaml")) + sorted(d.glob("*/*.yaml"))
+
+
+def check_files() -> List[Path]:
+    """Katalog sırası: checks/ sonra generated/ (ve shard'ları), her dizinde isim sırası."""
+    files: List[Path] = []
+    for subdir in CHECK_DIRS:
+        d = ALARMFW_CONFIG / subdir
+        if subdir == "generated":
+            files.extend(generated_files(d))
+        elif d.exists():
+            files.extend(sorted(d.glob("*.yaml")))
+    return files
+
+
+def rel_source(path: Path) -> str:
+    return str(path.relative_to(ALARMFW_CONFIG))
+
+
+def check_version(chk: Dict[str, Any]) -> str:
+    """Check içeriğinin kısa hash'i (_ ile başlayan meta alanlar hariç); ETag / _version olarak kullanılır."""
+    body = {k: v for k, v in chk.items() if not str(k).startswith("_")}
+    raw = json.dumps(body, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha1(raw.encode()).hexdigest()[:16]
+
+
+def check_clusters(chk: Dict[str, Any]) -> List[str]:
+    params = chk.get("params") or {}
+    cl = params.get("cluster") if isinstance(params, dict) else None
+    return [str(cl)] if cl else []
+
+
+def check_namespaces(chk: Dict[str, Any]) -> List[str]:
+    params = chk.get("params") or {}
+    if not isinstance(params, dict):
+        return []
+    out = []
+    if params.get("namespace"):
+        out.append(str(params["namespace"]))
+    for entry in params.get("namespaces") or []:
+        ns = entry.get("namespace") if isinstance(entry, dict) else entry
+        if ns:
+            out.append(str(ns))
+    return out
+
+
+class CheckCatalog:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._files: Dict[Path, _FileEntry] = {}
+        self._order: List[Path] = []
+        self._by_name: Dict[str, Tuple[Path, int]] = {}
+        self._rank: Dict[str, int] = {}
+        self._by_type: Dict[str, Set[str]] = {}
+        self._by_cluster: Dict[str, Set[str]] = {}
+        self._by_namespace: Dict[str, Set[str]] = {}
+        self._by_enabled: Dict[bool, Set[str]] = {True: set(), False: set()}
+
+    # ── maintenance ───────────────────────────────────
+
+    def _load(self, path: Path, fp: Fingerprint) -> _FileEntry:
+        entry = _FileEntry(path, fp)
+        try:
+            data = load_yaml(path.read_text()) or {}
+            checks = data.get("checks") or []
+            source = rel_source(path)
+            for chk in checks:
+                if isinstance(chk, dict):
+                    chk["_version"] = check_version(chk)
+                    chk["_source_file"] = source
+            entry.checks = [c for c in checks if isinstance(c, dict)]
+        except Exception as e:
+            entry.error = str(e)
+        return entry
+
+    def _reindex(self) -> None:
+        by_name: Dict[str, Tuple[Path, int]] = {}
+        rank: Dict[str, int] = {}
+        by_type: Dict[str, Set[str]] = {}
+        by_cluster: Dict[str, Set[str]] = {}
+        by_namespace: Dict[str, Set[str]] = {}
+        by_enabled: Dict[bool, Set[str]] = {True: set(), False: set()}
+        for path in self._order:
+            for i, chk in enumerate(self._files[path].checks):
+                name = chk.get("name")
+                if not isinstance(name, str) or name in by_name:
+                    continue      # aynı isim birden çok yerdeyse ilk bulunan geçerli (eski _find_check davranışı)
+                by_name[name] = (path, i)
+                rank[name] = len(rank)
+                by_type.setdefault(str(chk.get("type", "")), set()).add(name)
+                for cl in check_clusters(chk):
+                    by_cluster.setdefault(cl, set()).add(name)
+                for ns in check_namespaces(chk):
+                    by_namespace.setdefault(ns, set()).add(name)
+                by_enabled[bool(chk.get("enabled", True))].add(name)
+        self._by_name, self._rank = by_name, rank
+        self._by_type, self._by_cluster, self._by_namespace = by_type, by_cluster, by_namespace
+        self._by_enabled = by_enabled
+
+    def refresh(self) -> None:
+        files = check_files()
+        with self._lock:
+            changed = files != self._order
+            seen = set(files)
+            for path in [p for p in self._files if p not in seen]:
+                del self._files[path]
+                changed = True
+            for path in files:
+                fp = file_fingerprint(path)
+                if fp is None:
+                    self._files.pop(path, None)
+                    changed = True
+                    continue
+                current = self._files.get(path)
+                if current is None or current.fingerprint != fp:
+                    self._files[path] = self._load(path, fp)
+                    changed = True
+            self._order = [p for p in files if p in self._files]
+            if changed:
+                self._reindex()
+
+    def invalidate(self, path: Path) -> None:
+        """Yazma sonrası: aynı mtime tik'inde yapılan değişiklik de yeniden okunsun."""
+        with self._lock:
+            entry = self._files.get(path)
+            if entry is not None:
+                entry.fingerprint = (-1, -1, -1)
+
+    # ── lookups ───────────────────────────────────────
+
+    def locate(self, name: str) -> Optional[Tuple[Path, int]]:
+        self.refresh()
+        with self._lock:
+            return self._by_name.get(name)
+
+    def get(self, name: str) -> Optional[Dict[str, Any]]:
+        self.refresh()
+        with self._lock:
+            loc = self._by_name.get(name)
+            return self._files[loc[0]].checks[loc[1]] if loc else None
+
+    def all(self) -> List[Dict[str, Any]]:
+        """Eski /api/checks çıktısı: tüm check'ler + parse edilemeyen dosyalar için _error satırı."""
+        self.refresh()
+        with self._lock:
+            out: List[Dict[str, Any]] = []
+            for path in self._order:
+                entry = self._files[path]
+                if entry.error is not None:
+                    out.append({"_error": entry.error, "_source_file": str(path)})
+                out.extend(entry.checks)
+            return out
+
+    def search(
+        self,
+        q: Optional[str] = None,
+        type_: Optional[str] = None,
+        cluster: Optional[str] = None,
+        namespace: Optional[str] = None,
+        enabled: Optional[bool] = None,
+    ) -> List[Dict[str, Any]]:
+        """Filtreye uyan check'ler, katalog sırasında. İkincil index'ler kesiştirilir."""
+        self.refresh()
+        with self._lock:
+            sets: List[Iterable[str]] = []
+            if type_ is not None:
+                sets.append(self._by_type.get(type_, set()))
+            if cluster is not None:
+                sets.append(self._by_cluster.get(cluster, set()))
+            if namespace is not None:
+                sets.append(self._by_namespace.get(namespace, set()))
+            if enabled is not None:
+                sets.append(self._by_enabled[enabled])
+            if sets:
+                smallest, *rest = sorted(sets, key=len)
+                names: Iterable[str] = set(smallest).intersection(*rest) if rest else smallest
+            else:
+                names = self._by_name
+            if q:
+                needle = q.lower()
+                names = [n for n in names if needle in n.lower()]
+            ordered = sorted(names, key=self._rank.__getitem__)
+            return [self._files[self._by_name[n][0]].checks[self._by_name[n][1]] for n in ordered]
+
+
+catalog = CheckCatalog()
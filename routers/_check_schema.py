@@ -0,0 +1,109 @@
+"""
+Check tipine göre şema doğrulaması.
+
+Her bilinen tip için pydantic modeli import anında bir kez derlenir (pydantic-core);
+validate_check() tipe göre doğru validator'ı seçer. Tanınmayan tipler yalnızca ortak
+alanlar (name, type, enabled, params, notify) üzerinden doğrulanır, çünkü engine'de
+API'nin bilmediği check tipleri olabilir.
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, List, Literal, Optional, Union
+
+from pydantic import BaseModel, ConfigDict, Field, StrictBool, TypeAdapter, ValidationError, field_validator
+
+# Dosya adı olarak da kullanıldığı için (checks/<name>.yaml) yol ayırıcı içeremez
+_NAME_PATTERN = r"^[^/\\\x00]+$"
+
+BoolLike = Union[StrictBool, Literal["true", "false", "True", "False"]]
+
+
+def _positive_int(v: Any) -> Any:
+    try:
+        ok = int(str(v)) > 0
+    except ValueError:
+        ok = False
+    if isinstance(v, bool) or not ok:
+        raise ValueError("must be a positive integer")
+    return v
+
+
+class _Open(BaseModel):
+    model_config = ConfigDict(extra="allow")
+
+
+class Notify(_Open):
+    primary:  List[str] = []
+    fallback: List[str] = []
+
+
+class CheckBase(_Open):
+    name:    str = Field(min_length=1, pattern=_NAME_PATTERN)
+    type:    str = Field(min_length=1)
+    enabled: StrictBool = True
+    params:  Dict[str, Any] = {}
+    notify:  Optional[Notify] = None
+
+
+class _OcpParams(_Open):
+    cluster:        str = Field(min_length=1)
+    ocp_api:        Optional[str] = None
+    ocp_token_file: Optional[str] = None
+    ocp_insecure:   Optional[BoolLike] = None
+    timeout_sec:    Optional[Union[int, str]] = None
+
+    @field_validator("timeout_sec")
+    @classmethod
+    def _timeout(cls, v: Any) -> Any:
+        return v if v is None else _positive_int(v)
+
+    @field_validator("ocp_api")
+    @classmethod
+    def _api(cls, v: Optional[str]) -> Optional[str]:
+        if v and not v.startswith(("http://", "https://")):
+            raise ValueError("must be an http(s) URL")
+        return v
+
+
+class PodHealthParams(_OcpParams):
+    namespace: str = Field(min_length=1)
+
+
+class SnapshotNamespace(_Open):
+    namespace: str = Field(min_length=1)
+
+
+class ClusterSnapshotParams(_OcpParams):
+    namespaces: List[SnapshotNamespace] = Field(min_length=1)
+
+
+class PodHealthCheck(CheckBase):
+    params: PodHealthParams
+
+
+class ClusterSnapshotCheck(CheckBase):
+    params: ClusterSnapshotParams
+
+
+_VALIDATORS: Dict[str, TypeAdapter] = {
+    "ocp_pod_health":       TypeAdapter(PodHealthCheck),
+    "ocp_cluster_snapshot": TypeAdapter(ClusterSnapshotCheck),
+}
+_GENERIC = TypeAdapter(CheckBase)
+
+
+def _loc(loc: tuple) -> str:
+    return ".".join(str(p) for p in loc)
+
+
+def validate_check(chk: Any) -> List[Dict[str, str]]:
+    """Hata listesi döner; geçerliyse boş liste."""
+    if not isinstance(chk, dict):
+        return [{"loc": "", "msg": "check must be a mapping"}]
+    ctype = chk.get("type")
+    validator = _VALIDATORS.get(ctype, _GENERIC) if isinstance(ctype, str) else _GENERIC
+    try:
+        validator.validate_python(chk)
+    except ValidationError as e:
+        return [{"loc": _loc(err["loc"]), "msg": err["msg"]} for err in e.errors(include_url=False)]
+    return []
@@ -2,10 +2,16 @@
 from pathlib import Path
 from typing import Dict
 
+from routers._atomic import atomic_write_text
+
 
 def read_conf(path: Path) -> Dict[str, str]:
+    return parse_conf(path.read_text(encoding="utf-8", errors="ignore"))
+
+
+def parse_conf(text: str) -> Dict[str, str]:
     d: Dict[str, str] = {}
-    for line in path.read_text(encoding="utf-8", errors="ignore").splitlines():
+    for line in text.splitlines():
         s = line.strip()
         if not s or s.startswith("#") or "=" not in s:
             continue
@@ -14,10 +20,13 @@ def read_conf(path: Path) -> Dict[str, str]:
     return d
 
 
-def write_conf(path: Path, data: Dict[str, str]) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
+def format_conf(data: Dict[str, str]) -> str:
     lines = [f'{k}="{v}"' for k, v in data.items() if v is not None]
-    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return "\n".join(lines) + "\n"
+
+
+def write_conf(path: Path, data: Dict[str, str]) -> None:
+    atomic_write_text(path, format_conf(data))
 
 
 def is_true(v: str | None) -> bool:
@@ -0,0 +1,66 @@
+"""
+Koşullu GET (ETag / If-None-Match → 304) yardımcıları.
+
+ETag, cevabı üreten kaynakların ucuz parmak izinden hesaplanır: alarmfw.sqlite
+için state_db.change_token(), config dosyaları için mtime/size. Eşleşme varsa
+payload satırları hiç okunmaz.
+"""
+import hashlib
+import os
+import uuid
+from pathlib import Path
+from typing import Any, Iterable, Optional, Tuple
+
+from fastapi import Request, Response
+
+import state_db
+
+# data_version süreç başına sıfırdan başlar; yeniden başlatma sonrası eski ETag'lerle çakışmasın
+_BOOT_ID = uuid.uuid4().hex[:8]
+
+
+def files_fingerprint(paths: Iterable[Path]) -> Tuple[Tuple[str, int, int], ...]:
+    out = []
+    for p in sorted(paths):
+        try:
+            st = os.stat(p)
+        except FileNotFoundError:
+            continue
+        out.append((str(p), st.st_mtime_ns, st.st_size))
+    return tuple(out)
+
+
+def compute(*parts: Any, db: bool = True) -> str:
+    """Verilen parçalardan (ve istenirse DB değişiklik token'ından) zayıf ETag üretir."""
+    if db:
+        parts = (state_db.change_token(),) + parts
+    digest = hashlib.sha1(repr((_BOOT_ID,) + parts).encode()).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def _matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    bare = etag[2:] if etag.startswith("W/") else etag
+    for candidate in header.split(","):
+        c = candidate.strip()
+        if c.startswith("W/"):
+            c = c[2:]
+        if c == bare:
+            return True
+    return False
+
+
+def not_modified(request: Request, response: Response, etag: str) -> Optional[Response]:
+    """
+    If-None-Match eşleşirse 304 cevabı döner; aksi halde ETag'i normal cevaba
+    ekler ve None döner.
+    """
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
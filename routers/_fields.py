@@ -0,0 +1,57 @@
+"""
+`fields=` parametresi için ortak yardımcılar.
+
+İstenen alanlar payload_json'dan SQLite'ta json_extract ile çıkarılır; böylece
+büyük payload'lar (ör. evidence.pods) Python'da hiç decode edilmez.
+"""
+import json
+import re
+from typing import Any, Dict, List, Optional
+
+from fastapi import HTTPException
+
+_PATH_RE   = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*(\.[A-Za-z_][A-Za-z0-9_]*)*$")
+MAX_FIELDS = 32
+
+
+def parse_fields(raw: Optional[str]) -> Optional[List[str]]:
+    """'a,b.c' → ['a', 'b.c']. Parametre yoksa None (tam payload)."""
+    if raw is None or not raw.strip():
+        return None
+    paths: List[str] = []
+    for p in raw.split(","):
+        p = p.strip()
+        if not p:
+            continue
+        if not _PATH_RE.match(p):
+            raise HTTPException(400, f"Invalid field path: {p!r}")
+        if p not in paths:
+            paths.append(p)
+    if len(paths) > MAX_FIELDS:
+        raise HTTPException(400, f"At most {MAX_FIELDS} fields allowed")
+    return paths
+
+
+def sql_value(column: str, path: str) -> str:
+    """JSON path'in SQL değeri (filtre için); geçersiz JSON'da NULL."""
+    return f"CASE WHEN json_valid({column}) THEN json_extract({column}, '$.{path}') END"
+
+
+def sql_json(column: str, path: str) -> str:
+    """JSON path'in JSON metni (obje/dizi/string ayrımı korunur); decode() ile açılır."""
+    return f"CASE WHEN json_valid({column}) THEN json_quote(json_extract({column}, '$.{path}')) END"
+
+
+def decode(value: Optional[str]) -> Any:
+    return json.loads(value) if value is not None else None
+
+
+def set_path(target: Dict[str, Any], path: str, value: Any) -> None:
+    """'a.b.c' path'ini iç içe dict'e yazar."""
+    *parents, leaf = path.split(".")
+    for key in parents:
+        nxt = target.get(key)
+        if not isinstance(nxt, dict):
+            nxt = target[key] = {}
+        target = nxt
+    target[leaf] = value
@@ -0,0 +1,161 @@
+"""
+generated check'leri için debounce'lu arka plan üretim worker'ı.
+
+Namespace/cluster değişiklikleri üretimi doğrudan çalıştırmaz, notify() ile
+worker'a bildirir ve .conf yazılır yazılmaz döner. Worker son bildirimden
+`debounce` kadar sessizlik olunca (en geç ilk bildirimden `max_delay` sonra)
+tek bir üretim çalıştırır; patlama halinde gelen N değişiklik tek üretimde
+birleşir. Üretim sırasında gelen bildirimler bir sonraki tura kalır.
+
+Worker çalışmıyorsa (lifespan dışında, ör. testler) ya da debounce 0 ise
+notify() üretimi çağıranın thread'inde senkron yapar (eski davranış).
+Açılışta bir üretim kuyruğa alınır: önceki süreç bekleyen değişiklikle
+kapandıysa generated dosyalar yakalanır (artımlı olduğu için değişiklik yoksa no-op).
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from async_utils import run_blocking
+from routers._generator import GenerateResult
+
+log = logging.getLogger(__name__)
+
+
+class GenerationWorker:
+    def __init__(self, generate: Callable[..., GenerateResult], debounce: float, max_delay: float) -> None:
+        self._generate = generate
+        self.debounce = debounce
+        self.max_delay = max(max_delay, debounce)
+        self._lock = threading.Lock()        # aşağıdaki durum alanları
+        self._run_lock = threading.Lock()    # üretimler sıraya girer
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._pending = 0
+        self._first: Optional[float] = None   # monotonic
+        self._last: Optional[float] = None
+        self._pending_since: Optional[float] = None   # epoch, status için
+        self._running_since: Optional[float] = None
+        self._runs = 0
+        self._last_run: Optional[Dict[str, Any]] = None
+
+    @property
+    def active(self) -> bool:
+        return self._loop is not None and self.debounce > 0
+
+    # ── bildirim ──────────────────────────────────────
+
+    def notify(self) -> Optional[GenerateResult]:
+        """
+        Üretim ihtiyacını bildirir. Worker aktifse None döner (arka planda üretilecek);
+        değilse üretimi hemen yapar ve sonucunu döner. Herhangi bir thread'den çağrılabilir.
+        """
+        loop, wake = self._loop, self._wake
+        if loop is None or wake is None or self.debounce <= 0:
+            return self._execute("sync")
+        self._mark_pending()
+        loop.call_soon_threadsafe(wake.set)
+        return None
+
+    def _mark_pending(self) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if self._pending == 0:
+                self._first = now
+                self._pending_since = time.time()
+            self._pending += 1
+            self._last = now
+
+    def run_now(self, full: bool = False) -> GenerateResult:
+        """Elle tetiklenen üretim; bekleyen bildirimleri de karşılar."""
+        return self._execute("manual", full=full)
+
+    # ── üretim ────────────────────────────────────────
+
+    def _execute(self, trigger: str, full: bool = False) -> GenerateResult:
+        with self._run_lock:
+            with self._lock:
+                coalesced = self._pending
+                self._pending, self._first, self._last, self._pending_since = 0, None, None, None
+                self._running_since = started = time.time()
+            t0 = time.perf_counter()
+            record: Dict[str, Any] = {"trigger": trigger, "coalesced": coalesced, "started_at": started}
+            try:
+                result = self._generate(full=full)
+            except Exception as e:
+                record["error"] = str(e)
+                raise
+            else:
+                record.update({
+                    "generated_checks":    result.count,
+                    "rendered_namespaces": len(result.rendered),
+                    "removed_namespaces":  len(result.removed),
+                    "written":             result.written,
+                    "files":               result.files,
+                })
+                return result
+            finally:
+                record["finished_at"] = time.time()
+                record["duration_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+                with self._lock:
+                    self._running_since = None
+                    self._runs += 1
+                    self._last_run = record
+
+    def _due_in(self) -> Optional[float]:
+        """Bekleyen iş yoksa None; varsa üretime kalan süre (sn)."""
+        with self._lock:
+            if not self._pending or self._first is None or self._last is None:
+                return None
+            due = min(self._last + self.debounce, self._first + self.max_delay)
+        return max(0.0, due - time.monotonic())
+
+    async def run(self) -> None:
+        """App lifespan'inden başlatılır; iptal edilene kadar çalışır."""
+        self._wake = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
+        self._mark_pending()
+        self._wake.set()
+        try:
+            while True:
+                await self._wake.wait()
+                self._wake.clear()
+                delay = self._due_in()
+                while delay:
+                    await asyncio.sleep(delay)
+                    delay = self._due_in()
+                if delay is None:
+                    continue
+                try:
+                    await run_blocking(self._execute, "debounced")
+                except Exception:
+                    log.exception("generated checks regeneration failed")
+        finally:
+            self._loop = self._wake = None
+            # Kapanırken bekleyen değişiklik kaybolmasın
+            if self._due_in() is not None:
+                try:
+                    self._execute("shutdown")
+                except Exception:
+                    log.exception("generated checks regeneration failed on shutdown")
+
+    # ── durum ─────────────────────────────────────────
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "mode":            "debounced" if self.active else "sync",
+                "debounce_ms":     round(self.debounce * 1000, 1),
+                "max_delay_ms":    round(self.max_delay * 1000, 1),
+                "pending":         self._pending > 0,
+                "pending_changes": self._pending,
+                "pending_since":   self._pending_since,
+                "running":         self._running_since is not None,
+                "running_since":   self._running_since,
+                "runs":            self._runs,
+                "last":            dict(self._last_run) if self._last_run else None,
+            }
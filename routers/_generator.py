@@ -0,0 +1,429 @@
+"""
+generated/ocp_pod_health.yaml için artımlı üretim.
+
+Her conf.d/<ns>.conf için bir manifest kaydı tutulur: dosyanın parmak izi
+(mtime_ns, size, inode), içerik hash'i, bağlı olduğu cluster'ların observe.yaml
+girdilerinin hash'i ve o namespace'in render edilmiş yaml parçası. generate()
+yalnızca parmak izi değişen conf dosyalarını okur, yalnızca kaynağı ya da
+cluster girdisi değişen namespace'leri yeniden render eder; çıktı parçaların
+birleşimidir ve tam yaml.dump ile byte-byte aynıdır. İçerik değişmediyse dosyaya
+hiç yazılmaz (engine ve katalog mtime değişikliği görmez).
+
+Manifest generated/.ocp_pod_health.manifest.json olarak çıktıyla birlikte
+atomik yazılır; böylece restart sonrası ve diğer worker'lar da artımlı devam eder.
+
+İki çıktı düzeni vardır (GENERATED_LAYOUT):
+  single  — tek generated/ocp_pod_health.yaml (varsayılan, eski düzen)
+  sharded — cluster başına generated/ocp_pod_health/<cluster>.yaml; bir namespace
+            değişikliği yalnızca kendi cluster'larının shard'larını yeniden yazar.
+Düzen değiştirildiğinde ilk üretim yeni düzenin dosyalarını yazar ve eski düzenin
+dosyalarını aynı atomik adımda siler (tek dosya ↔ shard dizini geçişi).
+
+İki üretim modu vardır (GENERATED_MODE):
+  per_namespace    — namespace × cluster başına bir ocp_pod_health check'i (eski davranış)
+  cluster_snapshot — cluster başına tek ocp_cluster_snapshot check'i; namespace'ler
+                     params.namespaces listesinde kendi notify/severity ayarlarıyla yer alır.
+                     Engine cluster başına tek OCP API çağrısı ve tek state satırı üretir.
+Snapshot modunda namespace kaydı render edilmiş metin yerine namespace girdisini
+tutar; yalnızca girdileri değişen cluster'ların check'i yeniden render edilir.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from routers._atomic import atomic_write_many, file_lock, file_locks
+from routers._check_catalog import Fingerprint, catalog, dump_yaml, file_fingerprint, load_yaml
+from routers._conf import is_true, parse_conf
+
+# Render mantığı değişirse artır: eski manifest'teki parçalar geçersiz sayılır
+GENERATOR_VERSION = 3
+
+LAYOUTS = ("single", "sharded")
+MODES = ("per_namespace", "cluster_snapshot")
+
+_HEADER = "checks:\n"
+_EMPTY = "checks: []\n"
+
+def _sha(data: bytes) -> str:
+    return hashlib.sha1(data).hexdigest()
+
+
+def _json_sha(obj: Any) -> str:
+    return _sha(json.dumps(obj, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode())
+
+
+def _cluster_inputs(c: Dict[str, Any]) -> Dict[str, Any]:
+    """Üretimde kullanılan cluster alanları; prometheus_url vb. değişimi yeniden üretim tetiklemez."""
+    return {"ocp_api": c.get("ocp_api", ""), "insecure": bool(c.get("insecure", True))}
+
+
+def _split_clusters(raw: Optional[str]) -> List[str]:
+    return [c.strip() for c in (raw or "").split(",") if c.strip()]
+
+
+def _ns_settings(ns: str, ns_cfg: Dict[str, str]) -> Dict[str, Any]:
+    """Namespace'in alarm ayarları ve notify yönlendirmesi (her iki modda ortak)."""
+    zbx  = is_true(ns_cfg.get("ZABBIX_ENABLED"))
+    mail = is_true(ns_cfg.get("MAIL_ENABLED"))
+
+    if zbx and mail:
+        primary, fallback = ["zabbix"], ["dev_smtp", "smtp", "dev_outbox"]
+    elif zbx:
+        primary, fallback = ["zabbix"], ["dev_smtp", "dev_outbox"]
+    elif mail:
+        primary, fallback = ["smtp"], ["dev_smtp", "dev_outbox"]
+    else:
+        primary, fallback = ["dev_outbox"], []
+
+    return {
+        "node":       ns_cfg.get("NODE", "OCP"),
+        "department": ns_cfg.get("DEPARTMENT", "UNKNOWN"),
+        "severity":   ns_cfg.get("SEVERITY", "5"),
+        "alertgroup": ns_cfg.get("ALERTGROUP", f"{ns}AlertGroup"),
+        "alertkey":   ns_cfg.get("POD_HEALTH_ALERTKEY", "OCP_POD_HEALTH"),
+        "primary":    primary,
+        "fallback":   fallback,
+    }
+
+
+def _target_clusters(ns_cfg: Dict[str, str], obs_clusters: Dict[str, Dict[str, Any]]) -> List[str]:
+    """Namespace açıksa, observe.yaml'da ocp_api'si tanımlı cluster'ları (conf sırasıyla)."""
+    if not is_true(ns_cfg.get("NAMESPACE_ENABLED")):
+        return []
+    return [
+        cl for cl in _split_clusters(ns_cfg.get("CLUSTERS"))
+        if (obs_clusters.get(cl) or {}).get("ocp_api", "")
+    ]
+
+
+def _connection_params(cl: str, cl_data: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "cluster": cl,
+        "ocp_api": cl_data.get("ocp_api", ""),
+        "ocp_token_file": f"/secrets/{cl}.token",
+        "ocp_insecure": "true" if cl_data.get("insecure", True) else "false",
+        "timeout_sec": "30",
+    }
+
+
+def pod_health_checks(ns: str, ns_cfg: Dict[str, str], obs_clusters: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Tek namespace'in ocp_pod_health check'leri (conf.d + observe.yaml cluster'ları)."""
+    st = _ns_settings(ns, ns_cfg)
+    checks = []
+    for cl in _target_clusters(ns_cfg, obs_clusters):
+        checks.append({
+            "name": f"ocp_pod_health__{ns}__{cl}",
+            "type": "ocp_pod_health",
+            "enabled": True,
+            "params": {
+                "namespace": ns,
+                **_connection_params(cl, obs_clusters[cl]),
+                "node": st["node"],
+                "department": st["department"],
+                "severity": st["severity"],
+                "alertgroup": st["alertgroup"],
+                "alertkey": st["alertkey"],
+            },
+            # Kopya: paylaşılan listeler dump'ta &id001 anchor'ı üretir ve numaralar
+            # önceki namespace'lere bağlı kayardı
+            "notify": {"primary": list(st["primary"]), "fallback": list(st["fallback"])},
+        })
+    return checks
+
+
+def snapshot_members(ns: str, ns_cfg: Dict[str, str], obs_clusters: Dict[str, Dict[str, Any]]) -> List[Tuple[str, Dict[str, Any]]]:
+    """Namespace'in her hedef cluster için ocp_cluster_snapshot params.namespaces girdisi."""
+    st = _ns_settings(ns, ns_cfg)
+    return [(cl, {
+        "namespace": ns,
+        "node": st["node"],
+        "department": st["department"],
+        "severity": st["severity"],
+        "alertgroup": st["alertgroup"],
+        "alertkey": st["alertkey"],
+        "notify": {"primary": list(st["primary"]), "fallback": list(st["fallback"])},
+    }) for cl in _target_clusters(ns_cfg, obs_clusters)]
+
+
+def cluster_snapshot_check(cl: str, cl_data: Dict[str, Any], members: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return {
+        "name": f"ocp_cluster_snapshot__{cl}",
+        "type": "ocp_cluster_snapshot",
+        "enabled": True,
+        "params": {**_connection_params(cl, cl_data), "namespaces": members},
+    }
+
+
+def _deps(clusters: List[str], cluster_sha: Dict[str, str]) -> str:
+    return _json_sha([[cl, cluster_sha.get(cl)] for cl in clusters])
+
+
+def render_fragment(chk: Dict[str, Any]) -> str:
+    """`checks:` listesinin tek check'e düşen kısmı; parçaların birleşimi tam dump'a eşittir."""
+    return dump_yaml({"checks": [chk]})[len(_HEADER):]
+
+
+def join_fragments(fragments: List[str]) -> str:
+    body = "".join(fragments)
+    return _HEADER + body if body else _EMPTY
+
+
+@dataclass
+class _NsEntry:
+    fingerprint: Fingerprint
+    source: str                 # conf dosyası içerik hash'i
+    clusters: List[str]         # conf'taki CLUSTERS (namespace kapalıysa boş)
+    deps: str                   # bu cluster'ların observe.yaml girdilerinin hash'i
+    # (cluster, parça), conf'taki cluster sırasıyla. per_namespace: render edilmiş check;
+    # cluster_snapshot: params.namespaces girdisi (dict)
+    parts: List[Tuple[str, Any]]
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "fingerprint": list(self.fingerprint), "source": self.source, "clusters": self.clusters,
+            "deps": self.deps, "parts": [list(p) for p in self.parts],
+        }
+
+    @classmethod
+    def from_json(cls, d: Dict[str, Any]) -> "_NsEntry":
+        return cls(
+            tuple(d["fingerprint"]), d["source"], list(d["clusters"]),  # type: ignore[arg-type]
+            d["deps"], [(str(cl), part) for cl, part in d["parts"]],
+        )
+
+
+def shard_name(cluster: str) -> str:
+    """Cluster adından shard dosya adı; yol ayırıcı ve gizli dosya adı üretmez."""
+    name = cluster.replace("/", "_").replace("\\", "_")
+    return f"_{name}.yaml" if name.startswith(".") else f"{name}.yaml"
+
+
+@dataclass
+class GenerateResult:
+    count: int
+    written: bool
+    rendered: List[str] = field(default_factory=list)   # yeniden render edilen namespace'ler
+    removed: List[str] = field(default_factory=list)
+    files: List[str] = field(default_factory=list)      # yazılan/silinen çıktı dosyaları
+
+
+class PodHealthGenerator:
+    def __init__(
+        self, conf_d: Path, observe_path: Path, output: Path,
+        layout: str = "single", mode: str = "per_namespace",
+    ) -> None:
+        if layout not in LAYOUTS:
+            raise ValueError(f"unknown generated layout: {layout!r}")
+        if mode not in MODES:
+            raise ValueError(f"unknown generated mode: {mode!r}")
+        self.conf_d = conf_d
+        self.observe_path = observe_path
+        self.output = output
+        self.shard_dir = output.parent / output.stem
+        self.layout = layout
+        self.mode = mode
+        self.manifest_path = output.parent / f".{output.stem}.manifest.json"
+        self._lock = threading.Lock()
+        self._entries: Dict[str, _NsEntry] = {}
+        # çıktı dosyası → son yazılan içeriğin hash'i / yazım sonrası parmak izi
+        self._outputs: Dict[Path, str] = {}
+        self._output_fps: Dict[Path, Fingerprint] = {}
+        # snapshot modu: cluster → (girdilerin hash'i, render edilmiş check)
+        self._snapshots: Dict[str, Tuple[str, str]] = {}
+        self._manifest_fp: Optional[Fingerprint] = None
+        self._observe: Tuple[Optional[Fingerprint], Dict[str, Dict[str, Any]]] = (None, {})
+
+    # ── manifest ──────────────────────────────────────
+
+    def _load_manifest(self) -> None:
+        """Disk'teki manifest başka bir worker/önceki süreç tarafından yazıldıysa onu al."""
+        fp = file_fingerprint(self.manifest_path)
+        if fp == self._manifest_fp:
+            return
+        self._manifest_fp = fp
+        self._entries, self._outputs, self._snapshots = {}, {}, {}
+        if fp is None:
+            return
+        try:
+            data = json.loads(self.manifest_path.read_text(encoding="utf-8"))
+            if data.get("version") != GENERATOR_VERSION:
+                return
+            self._outputs = {self.output.parent / rel: sha for rel, sha in data["outputs"].items()}
+            # Mod değiştiyse namespace parçaları geçersiz; çıktı kayıtları eski dosyaları silmek için kalır
+            if data.get("mode") == self.mode:
+                self._entries = {ns: _NsEntry.from_json(e) for ns, e in data["namespaces"].items()}
+                self._snapshots = {cl: (key, frag) for cl, (key, frag) in data["snapshots"].items()}
+        except (OSError, ValueError, KeyError, TypeError):
+            self._entries, self._outputs, self._snapshots = {}, {}, {}
+
+    def _manifest_text(self) -> str:
+        return json.dumps({
+            "version": GENERATOR_VERSION,
+            "layout": self.layout,
+            "mode": self.mode,
+            "snapshots": {cl: list(v) for cl, v in self._snapshots.items()},
+            "outputs": {str(p.relative_to(self.output.parent)): sha for p, sha in self._outputs.items()},
+            "namespaces": {ns: e.to_json() for ns, e in self._entries.items()},
+        }, ensure_ascii=False, sort_keys=True)
+
+    # ── inputs ────────────────────────────────────────
+
+    def _observe_clusters(self) -> Dict[str, Dict[str, Any]]:
+        fp = file_fingerprint(self.observe_path)
+        if fp is not None and fp == self._observe[0]:
+            return self._observe[1]
+        clusters: Dict[str, Dict[str, Any]] = {}
+        if fp is not None:
+            data = load_yaml(self.observe_path.read_text()) or {}
+            raw = data.get("clusters", [])
+            for c in raw if isinstance(raw, list) else []:
+                if isinstance(c, dict) and c.get("name"):
+                    clusters[c["name"]] = c
+        self._observe = (fp, clusters)
+        return clusters
+
+    # ── generation ────────────────────────────────────
+
+    def generate(self, full: bool = False) -> GenerateResult:
+        # Manifest kilidi üretimleri (süreçler arası) sıraya sokar; çıktı dosyaları
+        # /api/checks'in kullandığı dosya başına kilitlerle yalnızca karşılaştırma+yazma
+        # sırasında, değişiklik kümesinin tamamı üzerinden tutulur.
+        with self._lock, file_lock(self.manifest_path):
+            self._load_manifest()
+            if full:
+                self._entries, self._snapshots = {}, {}
+            obs = self._observe_clusters()
+            cluster_sha = {name: _json_sha(_cluster_inputs(c)) for name, c in obs.items()}
+
+            result = GenerateResult(count=0, written=False)
+            dirty = False
+            entries: Dict[str, _NsEntry] = {}
+            for conf in sorted(self.conf_d.glob("*.conf")) if self.conf_d.exists() else []:
+                ns = conf.stem
+                fp = file_fingerprint(conf)
+                if fp is None:
+                    continue
+                entry = self._entries.get(ns)
+                raw: Optional[bytes] = None
+                if entry is not None and entry.fingerprint != fp:
+                    raw = conf.read_bytes()
+                    if _sha(raw) == entry.source:
+                        entry.fingerprint, dirty = fp, True    # yalnızca touch
+                    else:
+                        entry = None
+                if entry is not None and entry.deps == _deps(entry.clusters, cluster_sha):
+                    entries[ns] = entry
+                    continue
+                if raw is None:
+                    raw = conf.read_bytes()
+                ns_cfg = parse_conf(raw.decode("utf-8", errors="ignore"))
+                # Kapalı namespace cluster değişikliklerinden etkilenmez
+                clusters = _split_clusters(ns_cfg.get("CLUSTERS")) if is_true(ns_cfg.get("NAMESPACE_ENABLED")) else []
+                if self.mode == "cluster_snapshot":
+                    parts: List[Tuple[str, Any]] = snapshot_members(ns, ns_cfg, obs)
+                else:
+                    parts = [(c["params"]["cluster"], render_fragment(c)) for c in pod_health_checks(ns, ns_cfg, obs)]
+                entries[ns] = _NsEntry(
+                    fingerprint=fp,
+                    source=_sha(raw),
+                    clusters=clusters,
+                    deps=_deps(clusters, cluster_sha),
+                    parts=parts,
+                )
+                result.rendered.append(ns)
+
+            result.removed = sorted(set(self._entries) - set(entries))
+            self._entries = entries
+            units = self._units(obs)
+            result.count = len(units)
+
+            outputs = self._render_outputs(units)
+            changes: Dict[Path, Optional[str]] = {}
+            with file_locks(outputs):
+                for path, text in outputs.items():
+                    if text is None:
+                        self._outputs.pop(path, None)
+                        if path.exists():
+                            changes[path] = None
+                        continue
+                    sha = _sha(text.encode("utf-8"))
+                    if sha != self._outputs.get(path) or not self._output_matches(path, sha):
+                        self._outputs[path] = sha
+                        changes[path] = text
+                if changes:
+                    changes[self.manifest_path] = self._manifest_text()
+                    atomic_write_many(changes)
+                    del changes[self.manifest_path]
+                    for path in changes:
+                        fp = file_fingerprint(path)
+                        if fp is None:
+                            self._output_fps.pop(path, None)
+                        else:
+                            self._output_fps[path] = fp
+                    result.written = True
+                    result.files = sorted(str(p.relative_to(self.output.parent)) for p in changes)
+                elif dirty or result.rendered or result.removed:
+                    atomic_write_many({self.manifest_path: self._manifest_text()})
+            self._manifest_fp = file_fingerprint(self.manifest_path)
+        for path in changes:
+            catalog.invalidate(path)
+        return result
+
+    def _units(self, obs: Dict[str, Dict[str, Any]]) -> List[Tuple[str, str]]:
+        """Çıktıya girecek (cluster, render edilmiş check) parçaları, dosyadaki sırasıyla."""
+        if self.mode == "per_namespace":
+            return [part for e in self._entries.values() for part in e.parts]
+
+        members: Dict[str, List[Dict[str, Any]]] = {}
+        for entry in self._entries.values():
+            for cl, member in entry.parts:
+                members.setdefault(cl, []).append(member)
+        snapshots: Dict[str, Tuple[str, str]] = {}
+        for cl in sorted(members):
+            cl_data = obs.get(cl, {})
+            key = _json_sha([_cluster_inputs(cl_data), members[cl]])
+            cached = self._snapshots.get(cl)
+            if cached is None or cached[0] != key:
+                cached = (key, render_fragment(cluster_snapshot_check(cl, cl_data, members[cl])))
+            snapshots[cl] = cached
+        self._snapshots = snapshots
+        return [(cl, frag) for cl, (_, frag) in snapshots.items()]
+
+    def _render_outputs(self, units: List[Tuple[str, str]]) -> Dict[Path, Optional[str]]:
+        """Seçili düzenin dosyaları ve içerikleri; diğer düzenden kalan dosyalar None (silinecek)."""
+        stale_shards = sorted(self.shard_dir.glob("*.yaml")) if self.shard_dir.exists() else []
+        out: Dict[Path, Optional[str]] = {}
+        if self.layout == "single":
+            out[self.output] = join_fragments([frag for _, frag in units])
+            for path in stale_shards:
+                out[path] = None
+            return out
+
+        by_cluster: Dict[str, List[str]] = {}
+        for cl, frag in units:
+            by_cluster.setdefault(cl, []).append(frag)
+        for cl in sorted(by_cluster):
+            out[self.shard_dir / shard_name(cl)] = join_fragments(by_cluster[cl])
+        for path in stale_shards + [self.output]:
+            out.setdefault(path, None)
+        return out
+
+    def _output_matches(self, path: Path, sha: str) -> bool:
+        """Çıktı dosyası elle değiştirilmiş/silinmiş olabilir; son yazdığımızdan beri değiştiyse içeriği doğrula."""
+        fp = file_fingerprint(path)
+        if fp is None:
+            return False
+        if fp == self._output_fps.get(path):
+            return True
+        try:
+            ok = _sha(path.read_bytes()) == sha
+        except OSError:
+            return False
+        if ok:
+            self._output_fps[path] = fp
+        return ok
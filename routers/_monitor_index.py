@@ -0,0 +1,177 @@
+"""
+Monitor endpoint'leri için süreç içi alarm_state snapshot index'i.
+
+Decode edilmiş snapshot satırları (cluster, namespace) anahtarıyla tutulur.
+refresh() önce state_db.change_token() (PRAGMA data_version) ile DB'de commit olup
+olmadığına bakar; olduysa payload'ları okumadan yalnızca satır sürümlerini
+(last_change_ts, last_sent_ts, length(payload_json)) okur ve payload'ı yalnızca
+sürümü değişen satırlar için çeker ve decode eder.
+
+Engine status ve zaman damgaları değişmeden payload'ı aynı uzunlukta yeniden
+yazabilir (ör. timestamp_utc); bunu kaçırmamak için en geç FULL_SCAN_SEC'te bir
+tüm payload'lar hash ile karşılaştırılır.
+"""
+from __future__ import annotations
+
+import json
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import state_db
+from state_db import read_conn
+
+Pair = Tuple[str, str]   # (cluster, namespace)
+
+FULL_SCAN_SEC = 60.0
+_FETCH_CHUNK  = 500
+
+
+def row_from_payload(last_status: str, payload_json: str) -> Optional[Dict[str, Any]]:
+    """alarm_state payload'ını monitor satırına çevirir; bozuk JSON'da None."""
+    try:
+        data = json.loads(payload_json)
+    except Exception:
+        return None
+    if not isinstance(data, dict):
+        return None
+    ev = data.get("evidence") or {}
+    if not isinstance(ev, dict):
+        return None
+    return {
+        "namespace":     ev.get("namespace", ""),
+        "cluster":       ev.get("cluster", ""),
+        "status":        data.get("status", last_status),
+        "timestamp_utc": data.get("timestamp_utc", ""),
+        "pods":          ev.get("pods", []),
+        "alarm_name":    data.get("alarm_name", ""),
+        "severity":      data.get("severity", ""),
+    }
+
+
+class SnapshotIndex:
+    def __init__(self, full_scan_sec: float = FULL_SCAN_SEC) -> None:
+        self.full_scan_sec = full_scan_sec
+        self._lock = threading.Lock()
+        self._token: Any = object()
+        self._full_at = 0.0                                    # son tam tarama (monotonic)
+        self._versions: Dict[str, Tuple[Any, Any, int]] = {}   # dedup_key → (last_change_ts, last_sent_ts, uzunluk)
+        self._hashes: Dict[str, int] = {}                      # dedup_key → hash(payload_json)
+        self._rows: Dict[str, Dict[str, Any]] = {}             # dedup_key → satır
+        self._by_pair: Dict[Pair, Dict[str, Dict[str, Any]]] = {}
+
+    # ── maintenance ───────────────────────────────────
+
+    def _drop(self, key: str) -> None:
+        row = self._rows.pop(key, None)
+        self._versions.pop(key, None)
+        self._hashes.pop(key, None)
+        if row is None:
+            return
+        pair = (row["cluster"], row["namespace"])
+        bucket = self._by_pair.get(pair)
+        if bucket is not None:
+            bucket.pop(key, None)
+            if not bucket:
+                del self._by_pair[pair]
+
+    def _put(self, key: str, version: Tuple[Any, Any, int], status: str, pjson: str) -> None:
+        self._drop(key)
+        self._versions[key] = version
+        self._hashes[key] = hash(pjson)
+        row = row_from_payload(status, pjson)
+        if row is None:
+            return
+        self._rows[key] = row
+        self._by_pair.setdefault((row["cluster"], row["namespace"]), {})[key] = row
+
+    @staticmethod
+    def _fetch_payloads(conn: Any, keys: List[str]) -> Iterable[Tuple[str, str, Any, Any, str]]:
+        for i in range(0, len(keys), _FETCH_CHUNK):
+            chunk = keys[i:i + _FETCH_CHUNK]
+            yield from conn.execute(
+                "SELECT dedup_key, last_status, last_change_ts, last_sent_ts, payload_json "
+                f"FROM alarm_state WHERE dedup_key IN ({','.join('?' * len(chunk))}) "
+                "AND payload_json IS NOT NULL",
+                chunk,
+            )
+
+    def _sync(self, conn: Any, full: bool) -> Tuple[int, Set[str]]:
+        """Değişen satırları index'e yazar; (güncellenen sayısı, DB'deki anahtarlar) döner."""
+        seen: Set[str] = set()
+        dirty = 0
+        if full:
+            for key, status, change_ts, sent_ts, pjson in conn.execute(
+                "SELECT dedup_key, last_status, last_change_ts, last_sent_ts, payload_json "
+                "FROM alarm_state WHERE payload_json IS NOT NULL"
+            ):
+                seen.add(key)
+                version = (change_ts, sent_ts, len(pjson))
+                if self._versions.get(key) == version and self._hashes.get(key) == hash(pjson):
+                    continue
+                self._put(key, version, status, pjson)
+                dirty += 1
+            return dirty, seen
+
+        changed: List[str] = []
+        for key, change_ts, sent_ts, length in conn.execute(
+            "SELECT dedup_key, last_change_ts, last_sent_ts, length(payload_json) "
+            "FROM alarm_state WHERE payload_json IS NOT NULL"
+        ):
+            seen.add(key)
+            if self._versions.get(key) != (change_ts, sent_ts, length):
+                changed.append(key)
+        for key, status, change_ts, sent_ts, pjson in self._fetch_payloads(conn, changed):
+            self._put(key, (change_ts, sent_ts, len(pjson)), status, pjson)
+            dirty += 1
+        return dirty, seen
+
+    def refresh(self) -> bool:
+        """DB değiştiyse index'i günceller; içerik değiştiyse True döner."""
+        token = state_db.change_token()
+        full_due = time.monotonic() - self._full_at >= self.full_scan_sec
+        if token == self._token and not full_due:
+            return False
+
+        with self._lock:
+            full_due = time.monotonic() - self._full_at >= self.full_scan_sec
+            if token == self._token and not full_due:
+                return False
+            seen: Set[str] = set()
+            dirty = 0
+            if token is not None:
+                with read_conn() as conn:
+                    if conn is not None:
+                        dirty, seen = self._sync(conn, full_due)
+            removed = [k for k in self._versions if k not in seen]
+            for key in removed:
+                self._drop(key)
+
+            self._token = token
+            if full_due:
+                self._full_at = time.monotonic()
+            return bool(dirty or removed)
+
+    # ── lookups ───────────────────────────────────────
+
+    def rows(self, cluster: Optional[str] = None, namespace: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Filtreye uyan snapshot satırları. Dönen dict'ler paylaşılır, değiştirilmemeli."""
+        self.refresh()
+        with self._lock:
+            if cluster and namespace:
+                buckets: Iterable[Dict[str, Dict[str, Any]]] = [self._by_pair.get((cluster, namespace), {})]
+            elif cluster:
+                buckets = [b for (cl, _), b in self._by_pair.items() if cl == cluster]
+            elif namespace:
+                buckets = [b for (_, ns), b in self._by_pair.items() if ns == namespace]
+            else:
+                buckets = list(self._by_pair.values())
+            return [row for b in buckets for row in b.values()]
+
+    def pairs(self) -> Set[Pair]:
+        self.refresh()
+        with self._lock:
+            return set(self._by_pair)
+
+
+index = SnapshotIndex()
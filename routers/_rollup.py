@@ -0,0 +1,362 @@
+"""
+alarm_history için artımlı türetilmiş veriler:
+
+  * zaman kovası (1m/5m/1h/1d) rollup'ları  → /api/alarms/history/stats
+  * event_type sayaçları ve değerlendirme süreleri → /api/alarms/metrics
+
+Bildirim sayaçları config'teki METRICS_*_EVENT_TYPES eşlemesinden gelir
+(varsayılan: engine'in yazdığı STATE_CHANGE = gönderilen bildirim). Süre
+metrikleri event tipinden bağımsız olarak payload'daki evaluation_latency_ms
+(yoksa duration_ms) alanından hesaplanır. rules_evaluated_total ve
+evaluation_count_total önceki anlamını korur: alarm_state satır sayısı.
+
+Hepsi API'ye ait ayrı bir SQLite'ta (state/rollup.sqlite) tutulur; böylece
+engine'in yazdığı alarmfw.sqlite'a yazılmaz. refresh() yalnızca son işlenen
+alarm_history.id'den (high-water mark) sonraki satırları okur; run_forever()
+bunu arka planda periyodik çalıştırır. İstek yolu refresh() çağırmaz, yalnızca
+rollup tablolarını okur ve ne kadar güncel olduğunu bildirir.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from async_utils import run_blocking
+from config import ALARMFW_STATE, METRICS_SENT_EVENT_TYPES, METRICS_SUPPRESSED_EVENT_TYPES, ROLLUP_INTERVAL_SEC
+import state_db
+from state_db import read_conn
+
+log = logging.getLogger(__name__)
+
+ROLLUP_DB = ALARMFW_STATE / "rollup.sqlite"
+
+BUCKETS: Dict[str, int] = {"1m": 60, "5m": 300, "1h": 3600, "1d": 86400}
+# Kova boyutu başına saklama süresi (sn), en yeni event'e göre; 0 = süresiz
+BUCKET_RETENTION_SEC: Dict[str, int] = {"1m": 2 * 86400, "5m": 14 * 86400, "1h": 90 * 86400, "1d": 0}
+GROUP_BY = ("status", "cluster", "namespace", "severity")
+
+# alarm_history.event_type → metrik eşlemesi (büyük/küçük harf duyarsız)
+NOTIFY_SENT_TYPES       = set(METRICS_SENT_EVENT_TYPES)
+NOTIFY_SUPPRESSED_TYPES = set(METRICS_SUPPRESSED_EVENT_TYPES)
+
+# Türetilmiş verilerin anlamı değiştiğinde artırılır; açılışta tüm history yeniden işlenir
+ROLLUP_SCHEMA = 2
+
+_BATCH = 5000
+
+_lock = threading.Lock()
+_conn: Optional[sqlite3.Connection] = None
+_metrics: Optional[Dict[str, Any]] = None
+
+
+def _db() -> sqlite3.Connection:
+    global _conn
+    if _conn is None:
+        ROLLUP_DB.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(ROLLUP_DB), timeout=5, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL;")
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS history_rollup (
+                bucket_sec INTEGER NOT NULL,
+                bucket_ts  INTEGER NOT NULL,
+                status     TEXT NOT NULL,
+                cluster    TEXT NOT NULL,
+                namespace  TEXT NOT NULL,
+                severity   TEXT NOT NULL,
+                events     INTEGER NOT NULL,
+                PRIMARY KEY (bucket_sec, bucket_ts, status, cluster, namespace, severity)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS history_counters (
+                name  TEXT PRIMARY KEY,
+                value NUMERIC NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS rollup_meta (
+                key   TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            );
+            DROP TABLE IF EXISTS history_rules;
+        """)
+        if _get_meta(conn, "schema") != ROLLUP_SCHEMA:
+            _clear(conn)
+            _set_meta(conn, "schema", ROLLUP_SCHEMA)
+        conn.commit()
+        _conn = conn
+    return _conn
+
+
+def _get_meta(conn: sqlite3.Connection, key: str) -> int:
+    row = conn.execute("SELECT value FROM rollup_meta WHERE key=?", (key,)).fetchone()
+    return row[0] if row else 0
+
+
+def _set_meta(conn: sqlite3.Connection, key: str, value: int) -> None:
+    conn.execute(
+        "INSERT INTO rollup_meta(key,value) VALUES(?,?) "
+        "ON CONFLICT(key) DO UPDATE SET value=excluded.value",
+        (key, value),
+    )
+
+
+def _clear(conn: sqlite3.Connection) -> None:
+    for table in ("history_rollup", "history_counters"):
+        conn.execute(f"DELETE FROM {table}")
+    conn.execute("DELETE FROM rollup_meta WHERE key != 'schema'")
+
+
+def _read_state_summary() -> Tuple[int, bool]:
+    """alarm_state satır sayısı ve açık PROBLEM/ERROR olup olmadığı."""
+    with read_conn() as conn:
+        if conn is None:
+            return 0, False
+        try:
+            total, problems = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(last_status IN ('PROBLEM','ERROR')), 0) FROM alarm_state"
+            ).fetchone()
+        except sqlite3.OperationalError as e:
+            if "no such table" in str(e):
+                return 0, False
+            raise
+    return total, problems > 0
+
+
+def _fetch_new(last_id: int) -> Optional[Tuple[List[sqlite3.Row], Optional[int]]]:
+    """last_id'den sonraki history satırları ve tablodaki MAX(id). DB yoksa None."""
+    with read_conn() as conn:
+        if conn is None:
+            return None
+        try:
+            max_id = conn.execute("SELECT MAX(id) FROM alarm_history").fetchone()[0]
+            rows = conn.execute(
+                "SELECT id, event_ts, event_type, dedup_key, status, cluster, namespace, severity, "
+                "CASE WHEN json_valid(payload_json) THEN COALESCE("
+                "  json_extract(payload_json, '$.evaluation_latency_ms'),"
+                "  json_extract(payload_json, '$.duration_ms')) END AS latency_ms "
+                "FROM alarm_history WHERE id > ? ORDER BY id LIMIT ?",
+                (last_id, _BATCH),
+            ).fetchall()
+        except sqlite3.OperationalError as e:
+            if "no such table" in str(e):
+                return [], None
+            raise
+    return rows, max_id
+
+
+def _apply_batch(conn: sqlite3.Connection, rows: List[sqlite3.Row]) -> None:
+    buckets: Counter = Counter()
+    counters: Counter = Counter()
+    latency_last: Optional[float] = None
+    last_event_ts = 0
+
+    for r in rows:
+        dims = (r["status"] or "", r["cluster"] or "", r["namespace"] or "", r["severity"] or "")
+        ts = r["event_ts"]
+        for sec in BUCKETS.values():
+            buckets[(sec, ts - ts % sec, *dims)] += 1
+
+        etype = r["event_type"] or ""
+        counters[f"event_type:{etype}"] += 1
+        if etype.upper() in NOTIFY_SENT_TYPES:
+            counters["notifications_sent"] += 1
+        elif etype.upper() in NOTIFY_SUPPRESSED_TYPES:
+            counters["notifications_suppressed"] += 1
+        if r["latency_ms"] is not None:
+            latency_last = float(r["latency_ms"])
+            counters["latency_ms_sum"] += latency_last
+            counters["latency_ms_count"] += 1
+        last_event_ts = max(last_event_ts, ts)
+
+    conn.executemany(
+        "INSERT INTO history_rollup(bucket_sec,bucket_ts,status,cluster,namespace,severity,events) "
+        "VALUES(?,?,?,?,?,?,?) "
+        "ON CONFLICT(bucket_sec,bucket_ts,status,cluster,namespace,severity) "
+        "DO UPDATE SET events = events + excluded.events",
+        [(*k, v) for k, v in buckets.items()],
+    )
+
+    conn.executemany(
+        "INSERT INTO history_counters(name,value) VALUES(?,?) "
+        "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+        list(counters.items()),
+    )
+    replace = {"last_event_ts": last_event_ts}
+    if latency_last is not None:
+        replace["latency_ms_last"] = latency_last
+    conn.executemany(
+        "INSERT INTO history_counters(name,value) VALUES(?,?) "
+        "ON CONFLICT(name) DO UPDATE SET value = "
+        "CASE WHEN name = 'last_event_ts' THEN MAX(value, excluded.value) ELSE excluded.value END",
+        list(replace.items()),
+    )
+
+
+def _build_metrics(
+    conn: sqlite3.Connection, db_present: bool, state_total: int, has_problem: bool,
+) -> Dict[str, Any]:
+    c = dict(conn.execute("SELECT name, value FROM history_counters").fetchall())
+    last_ts = int(c.get("last_event_ts", 0))
+    lat_sum = float(c.get("latency_ms_sum", 0))
+    lat_cnt = int(c.get("latency_ms_count", 0))
+    return {
+        "version": 1 if db_present else 0,
+        "updated_at_utc": (
+            datetime.fromtimestamp(last_ts, tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+            if last_ts else ""
+        ),
+        "rules_evaluated_total": state_total,
+        "notifications_sent_total": int(c.get("notifications_sent", 0)),
+        "notifications_suppressed_total": int(c.get("notifications_suppressed", 0)),
+        "evaluation_count_total": state_total,
+        "evaluation_latency_ms_last": round(float(c.get("latency_ms_last", 0)), 3),
+        "evaluation_latency_ms_sum": round(lat_sum, 3),
+        "evaluation_latency_ms_avg": round(lat_sum / lat_cnt, 3) if lat_cnt else 0,
+        "last_exit_code": 1 if has_problem else 0,
+        "events_by_type": {
+            k.split(":", 1)[1]: int(v) for k, v in c.items() if k.startswith("event_type:")
+        },
+        "history_last_id": _get_meta(conn, "last_id"),
+    }
+
+
+def _prune(conn: sqlite3.Connection) -> None:
+    """Saklama süresini aşan kovaları siler (en yeni event_ts'e göre)."""
+    row = conn.execute("SELECT value FROM history_counters WHERE name='last_event_ts'").fetchone()
+    if not row or not row[0]:
+        return
+    newest = int(row[0])
+    conn.executemany(
+        "DELETE FROM history_rollup WHERE bucket_sec = ? AND bucket_ts < ?",
+        [(BUCKETS[b], newest - keep) for b, keep in BUCKET_RETENTION_SEC.items() if keep > 0],
+    )
+
+
+def refresh() -> int:
+    """Yeni history satırlarını rollup/sayaçlara ekler; işlenen satır sayısını döner."""
+    global _metrics
+    processed = 0
+    db_present = False
+    with _lock:
+        conn = _db()
+        last_id = _get_meta(conn, "last_id")
+        while True:
+            fetched = _fetch_new(last_id)
+            if fetched is None:
+                break
+            db_present = True
+            rows, max_id = fetched
+            if max_id is not None and max_id < last_id:
+                # alarmfw.sqlite yeniden oluşturulmuş; id'ler baştan başlıyor
+                _clear(conn)
+                last_id = 0
+                continue
+            if not rows:
+                break
+
+            _apply_batch(conn, rows)
+            last_id = rows[-1]["id"]
+            _set_meta(conn, "last_id", last_id)
+            conn.commit()
+            processed += len(rows)
+            if len(rows) < _BATCH:
+                break
+        if processed:
+            _prune(conn)
+        if db_present:
+            _set_meta(conn, "refreshed_at", int(time.time()))
+        conn.commit()
+        state_total, has_problem = _read_state_summary() if db_present else (0, False)
+        _metrics = _build_metrics(conn, db_present, state_total, has_problem)
+    return processed
+
+
+def high_water() -> int:
+    """Rollup/sayaçlara işlenmiş en büyük alarm_history.id (hiç işlenmediyse 0)."""
+    with _lock:
+        return _get_meta(_db(), "last_id")
+
+
+def metrics() -> Dict[str, Any]:
+    """
+    Önceden hesaplanmış metrikler. Arka plan görevi henüz çalışmadıysa history
+    işlenmez; saklanan sayaçlar ve alarm_state özetiyle döner.
+    """
+    global _metrics
+    if _metrics is None:
+        state_total, has_problem = _read_state_summary()
+        with _lock:
+            if _metrics is None:
+                _metrics = _build_metrics(_db(), state_db.STATE_DB.exists(), state_total, has_problem)
+    return dict(_metrics)
+
+
+async def run_forever(interval_sec: float) -> None:
+    """refresh()'i arka planda periyodik çalıştırır (app lifespan'inden başlatılır)."""
+    while True:
+        try:
+            await run_blocking(refresh)
+        except Exception:
+            log.exception("history rollup refresh failed")
+        await asyncio.sleep(interval_sec)
+
+
+def query(
+    bucket: str,
+    group_by: str,
+    since_ts: int,
+    until_ts: Optional[int],
+    cluster: Optional[str] = None,
+    namespace: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Kova başına group_by boyutuna göre event sayıları (eski → yeni). Yalnızca rollup
+    tablolarını okur; `refreshed_at`/`stale` arka plan güncellemesinin ne kadar geride olduğunu gösterir.
+    """
+    sec = BUCKETS[bucket]
+    if group_by not in GROUP_BY:
+        raise ValueError(f"group_by must be one of {GROUP_BY}")
+
+    where = ["bucket_sec = ?", "bucket_ts >= ?"]
+    params: List[Any] = [sec, since_ts - since_ts % sec]
+    if until_ts is not None:
+        where.append("bucket_ts <= ?")
+        params.append(until_ts)
+    if cluster:
+        where.append("cluster = ?")
+        params.append(cluster)
+    if namespace:
+        where.append("namespace = ?")
+        params.append(namespace)
+
+    with _lock:
+        conn = _db()
+        rows = conn.execute(
+            f"SELECT bucket_ts, {group_by}, SUM(events) FROM history_rollup "
+            f"WHERE {' AND '.join(where)} "
+            f"GROUP BY bucket_ts, {group_by} ORDER BY bucket_ts",
+            params,
+        ).fetchall()
+        last_id = _get_meta(conn, "last_id")
+        refreshed_at = _get_meta(conn, "refreshed_at")
+
+    series: List[Dict[str, Any]] = []
+    for ts, key, count in rows:
+        if not series or series[-1]["ts"] != ts:
+            series.append({"ts": ts, "counts": {}})
+        series[-1]["counts"][key] = count
+
+    age = round(time.time() - refreshed_at, 1) if refreshed_at else None
+    return {
+        "bucket": bucket,
+        "group_by": group_by,
+        "retention_sec": BUCKET_RETENTION_SEC[bucket] or None,
+        "last_id": last_id,
+        "refreshed_at": refreshed_at or None,
+        "age_sec": age,
+        "stale": age is None or age > 3 * ROLLUP_INTERVAL_SEC,
+        "series": series,
+    }
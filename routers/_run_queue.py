@@ -0,0 +1,225 @@
+"""
+/api/run için kalıcı run kuyruğu.
+
+Her tetikleme state/runs.sqlite'a (API'ye ait, engine'in DB'sinden ayrı) bir
+satır olarak yazılır ve run ID'si alır. Dispatcher sıradaki run'ları id
+sırasıyla başlatır: aynı anda en çok `max_concurrent` run, aynı config
+(lane) için en çok bir run. Biten run thread'i dispatcher'ı yeniden çağırır;
+ayrı bir zamanlayıcı thread'i yoktur.
+
+Süreç yeniden başladığında `running` kalmış satırlar `interrupted` olarak
+kapatılır, `queued` satırlar kaldığı yerden çalıştırılır. Son `keep` run
+dışındaki bitmiş kayıtlar budanır.
+"""
+from __future__ import annotations
+
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+log = logging.getLogger(__name__)
+
+STATUSES = ("queued", "running", "done", "error", "timeout", "interrupted")
+FINISHED = ("done", "error", "timeout", "interrupted")
+
+# Liste cevaplarında çıktıdan gösterilen son karakterler
+EXCERPT_CHARS = 500
+
+# execute(config) → {"status", "exit_code", "stdout", "stderr"}
+Executor = Callable[[str], Dict[str, Any]]
+
+
+def _excerpt(text: Optional[str]) -> str:
+    text = text or ""
+    return text if len(text) <= EXCERPT_CHARS else "…" + text[-EXCERPT_CHARS:]
+
+
+class RunQueue:
+    def __init__(self, db_path: Path, execute: Executor, max_concurrent: int = 2, keep: int = 500) -> None:
+        self.db_path = db_path
+        self._execute = execute
+        self.max_concurrent = max(1, max_concurrent)
+        self.keep = keep
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    # ── storage ───────────────────────────────────────
+
+    def _db(self) -> sqlite3.Connection:
+        """Lazy açılış; ilk açılışta yarım kalmış run'lar kapatılır. self._lock altında çağrılır."""
+        if self._conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.db_path), timeout=5, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL;")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS runs (
+                    id           INTEGER PRIMARY KEY AUTOINCREMENT,
+                    config       TEXT NOT NULL,
+                    lane         TEXT NOT NULL,
+                    status       TEXT NOT NULL,
+                    exit_code    INTEGER,
+                    created_at   REAL NOT NULL,
+                    started_at   REAL,
+                    finished_at  REAL,
+                    duration_sec REAL,
+                    stdout       TEXT,
+                    stderr       TEXT
+                );
+                CREATE INDEX IF NOT EXISTS idx_runs_status ON runs(status, id);
+            """)
+            conn.execute(
+                "UPDATE runs SET status='interrupted', exit_code=-1, finished_at=?, "
+                "stderr=COALESCE(stderr, '') || 'API restarted while the run was in progress' "
+                "WHERE status='running'",
+                (time.time(),),
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def _row(row: sqlite3.Row, full: bool = True) -> Dict[str, Any]:
+        d = dict(row)
+        if not full:
+            d["stdout"], d["stderr"] = _excerpt(d["stdout"]), _excerpt(d["stderr"])
+        return d
+
+    # ── public ────────────────────────────────────────
+
+    def start(self) -> None:
+        """Açılışta: DB'yi aç, restart'tan kalan kuyruğu çalıştırmaya başla."""
+        self._dispatch()
+
+    def submit(self, config: str) -> Dict[str, Any]:
+        """
+        Run'ı kuyruğa ekler. Aynı config için henüz başlamamış bir run varsa yenisi
+        açılmaz, o döner ("coalesced": True) — patlama halinde kuyruk şişmez.
+        """
+        with self._lock:
+            conn = self._db()
+            row = conn.execute(
+                "SELECT * FROM runs WHERE lane=? AND status='queued' ORDER BY id LIMIT 1", (config,),
+            ).fetchone()
+            coalesced = row is not None
+            if row is None:
+                cur = conn.execute(
+                    "INSERT INTO runs(config, lane, status, created_at) VALUES(?,?,'queued',?)",
+                    (config, config, time.time()),
+                )
+                self._prune(conn)
+                conn.commit()
+                row = conn.execute("SELECT * FROM runs WHERE id=?", (cur.lastrowid,)).fetchone()
+            run_id = row["id"]
+        self._dispatch()
+        run = self.get(run_id) or {}
+        run["coalesced"] = coalesced
+        return run
+
+    def get(self, run_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            conn = self._db()
+            row = conn.execute("SELECT * FROM runs WHERE id=?", (run_id,)).fetchone()
+            if row is None:
+                return None
+            run = self._row(row)
+            if run["status"] == "queued":
+                run["position"] = conn.execute(
+                    "SELECT COUNT(*) FROM runs WHERE status='queued' AND id<?", (run_id,),
+                ).fetchone()[0]
+            return run
+
+    def last(self) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db().execute("SELECT * FROM runs ORDER BY id DESC LIMIT 1").fetchone()
+            return self._row(row) if row else None
+
+    def history(
+        self, limit: int = 50, status: Optional[str] = None, config: Optional[str] = None,
+        before_id: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Yeniden eskiye run'lar; çıktılar yalnızca son EXCERPT_CHARS karakterle."""
+        where: List[str] = []
+        params: List[Any] = []
+        if status is not None:
+            where.append("status = ?")
+            params.append(status)
+        if config is not None:
+            where.append("config = ?")
+            params.append(config)
+        if before_id is not None:
+            where.append("id < ?")
+            params.append(before_id)
+        sql = "SELECT * FROM runs"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY id DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            return [self._row(r, full=False) for r in self._db().execute(sql, params)]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = dict(self._db().execute("SELECT status, COUNT(*) FROM runs GROUP BY status").fetchall())
+        return {"max_concurrent": self.max_concurrent, **{s: counts.get(s, 0) for s in STATUSES}}
+
+    # ── dispatch ──────────────────────────────────────
+
+    def _prune(self, conn: sqlite3.Connection) -> None:
+        if self.keep <= 0:
+            return
+        conn.execute(
+            f"DELETE FROM runs WHERE status IN ({','.join('?' * len(FINISHED))}) AND id <= "
+            "(SELECT id FROM runs ORDER BY id DESC LIMIT 1 OFFSET ?)",
+            (*FINISHED, self.keep),
+        )
+
+    def _dispatch(self) -> None:
+        """Boş slot ve boş lane olduğu sürece sıradaki run'ları başlatır."""
+        started: List[sqlite3.Row] = []
+        with self._lock:
+            conn = self._db()
+            busy = {r["lane"] for r in conn.execute("SELECT lane FROM runs WHERE status='running'")}
+            slots = self.max_concurrent - len(busy)
+            if slots <= 0:
+                return
+            for row in conn.execute("SELECT * FROM runs WHERE status='queued' ORDER BY id").fetchall():
+                if slots <= 0:
+                    break
+                if row["lane"] in busy:
+                    continue
+                conn.execute(
+                    "UPDATE runs SET status='running', started_at=? WHERE id=?", (time.time(), row["id"]),
+                )
+                busy.add(row["lane"])
+                started.append(row)
+                slots -= 1
+            conn.commit()
+        for row in started:
+            threading.Thread(
+                target=self._work, args=(row["id"], row["config"]), name=f"run-{row['id']}", daemon=True,
+            ).start()
+
+    def _work(self, run_id: int, config: str) -> None:
+        t0 = time.monotonic()
+        try:
+            result = self._execute(config)
+        except Exception as e:
+            log.exception("run %s failed", run_id)
+            result = {"status": "error", "exit_code": -1, "stdout": "", "stderr": str(e)}
+        with self._lock:
+            conn = self._db()
+            conn.execute(
+                "UPDATE runs SET status=?, exit_code=?, stdout=?, stderr=?, finished_at=?, duration_sec=? "
+                "WHERE id=?",
+                (
+                    result.get("status", "done"), result.get("exit_code"),
+                    result.get("stdout", ""), result.get("stderr", ""),
+                    time.time(), round(time.monotonic() - t0, 2), run_id,
+                ),
+            )
+            conn.commit()
+        self._dispatch()
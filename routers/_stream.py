@@ -0,0 +1,221 @@
+"""
+/api/alarms/stream için paylaşılan alarm event yayıncısı.
+
+Süreç başına tek bir poller alarm_history'deki yeni satırları (id > son görülen)
+ve alarm_state'teki değişiklikleri okur, bağlı tüm istemcilere dağıtır. Her
+istemcinin kuyruğu sınırlıdır; yetişemeyen istemci düşürülür ve Last-Event-ID ile
+yeniden bağlanıp kaçırdığı history event'lerini DB'den tekrar alır.
+
+Replay, abonelikten sonra REPLAY_LIMIT'lik parçalarla tablonun sonuna kadar
+sürer; böylece canlı yayının başladığı id'ye kadar boşluk kalmaz. İstemci
+REPLAY_MAX_EVENTS'ten fazla geride ise replay kesilir ve `event: reset`
+gönderilir; istemci listeyi baştan yüklemelidir.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import sqlite3
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+
+from async_utils import run_blocking
+from state_db import read_conn
+
+log = logging.getLogger(__name__)
+
+POLL_INTERVAL_SEC = 1.0
+QUEUE_SIZE        = 256
+REPLAY_LIMIT      = 1000
+REPLAY_MAX_EVENTS = 10000
+_BATCH            = 500
+
+
+def _history_entry(row: sqlite3.Row) -> Dict[str, Any]:
+    entry = dict(row)
+    raw_payload = entry.pop("payload_json", None)
+    if raw_payload:
+        try:
+            entry["payload"] = json.loads(raw_payload)
+        except Exception:
+            pass
+    return entry
+
+
+def format_sse(event: str, data: Dict[str, Any], event_id: Optional[int] = None) -> str:
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append("data: " + json.dumps(data, ensure_ascii=False, separators=(",", ":")))
+    return "\n".join(lines) + "\n\n"
+
+
+def _read_history_after(last_id: int, limit: int) -> List[Dict[str, Any]]:
+    with read_conn() as conn:
+        if conn is None:
+            return []
+        try:
+            rows = conn.execute(
+                "SELECT * FROM alarm_history WHERE id > ? ORDER BY id LIMIT ?", (last_id, limit)
+            ).fetchall()
+        except sqlite3.OperationalError as e:
+            if "no such table" in str(e):
+                return []
+            raise
+    return [_history_entry(r) for r in rows]
+
+
+# Kuyruk elemanı: (history id'si veya None, SSE mesajı)
+Message = Tuple[Optional[int], str]
+
+
+def replay_history(last_id: int) -> List[Message]:
+    """last_id'den sonraki history event'lerinin bir parçası (en fazla REPLAY_LIMIT)."""
+    return [(e["id"], format_sse("history", e, e["id"])) for e in _read_history_after(last_id, REPLAY_LIMIT)]
+
+
+async def replay(last_id: int) -> AsyncIterator[Message]:
+    """
+    Yeniden bağlanan istemci için last_id'den sonraki tüm history event'leri,
+    tablonun sonuna kadar parça parça. Abonelikten sonra çağrılmalıdır: canlı
+    yayın abonelik anındaki poller cursor'ından başlar, replay ise en az oraya
+    kadar okur. REPLAY_MAX_EVENTS aşılırsa kalan aralık yerine tek bir
+    `reset` event'i üretilir.
+    """
+    sent = 0
+    while True:
+        batch = await run_blocking(replay_history, last_id)
+        for message in batch:
+            yield message
+        sent += len(batch)
+        if len(batch) < REPLAY_LIMIT:
+            return
+        last_id = batch[-1][0]
+        if sent >= REPLAY_MAX_EVENTS:
+            yield None, format_sse("reset", {"reason": "replay_limit", "last_id": last_id})
+            return
+
+
+def _read_cursors() -> Tuple[int, int, Set[Tuple[str, int]]]:
+    """
+    Poller başlangıç noktası: MAX(history.id), MAX(state.last_change_ts) ve o
+    saniyedeki state satırları (ilk poll'da değişiklik sayılmasınlar diye).
+    """
+    with read_conn() as conn:
+        if conn is None:
+            return 0, 0, set()
+        try:
+            max_id = conn.execute("SELECT MAX(id) FROM alarm_history").fetchone()[0] or 0
+        except sqlite3.OperationalError:
+            max_id = 0
+        try:
+            max_ts = conn.execute("SELECT MAX(last_change_ts) FROM alarm_state").fetchone()[0] or 0
+        except sqlite3.OperationalError:
+            max_ts = 0
+    seen = {(st["dedup_key"], st["last_change_ts"]) for st in _read_state_since(max_ts)} if max_ts else set()
+    return max_id, max_ts, seen
+
+
+def _read_state_since(ts: int) -> List[Dict[str, Any]]:
+    with read_conn() as conn:
+        if conn is None:
+            return []
+        try:
+            rows = conn.execute(
+                "SELECT dedup_key, last_status, last_sent_ts, last_change_ts, alarm_name "
+                "FROM alarm_state WHERE last_change_ts >= ? ORDER BY last_change_ts, dedup_key",
+                (ts,),
+            ).fetchall()
+        except sqlite3.OperationalError:
+            return []
+    return [dict(r) for r in rows]
+
+
+class Subscriber:
+    def __init__(self) -> None:
+        self.queue: "asyncio.Queue[Optional[Message]]" = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self.dropped = False
+
+    def offer(self, message: Message) -> None:
+        if self.dropped:
+            return
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Yavaş istemci: kuyruğu boşalt, stream'i kapat; Last-Event-ID ile devam eder
+            self.dropped = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+
+class AlarmBroadcaster:
+    """Tek poller, çok abone. Poller ilk abone ile başlar, son abone gidince durur."""
+
+    def __init__(self, poll_interval: float = POLL_INTERVAL_SEC) -> None:
+        self.poll_interval = poll_interval
+        self._subs: Set[Subscriber] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._start_lock = asyncio.Lock()
+        self._last_id = 0
+        self._state_ts = 0
+        self._state_seen: Set[Tuple[str, int]] = set()
+
+    async def subscribe(self) -> Subscriber:
+        """
+        Yeni abone. Poller başlatılıyorsa başlangıç cursor'ı dönmeden önce okunur;
+        böylece abonelikten sonra yapılan replay canlı yayının başladığı id'yi geçer.
+        """
+        sub = Subscriber()
+        self._subs.add(sub)
+        async with self._start_lock:
+            if self._task is None or self._task.done():
+                try:
+                    self._last_id, self._state_ts, self._state_seen = await run_blocking(_read_cursors)
+                except Exception:
+                    log.exception("alarm stream cursor init failed")
+                self._task = asyncio.create_task(self._run())
+        return sub
+
+    def unsubscribe(self, sub: Subscriber) -> None:
+        self._subs.discard(sub)
+
+    def _publish(self, message: Message) -> None:
+        for sub in list(self._subs):
+            sub.offer(message)
+
+    def _poll_once(self) -> List[Message]:
+        messages: List[Message] = []
+        while True:
+            entries = _read_history_after(self._last_id, _BATCH)
+            for e in entries:
+                messages.append((e["id"], format_sse("history", e, e["id"])))
+            if entries:
+                self._last_id = entries[-1]["id"]
+            if len(entries) < _BATCH:
+                break
+
+        # Aynı saniyede gelen değişiklikleri kaçırmamak için >= ile okunur, görülenler atlanır
+        for st in _read_state_since(self._state_ts):
+            key = (st["dedup_key"], st["last_change_ts"])
+            if key in self._state_seen:
+                continue
+            messages.append((None, format_sse("state", st)))
+            if st["last_change_ts"] > self._state_ts:
+                self._state_ts = st["last_change_ts"]
+                self._state_seen = set()
+            self._state_seen.add(key)
+        return messages
+
+    async def _run(self) -> None:
+        while self._subs:
+            try:
+                for message in await run_blocking(self._poll_once):
+                    self._publish(message)
+            except Exception:
+                log.exception("alarm stream poll failed")
+            await asyncio.sleep(self.poll_interval)
+
+
+broadcaster = AlarmBroadcaster()
@@ -57,7 +57,7 @@ async def send_zabbix(body: Dict[str, Any]) -> Dict[str, Any]:
     f = CONF_D / f"{namespace}.conf"
     if not f.exists():
         raise HTTPException(404, f"Namespace '{namespace}' bulunamadı")
-    ns_cfg = _read_conf(f)
+    ns_cfg = await run_blocking(_read_conf, f)
     description = (
         "[ALARMFW][WARN] alarm active"
         if event_type == "1"
@@ -1,79 +1,206 @@
+import asyncio
+import base64
+import csv
+import io
 import json
 import sqlite3
 import time
-from fastapi import APIRouter, Query
-from typing import Any, Dict, List, Optional
-from config import ALARMFW_STATE
+from contextlib import closing
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from typing import Any, Callable, ContextManager, Dict, Iterator, List, Literal, Optional, Set, Tuple
+from async_utils import run_blocking
+from fast_json import FastJSONResponse, fast_json
+from auth import require_admin
+from config import ALARMFW_STATE, HISTORY_RETENTION_DAYS
+from state_db import read_conn
+from routers import _archive, _etag, _rollup, _stream
+from routers._fields import decode, parse_fields, set_path, sql_json, sql_value
 
 router = APIRouter(prefix="/api/alarms", tags=["alarms"])
 
-STATE_DB = ALARMFW_STATE / "alarmfw.sqlite"
 
+def _encode_cursor(last_change_ts: Any, dedup_key: str) -> str:
+    raw = json.dumps([last_change_ts, dedup_key], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
 
-def _open_db():
-    if not STATE_DB.exists():
-        return None
-    conn = sqlite3.connect(str(STATE_DB), timeout=5)
-    conn.execute("PRAGMA journal_mode=WAL;")
-    conn.row_factory = sqlite3.Row
-    return conn
 
-
-def _list_alarms(limit: int, status: Optional[str]) -> List[Dict[str, Any]]:
-    """SQLite alarm_state tablosundaki payload_json'ları döner (en yeniden eskiye)."""
-    conn = _open_db()
-    if conn is None:
-        return []
+def _decode_cursor(cursor: str) -> Tuple[Any, str]:
     try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        ts, key = json.loads(raw)
+    except Exception:
+        raise HTTPException(400, "Invalid cursor")
+    if not isinstance(key, str):
+        raise HTTPException(400, "Invalid cursor")
+    return ts, key
+
+
+# Payload'daki cluster/namespace alanları check tipine göre evidence altında ya da kökte durur
+_PAYLOAD_CLUSTER   = f"COALESCE({sql_value('payload_json', 'evidence.cluster')}, {sql_value('payload_json', 'cluster')})"
+_PAYLOAD_NAMESPACE = f"COALESCE({sql_value('payload_json', 'evidence.namespace')}, {sql_value('payload_json', 'namespace')})"
+
+
+def _list_alarms(
+    limit: int,
+    status: Optional[str],
+    cluster: Optional[str] = None,
+    namespace: Optional[str] = None,
+    alarm_name: Optional[str] = None,
+    cursor: Optional[str] = None,
+    fields: Optional[List[str]] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    SQLite alarm_state tablosundaki payload_json'ları döner (en yeniden eskiye).
+    Filtreler SQL'de uygulanır; sayfalama (last_change_ts, dedup_key) üzerinden keyset'tir.
+    fields verilirse payload decode edilmez, yalnızca o path'ler SQLite'ta çıkarılır.
+    Döner: (alarmlar, sonraki sayfa cursor'ı veya None)
+    """
+    where: List[str] = ["payload_json IS NOT NULL"]
+    params: List[Any] = []
+
+    if status:
+        where.append("last_status = ?")
+        params.append(status.upper())
+    if cluster:
+        where.append(f"{_PAYLOAD_CLUSTER} = ?")
+        params.append(cluster)
+    if namespace:
+        where.append(f"{_PAYLOAD_NAMESPACE} = ?")
+        params.append(namespace)
+    if alarm_name:
+        where.append("alarm_name = ?")
+        params.append(alarm_name)
+    if cursor:
+        ts, key = _decode_cursor(cursor)
+        where.append("(last_change_ts, dedup_key) < (?, ?)")
+        params.extend([ts, key])
+
+    if fields:
+        select = ", ".join(sql_json("payload_json", f) for f in fields)
+    else:
+        select = "payload_json"
+
+    with read_conn() as conn:
+        if conn is None:
+            return [], None
         rows = conn.execute(
-            "SELECT payload_json, last_change_ts FROM alarm_state "
-            "WHERE payload_json IS NOT NULL "
-            "ORDER BY last_change_ts DESC LIMIT ?",
-            (limit,),
+            f"SELECT dedup_key, last_change_ts, {select} FROM alarm_state "
+            "WHERE " + " AND ".join(where) + " "
+            "ORDER BY last_change_ts DESC, dedup_key DESC LIMIT ?",
+            (*params, limit),
         ).fetchall()
-    finally:
-        conn.close()
 
     result = []
     for row in rows:
+        if fields:
+            item: Dict[str, Any] = {}
+            for i, f in enumerate(fields, start=2):
+                set_path(item, f, decode(row[i]))
+            result.append(item)
+            continue
         try:
-            data = json.loads(row["payload_json"])
-            if status and data.get("status") != status.upper():
-                continue
-            result.append(data)
+            result.append(json.loads(row["payload_json"]))
         except Exception:
             pass
-    return result
+
+    next_cursor = None
+    if len(rows) == limit:
+        last = rows[-1]
+        next_cursor = _encode_cursor(last["last_change_ts"], last["dedup_key"])
+    return result, next_cursor
 
 
 @router.get("")
 async def list_alarms(
+    response: Response,
     limit: int = Query(50, ge=1, le=500),
     status: Optional[str] = Query(None),
+    cluster: Optional[str] = Query(None),
+    namespace: Optional[str] = Query(None),
+    alarm_name: Optional[str] = Query(None),
+    cursor: Optional[str] = Query(None, description="Önceki yanıtın X-Next-Cursor header'ı"),
+    fields: Optional[str] = Query(None, description="Virgülle ayrılmış payload path'leri, ör. alarm_name,status,evidence.cluster"),
 ) -> List[Dict[str, Any]]:
-    return _list_alarms(limit, status)
+    items, next_cursor = await run_blocking(
+        _list_alarms,
+        limit, status, cluster, namespace, alarm_name, cursor, parse_fields(fields),
+    )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return items
 
 
 def _get_alarm_state() -> List[Dict[str, Any]]:
     """SQLite state tablosunu döner."""
-    conn = _open_db()
-    if conn is None:
-        return []
     try:
-        rows = conn.execute(
-            "SELECT dedup_key, last_status, last_sent_ts, last_change_ts, alarm_name "
-            "FROM alarm_state ORDER BY last_change_ts DESC"
-        ).fetchall()
-        return [dict(r) for r in rows]
+        with read_conn() as conn:
+            if conn is None:
+                return []
+            rows = conn.execute(
+                "SELECT dedup_key, last_status, last_sent_ts, last_change_ts, alarm_name "
+                "FROM alarm_state ORDER BY last_change_ts DESC"
+            ).fetchall()
+            return [dict(r) for r in rows]
     except Exception as e:
         return [{"error": str(e)}]
-    finally:
-        conn.close()
 
 
 @router.get("/state")
-async def get_alarm_state() -> List[Dict[str, Any]]:
-    return _get_alarm_state()
+async def get_alarm_state(request: Request, response: Response) -> List[Dict[str, Any]]:
+    etag = await run_blocking(_etag.compute)
+    cached = _etag.not_modified(request, response, etag)
+    if cached is not None:
+        return cached
+    return await run_blocking(_get_alarm_state)
+
+
+_HISTORY_COLUMNS = [
+    "id", "event_ts", "timestamp_utc", "event_type", "dedup_key", "alarm_name",
+    "status", "prev_status", "severity", "cluster", "namespace", "message", "payload_json",
+]
+
+
+def _history_filters(
+    status: Optional[str],
+    cluster: Optional[str],
+    namespace: Optional[str],
+    alarm_name: Optional[str],
+    dedup_key: Optional[str],
+    since_ts: Optional[int],
+    hours: Optional[int],
+) -> Tuple[List[str], List[Any], Optional[int]]:
+    """
+    History endpoint'lerinin ortak WHERE koşulları, parametreleri ve event_ts alt
+    sınırı (arşiv segmentlerini elemek için; sınır yoksa None).
+    """
+    where: List[str] = []
+    params: List[Any] = []
+
+    if status:
+        where.append("status = ?")
+        params.append(status.upper())
+    if cluster:
+        where.append("cluster = ?")
+        params.append(cluster)
+    if namespace:
+        where.append("namespace = ?")
+        params.append(namespace)
+    if alarm_name:
+        where.append("alarm_name = ?")
+        params.append(alarm_name)
+    if dedup_key:
+        where.append("dedup_key = ?")
+        params.append(dedup_key)
+    lower_ts: Optional[int] = None
+    if since_ts is not None:
+        lower_ts = since_ts
+    elif hours is not None:
+        lower_ts = int(time.time()) - hours * 3600
+    if lower_ts is not None:
+        where.append("event_ts >= ?")
+        params.append(lower_ts)
+    return where, params, lower_ts
 
 
 def _get_alarm_history(
@@ -85,70 +212,78 @@ def _get_alarm_history(
     dedup_key: Optional[str],
     since_ts: Optional[int],
     hours: Optional[int],
+    fields: Optional[List[str]] = None,
 ) -> List[Dict[str, Any]]:
-    """alarm_history tablosundan event log döner. Tablo yoksa boş liste."""
-    conn = _open_db()
-    if conn is None:
-        return []
-    try:
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS alarm_history (
-                id            INTEGER PRIMARY KEY AUTOINCREMENT,
-                event_ts      INTEGER NOT NULL,
-                timestamp_utc TEXT,
-                event_type    TEXT NOT NULL,
-                dedup_key     TEXT NOT NULL,
-                alarm_name    TEXT,
-                status        TEXT NOT NULL,
-                prev_status   TEXT,
-                severity      TEXT,
-                cluster       TEXT,
-                namespace     TEXT,
-                message       TEXT,
-                payload_json  TEXT
-            )
-        """)
-        conn.commit()
-
-        where: List[str] = []
-        params: List[Any] = []
-
-        if status:
-            where.append("status = ?")
-            params.append(status.upper())
-        if cluster:
-            where.append("cluster = ?")
-            params.append(cluster)
-        if namespace:
-            where.append("namespace = ?")
-            params.append(namespace)
-        if alarm_name:
-            where.append("alarm_name = ?")
-            params.append(alarm_name)
-        if dedup_key:
-            where.append("dedup_key = ?")
-            params.append(dedup_key)
-        if since_ts is not None:
-            where.append("event_ts >= ?")
-            params.append(since_ts)
-        elif hours is not None:
-            cutoff = int(time.time()) - hours * 3600
-            where.append("event_ts >= ?")
-            params.append(cutoff)
-
-        sql = "SELECT * FROM alarm_history"
-        if where:
-            sql += " WHERE " + " AND ".join(where)
-        sql += " ORDER BY event_ts DESC LIMIT ?"
-        params.append(limit)
-
-        rows = conn.execute(sql, params).fetchall()
-    finally:
-        conn.close()
+    """
+    alarm_history tablosundan event log döner. Tablo yoksa boş liste.
+    fields: kolon adları, `payload` (tam payload) veya `payload.<path>` (SQLite'ta çıkarılır).
+    """
+    where, params, lower_ts = _history_filters(
+        status, cluster, namespace, alarm_name, dedup_key, since_ts, hours,
+    )
+
+    select = "*"
+    if fields:
+        exprs = []
+        for f in fields:
+            if f in _HISTORY_COLUMNS and f != "payload_json":
+                exprs.append(f)
+            elif f == "payload":
+                exprs.append("payload_json")
+            elif f.startswith("payload."):
+                exprs.append(sql_json("payload_json", f[len("payload."):]))
+            else:
+                raise HTTPException(400, f"Unknown history field: {f!r}")
+        select = ", ".join(exprs)
+
+    # _ts/_id: sıcak tablo ile arşiv segmentlerinin sonuçlarını birleştirmek için sıralama ve tekilleştirme anahtarı
+    sql = f"SELECT {select}, event_ts AS _ts, id AS _id FROM alarm_history"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY event_ts DESC LIMIT ?"
+    params.append(limit)
+
+    with read_conn() as conn:
+        if conn is None:
+            rows = []
+        else:
+            try:
+                rows = conn.execute(sql, params).fetchall()
+            except sqlite3.OperationalError as e:
+                # Engine alarm_history tablosunu henüz oluşturmamış olabilir
+                if "no such table" not in str(e):
+                    raise
+                rows = []
+
+    # Arşiv segmentleri yeniden eskiye; limit dolduysa ve segmentin tamamı en eski
+    # sonuçtan da eskiyse geri kalan segmentler açılmaz
+    for seg in _archive.segments(lower_ts):
+        if len(rows) >= limit and seg.end_ts <= rows[limit - 1]["_ts"]:
+            break
+        with closing(seg.connect()) as seg_conn:
+            rows += _drop_hot_duplicates(seg_conn.execute(sql, params).fetchall(), "_id")
+        rows.sort(key=lambda r: r["_ts"], reverse=True)
+        del rows[limit:]
 
     result = []
     for row in rows:
+        if fields:
+            entry: Dict[str, Any] = {}
+            for i, f in enumerate(fields):
+                if f == "payload":
+                    try:
+                        entry["payload"] = json.loads(row[i]) if row[i] else None
+                    except Exception:
+                        entry["payload"] = None
+                elif f.startswith("payload."):
+                    set_path(entry, f, decode(row[i]))
+                else:
+                    entry[f] = row[i]
+            result.append(entry)
+            continue
         entry = dict(row)
+        entry.pop("_ts", None)
+        entry.pop("_id", None)
         raw_payload = entry.pop("payload_json", None)
         if raw_payload:
             try:
@@ -159,7 +294,7 @@ def _get_alarm_history(
     return result
 
 
-@router.get("/history")
+@router.get("/history", response_class=FastJSONResponse)
 async def get_alarm_history(
     limit: int = Query(100, ge=1, le=1000),
     status: Optional[str] = Query(None),
@@ -169,60 +304,280 @@ async def get_alarm_history(
     dedup_key: Optional[str] = Query(None),
     since_ts: Optional[int] = Query(None),
     hours: Optional[int] = Query(None),
+    fields: Optional[str] = Query(None, description="Virgülle ayrılmış kolonlar / payload.<path>"),
 ) -> List[Dict[str, Any]]:
-    return _get_alarm_history(limit, status, cluster, namespace, alarm_name, dedup_key, since_ts, hours)
+    return fast_json(await run_blocking(
+        _get_alarm_history,
+        limit, status, cluster, namespace, alarm_name, dedup_key, since_ts, hours, parse_fields(fields),
+    ))
+
+
+_EXPORT_BATCH = 500
+
+
+def _iter_history_batches(
+    where: List[str], params: List[Any], lower_ts: Optional[int],
+) -> Iterator[List[sqlite3.Row]]:
+    """
+    alarm_history'yi önce sıcak tablodan, sonra örtüşen arşiv segmentlerinden
+    (yeniden eskiye) (event_ts, id) keyset'iyle parça parça okur.
+    Her parça için kısa süreli bağlantı alınır; uzun bir read transaction açık
+    kalmadığından engine'in WAL checkpoint'i export boyunca bloklanmaz.
+    """
+    yield from _keyset_batches(read_conn, where, params)
+    for seg in _archive.segments(lower_ts):
+        for rows in _keyset_batches(lambda seg=seg: closing(seg.connect()), where, params):
+            rows = _drop_hot_duplicates(rows, "id")
+            if rows:
+                yield rows
+
+
+def _drop_hot_duplicates(rows: List[sqlite3.Row], id_key: str) -> List[sqlite3.Row]:
+    """
+    Arşiv satırlarından sıcak tabloda hâlâ duran id'leri atar: arşivleme bir parçayı
+    segmente commit ettikten sonra sıcak tablodan silene kadar (ya da arada çökerse)
+    aynı satır iki yerde bulunur; sıcak tablodaki kopya esas alınır.
+    """
+    if not rows:
+        return rows
+    ids = [r[id_key] for r in rows]
+    hot: Set[int] = set()
+    with read_conn() as conn:
+        if conn is None:
+            return rows
+        try:
+            for i in range(0, len(ids), _EXPORT_BATCH):
+                chunk = ids[i:i + _EXPORT_BATCH]
+                hot.update(r[0] for r in conn.execute(
+                    f"SELECT id FROM alarm_history WHERE id IN ({','.join('?' * len(chunk))})", chunk,
+                ))
+        except sqlite3.OperationalError as e:
+            if "no such table" not in str(e):
+                raise
+    return [r for r in rows if r[id_key] not in hot] if hot else rows
+
+
+def _keyset_batches(
+    open_conn: Callable[[], ContextManager[Optional[sqlite3.Connection]]],
+    where: List[str],
+    params: List[Any],
+) -> Iterator[List[sqlite3.Row]]:
+    sql = "SELECT " + ", ".join(_HISTORY_COLUMNS) + " FROM alarm_history"
+    last: Optional[Tuple[int, int]] = None
+    while True:
+        batch_where = list(where)
+        batch_params = list(params)
+        if last is not None:
+            batch_where.append("(event_ts, id) < (?, ?)")
+            batch_params.extend(last)
+        q = sql
+        if batch_where:
+            q += " WHERE " + " AND ".join(batch_where)
+        q += " ORDER BY event_ts DESC, id DESC LIMIT ?"
+        batch_params.append(_EXPORT_BATCH)
+
+        with open_conn() as conn:
+            if conn is None:
+                return
+            try:
+                rows = conn.execute(q, batch_params).fetchall()
+            except sqlite3.OperationalError as e:
+                if "no such table" in str(e):
+                    return
+                raise
+        if not rows:
+            return
+        yield rows
+        if len(rows) < _EXPORT_BATCH:
+            return
+        last = (rows[-1]["event_ts"], rows[-1]["id"])
+
+
+def _history_ndjson(where: List[str], params: List[Any], lower_ts: Optional[int]) -> Iterator[str]:
+    for rows in _iter_history_batches(where, params, lower_ts):
+        lines = []
+        for row in rows:
+            entry = dict(row)
+            raw_payload = entry.pop("payload_json", None)
+            if raw_payload:
+                try:
+                    entry["payload"] = json.loads(raw_payload)
+                except Exception:
+                    pass
+            lines.append(json.dumps(entry, ensure_ascii=False))
+        yield "\n".join(lines) + "\n"
+
+
+def _history_csv(where: List[str], params: List[Any], lower_ts: Optional[int]) -> Iterator[str]:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(_HISTORY_COLUMNS)
+    for rows in _iter_history_batches(where, params, lower_ts):
+        writer.writerows(tuple(row) for row in rows)
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue()
+
+
+@router.get("/history/export")
+async def export_alarm_history(
+    format: Literal["ndjson", "csv"] = Query("ndjson"),
+    status: Optional[str] = Query(None),
+    cluster: Optional[str] = Query(None),
+    namespace: Optional[str] = Query(None),
+    alarm_name: Optional[str] = Query(None),
+    dedup_key: Optional[str] = Query(None),
+    since_ts: Optional[int] = Query(None),
+    hours: Optional[int] = Query(None),
+) -> StreamingResponse:
+    """
+    /history ile aynı filtrelerle tüm eşleşen event'leri limitsiz stream eder.
+    Bellek kullanımı aralığın büyüklüğünden bağımsızdır (parça başına _EXPORT_BATCH satır).
+    """
+    where, params, lower_ts = _history_filters(
+        status, cluster, namespace, alarm_name, dedup_key, since_ts, hours,
+    )
+    if format == "csv":
+        body, media_type = _history_csv(where, params, lower_ts), "text/csv"
+    else:
+        body, media_type = _history_ndjson(where, params, lower_ts), "application/x-ndjson"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="alarm_history.{format}"'},
+    )
 
 
-def _get_alarm_metrics() -> Dict[str, Any]:
-    """alarm_state tablosundan türetilmiş runtime metrikleri döner."""
-    conn = _open_db()
-    if conn is None:
-        return {
-            "version": 0,
-            "updated_at_utc": "",
-            "rules_evaluated_total": 0,
-            "notifications_sent_total": 0,
-            "notifications_suppressed_total": 0,
-            "evaluation_count_total": 0,
-            "evaluation_latency_ms_last": 0,
-            "evaluation_latency_ms_sum": 0,
-            "evaluation_latency_ms_avg": 0,
-            "last_exit_code": 0,
+def _get_history_stats(
+    bucket: str,
+    group_by: str,
+    cluster: Optional[str],
+    namespace: Optional[str],
+    since_ts: Optional[int],
+    until_ts: Optional[int],
+    hours: int,
+) -> Dict[str, Any]:
+    if since_ts is None:
+        since_ts = int(time.time()) - hours * 3600
+    return _rollup.query(bucket, group_by, since_ts, until_ts, cluster, namespace)
+
+
+@router.get("/history/stats")
+async def get_alarm_history_stats(
+    bucket: Literal["1m", "5m", "1h", "1d"] = Query("5m"),
+    group_by: Literal["status", "cluster", "namespace", "severity"] = Query("status"),
+    cluster: Optional[str] = Query(None),
+    namespace: Optional[str] = Query(None),
+    since_ts: Optional[int] = Query(None),
+    until_ts: Optional[int] = Query(None),
+    hours: int = Query(24, ge=1, le=24 * 90),
+) -> Dict[str, Any]:
+    """
+    Zaman kovası başına event sayıları; arka planda artımlı güncellenen rollup tablosundan
+    okunur (istekte güncelleme yapılmaz, `stale` gecikmeyi bildirir).
+    since_ts verilmezse son `hours` saat döner.
+    """
+    return await run_blocking(
+        _get_history_stats, bucket, group_by, cluster, namespace, since_ts, until_ts, hours,
+    )
+
+
+def _list_archive_segments() -> List[Dict[str, Any]]:
+    return [
+        {
+            "file":       seg.path.name,
+            "start_ts":   seg.start_ts,
+            "end_ts":     seg.end_ts,
+            "size_bytes": seg.path.stat().st_size,
         }
-    try:
-        total = conn.execute("SELECT COUNT(*) FROM alarm_state").fetchone()[0]
-        problems = conn.execute(
-            "SELECT COUNT(*) FROM alarm_state WHERE last_status IN ('PROBLEM','ERROR')"
-        ).fetchone()[0]
-        last_ts_row = conn.execute(
-            "SELECT MAX(last_change_ts) FROM alarm_state"
-        ).fetchone()[0]
-    finally:
-        conn.close()
-
-    from datetime import datetime, timezone
-    updated = (
-        datetime.fromtimestamp(last_ts_row, tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
-        if last_ts_row else ""
+        for seg in _archive.segments()
+    ]
+
+
+@router.get("/history/archive")
+async def list_history_archive() -> List[Dict[str, Any]]:
+    """Arşivlenmiş history segmentleri (aylık), yeniden eskiye."""
+    return await run_blocking(_list_archive_segments)
+
+
+@router.post("/history/archive", dependencies=[Depends(require_admin)])
+async def archive_history(body: Dict[str, Any] = {}) -> Dict[str, Any]:
+    """`days` (varsayılan HISTORY_RETENTION_DAYS) günden eski event'leri hemen arşive taşır."""
+    days = body.get("days", HISTORY_RETENTION_DAYS)
+    if isinstance(days, bool) or not isinstance(days, int):
+        raise HTTPException(400, "days must be an integer")
+    if days <= 0:
+        raise HTTPException(400, "days must be > 0")
+    return {"ok": True, **await run_blocking(_archive.archive_older_than, days)}
+
+
+_STREAM_KEEPALIVE_SEC = 15
+
+
+@router.get("/stream")
+async def stream_alarms(
+    request: Request,
+    last_event_id: Optional[str] = Header(None),
+    since_id: Optional[int] = Query(None, description="Last-Event-ID header'ı gönderilemiyorsa"),
+) -> StreamingResponse:
+    """
+    Server-Sent Events: yeni alarm_history satırları (`event: history`, id = history.id)
+    ve alarm_state değişiklikleri (`event: state`). Tüm istemciler tek bir poller'ı paylaşır.
+    Last-Event-ID ile yeniden bağlanan istemci kaçırdığı history event'lerini önce alır;
+    çok gerideyse `event: reset` alır ve listeyi baştan yüklemelidir.
+    """
+    resume_from = since_id
+    if last_event_id and last_event_id.isdigit():
+        resume_from = int(last_event_id)
+
+    sub = await _stream.broadcaster.subscribe()
+
+    async def events():
+        try:
+            replayed_to = 0
+            if resume_from is not None:
+                async for event_id, message in _stream.replay(resume_from):
+                    yield message
+                    if event_id is not None:
+                        replayed_to = event_id
+            while True:
+                if await request.is_disconnected():
+                    return
+                try:
+                    item = await asyncio.wait_for(sub.queue.get(), timeout=_STREAM_KEEPALIVE_SEC)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if item is None:
+                    return
+                event_id, message = item
+                # Replay ile canlı yayın çakışan event'leri iki kez gönderme
+                if event_id is not None and event_id <= replayed_to:
+                    continue
+                yield message
+        finally:
+            _stream.broadcaster.unsubscribe(sub)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
-    return {
-        "version": 1,
-        "updated_at_utc": updated,
-        "rules_evaluated_total": total,
-        "notifications_sent_total": 0,
-        "notifications_suppressed_total": 0,
-        "evaluation_count_total": total,
-        "evaluation_latency_ms_last": 0,
-        "evaluation_latency_ms_sum": 0,
-        "evaluation_latency_ms_avg": 0,
-        "last_exit_code": 1 if problems > 0 else 0,
-    }
+
+def _get_alarm_metrics() -> Dict[str, Any]:
+    """
+    alarm_history event_type'larından türetilmiş runtime metrikleri döner.
+    Sayaçlar _rollup arka plan görevinde artımlı güncellenir; burada sadece okunur.
+    """
+    return _rollup.metrics()
 
 
 @router.get("/metrics")
 async def get_alarm_metrics() -> Dict[str, Any]:
-    return _get_alarm_metrics()
+    return await run_blocking(_get_alarm_metrics)
 
 
 def _clear_outbox() -> Dict[str, Any]:
@@ -238,4 +593,4 @@ def _clear_outbox() -> Dict[str, Any]:
 
 @router.delete("/outbox")
 async def clear_outbox() -> Dict[str, Any]:
-    return _clear_outbox()
+    return await run_blocking(_clear_outbox)
@@ -1,108 +1,471 @@
+import base64
+import bisect
+import time
 import yaml
-from fastapi import APIRouter, HTTPException
-from typing import Any, Dict, List
+from contextlib import contextmanager
+from pathlib import Path
+from fastapi import APIRouter, Header, HTTPException, Query, Response
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 from config import ALARMFW_CONFIG
+from async_utils import run_blocking
+from fast_json import FastJSONResponse, fast_json
+from routers._atomic import atomic_write_many, atomic_write_text, file_lock, file_locks
+from routers._check_catalog import catalog, check_version, dump_yaml, load_yaml, rel_source
+from routers._check_schema import validate_check
 
 router = APIRouter(prefix="/api/checks", tags=["checks"])
 
 
 def _check_files() -> List[Any]:
     """config/checks/ ve config/generated/ altındaki tüm yaml'lardan check listesi döner."""
-    checks = []
-    for subdir in ("checks", "generated"):
-        d = ALARMFW_CONFIG / subdir
-        if not d.exists():
-            continue
-        for f in sorted(d.glob("*.yaml")):
-            try:
-                data = yaml.safe_load(f.read_text())
-                for chk in (data or {}).get("checks") or []:
-                    chk["_source_file"] = str(f.relative_to(ALARMFW_CONFIG))
-                    checks.append(chk)
-            except Exception as e:
-                checks.append({"_error": str(e), "_source_file": str(f)})
-    return checks
+    return catalog.all()
+
+
+def _read_check(f: Path, idx: int, name: str) -> Tuple[Optional[Dict[str, Any]], Optional[int]]:
+    """Dosyayı taze okur; check katalogdaki index'te değilse dosya içinde arar."""
+    try:
+        data = load_yaml(f.read_text()) or {}
+    except Exception:
+        return None, None
+    checks = data.get("checks") or []
+    if not (idx < len(checks) and isinstance(checks[idx], dict) and checks[idx].get("name") == name):
+        idx = next((i for i, c in enumerate(checks) if isinstance(c, dict) and c.get("name") == name), None)
+        if idx is None:
+            return None, None
+    return data, idx
 
 
 def _find_check(name: str):
-    """Verilen isimde check'i ve bulunduğu dosyayı döner."""
-    for subdir in ("checks", "generated"):
-        d = ALARMFW_CONFIG / subdir
-        if not d.exists():
+    """
+    Verilen isimde check'i ve bulunduğu dosyayı döner. Dosya katalogdan bulunur,
+    yalnızca o dosya değiştirilmek üzere taze okunur.
+    """
+    loc = catalog.locate(name)
+    if loc is None:
+        return None, None, None
+    data, idx = _read_check(loc[0], loc[1], name)
+    if data is None:
+        return None, None, None
+    return loc[0], data, idx
+
+
+@contextmanager
+def _locked_check(name: str) -> Iterator[Tuple[Path, Dict[str, Any], int]]:
+    """Check'in dosyasını kilitleyip taze okur; kilit blok bitene kadar tutulur."""
+    for _ in range(2):
+        loc = catalog.locate(name)
+        if loc is None:
+            break
+        f = loc[0]
+        with file_lock(f):
+            data, idx = _read_check(f, loc[1], name)
+            if data is not None:
+                yield f, data, idx
+                return
+        # Kilit beklenirken check başka dosyaya taşınmış/silinmiş olabilir
+        catalog.invalidate(f)
+    raise HTTPException(404, f"Check '{name}' not found")
+
+
+_META_FIELDS = ("_source_file", "_version")
+
+
+def _strip_meta(body: Dict[str, Any]) -> Dict[str, Any]:
+    for key in _META_FIELDS:
+        body.pop(key, None)
+    return body
+
+
+def _expected_version(if_match: Optional[str], body: Optional[Dict[str, Any]] = None) -> Optional[str]:
+    """If-Match header'ı (öncelikli) veya body'deki _version; '*' koşulsuzdur."""
+    if if_match:
+        tag = if_match.split(",")[0].strip()
+        if tag == "*":
+            return None
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        return tag.strip('"')
+    if body is not None and body.get("_version"):
+        return str(body["_version"])
+    return None
+
+
+def _check_precondition(name: str, current: Dict[str, Any], expected: Optional[str]) -> None:
+    if expected is not None and expected != check_version(current):
+        raise HTTPException(412, f"Check '{name}' was modified by someone else (version mismatch)")
+
+
+def _require_valid(chk: Dict[str, Any]) -> None:
+    errors = validate_check({k: v for k, v in chk.items() if k not in _META_FIELDS})
+    if errors:
+        raise HTTPException(422, {"message": f"Invalid check '{chk.get('name', '')}'", "errors": errors})
+
+
+def _encode_cursor(name: str) -> str:
+    return base64.urlsafe_b64encode(name.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> str:
+    try:
+        return base64.b64decode(cursor + "=" * (-len(cursor) % 4), altchars=b"-_", validate=True).decode()
+    except Exception:
+        raise HTTPException(400, "Invalid cursor")
+
+
+def _search_checks(
+    q: Optional[str],
+    type_: Optional[str],
+    cluster: Optional[str],
+    namespace: Optional[str],
+    enabled: Optional[bool],
+    limit: Optional[int],
+    cursor: Optional[str],
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Filtre yoksa eski davranış: tüm katalog (parse hatası satırları dahil), dosya sırasıyla.
+    limit verilirse isim sırasıyla keyset sayfalama; sonraki sayfa X-Next-Cursor ile.
+    """
+    filtered = any(v is not None for v in (q, type_, cluster, namespace, enabled))
+    if not filtered and limit is None:
+        return _check_files(), None
+    items = catalog.search(q, type_, cluster, namespace, enabled)
+    if limit is None:
+        return items, None
+    items.sort(key=lambda c: c["name"])
+    if cursor:
+        after = _decode_cursor(cursor)
+        items = items[bisect.bisect_right([c["name"] for c in items], after):]
+    page = items[:limit]
+    next_cursor = _encode_cursor(page[-1]["name"]) if len(items) > limit else None
+    return page, next_cursor
+
+
+@router.get("", response_class=FastJSONResponse)
+async def list_checks(
+    response:  Response,
+    q:         Optional[str]  = Query(None, description="İsimde geçen metin (büyük/küçük harf duyarsız)"),
+    type:      Optional[str]  = Query(None),
+    cluster:   Optional[str]  = Query(None),
+    namespace: Optional[str]  = Query(None),
+    enabled:   Optional[bool] = Query(None),
+    limit:     Optional[int]  = Query(None, ge=1, le=5000),
+    cursor:    Optional[str]  = Query(None, description="Önceki yanıtın X-Next-Cursor header'ı"),
+) -> List[Dict[str, Any]]:
+    items, next_cursor = await run_blocking(
+        _search_checks, q, type, cluster, namespace, enabled, limit, cursor,
+    )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return fast_json(items, response)
+
+
+def _validate_catalog() -> Dict[str, Any]:
+    started = time.perf_counter()
+    checks = catalog.all()
+    invalid: List[Dict[str, Any]] = []
+    for chk in checks:
+        if "_error" in chk:
+            invalid.append({"name": None, "source_file": chk["_source_file"],
+                            "errors": [{"loc": "", "msg": f"YAML parse error: {chk['_error']}"}]})
             continue
-        for f in sorted(d.glob("*.yaml")):
-            try:
-                data = yaml.safe_load(f.read_text()) or {}
-                checks = data.get("checks") or []
-                for i, chk in enumerate(checks):
-                    if chk.get("name") == name:
-                        return f, data, i
-            except Exception:
-                pass
-    return None, None, None
+        errors = validate_check({k: v for k, v in chk.items() if k not in _META_FIELDS})
+        if errors:
+            invalid.append({"name": chk.get("name"), "source_file": chk.get("_source_file"), "errors": errors})
+    return {
+        "checked":     len(checks),
+        "invalid":     len(invalid),
+        "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+        "results":     invalid,
+    }
 
 
-@router.get("")
-async def list_checks() -> List[Dict[str, Any]]:
-    return _check_files()
+@router.get("/validate")
+async def validate_checks() -> Dict[str, Any]:
+    """Tüm kataloğu tek geçişte tip şemalarına göre doğrular; yalnızca hatalı check'ler listelenir."""
+    return await run_blocking(_validate_catalog)
 
 
 @router.get("/{name}")
-async def get_check(name: str) -> Dict[str, Any]:
-    f, data, idx = _find_check(name)
-    if f is None:
+async def get_check(name: str, response: Response) -> Dict[str, Any]:
+    chk = await run_blocking(catalog.get, name)
+    if chk is None:
         raise HTTPException(404, f"Check '{name}' not found")
-    chk = data["checks"][idx]
-    chk["_source_file"] = str(f.relative_to(ALARMFW_CONFIG))
+    response.headers["ETag"] = f'"{chk["_version"]}"'
     return chk
 
 
-def _update_check(name: str, body: Dict[str, Any]) -> Dict[str, Any]:
-    f, data, idx = _find_check(name)
-    if f is None:
-        raise HTTPException(404, f"Check '{name}' not found")
-    body.pop("_source_file", None)
-    data["checks"][idx] = body
-    f.write_text(yaml.dump(data, allow_unicode=True, default_flow_style=False))
-    return {"ok": True, "name": name}
+def _update_check(name: str, body: Dict[str, Any], expected: Optional[str] = None) -> Dict[str, Any]:
+    _require_valid(body)
+    with _locked_check(name) as (f, data, idx):
+        _check_precondition(name, data["checks"][idx], expected)
+        _strip_meta(body)
+        data["checks"][idx] = body
+        atomic_write_text(f, dump_yaml(data))
+    catalog.invalidate(f)
+    return {"ok": True, "name": name, "version": check_version(body)}
 
 
 @router.put("/{name}")
-async def update_check(name: str, body: Dict[str, Any]) -> Dict[str, Any]:
-    return _update_check(name, body)
+async def update_check(
+    name: str,
+    body: Dict[str, Any],
+    if_match: Optional[str] = Header(None),
+) -> Dict[str, Any]:
+    """If-Match: "<version>" (veya body._version) verilirse check bu arada değiştiyse 412 döner."""
+    return await run_blocking(_update_check, name, body, _expected_version(if_match, body))
 
 
 def _create_check(body: Dict[str, Any]) -> Dict[str, Any]:
     name = body.get("name")
     if not name:
         raise HTTPException(400, "name is required")
+    _require_valid(body)
     target_dir = ALARMFW_CONFIG / "checks"
     target_dir.mkdir(exist_ok=True)
     fname = target_dir / f"{name}.yaml"
-    if fname.exists():
-        raise HTTPException(409, f"File {fname.name} already exists")
-    body.pop("_source_file", None)
-    fname.write_text(yaml.dump({"checks": [body]}, allow_unicode=True, default_flow_style=False))
-    return {"ok": True, "name": name, "file": fname.name}
+    with file_lock(fname):
+        if fname.exists():
+            raise HTTPException(409, f"File {fname.name} already exists")
+        _strip_meta(body)
+        atomic_write_text(fname, dump_yaml({"checks": [body]}))
+    catalog.invalidate(fname)
+    return {"ok": True, "name": name, "file": fname.name, "version": check_version(body)}
 
 
 @router.post("")
 async def create_check(body: Dict[str, Any]) -> Dict[str, Any]:
-    return _create_check(body)
+    return await run_blocking(_create_check, body)
 
 
-def _delete_check(name: str) -> Dict[str, Any]:
-    f, data, idx = _find_check(name)
-    if f is None:
-        raise HTTPException(404, f"Check '{name}' not found")
-    data["checks"].pop(idx)
-    if data["checks"]:
-        f.write_text(yaml.dump(data, allow_unicode=True, default_flow_style=False))
-    else:
-        f.unlink()
+def _delete_check(name: str, expected: Optional[str] = None) -> Dict[str, Any]:
+    with _locked_check(name) as (f, data, idx):
+        _check_precondition(name, data["checks"][idx], expected)
+        data["checks"].pop(idx)
+        if data["checks"]:
+            atomic_write_text(f, dump_yaml(data))
+        else:
+            f.unlink()
+    catalog.invalidate(f)
     return {"ok": True, "name": name}
 
 
 @router.delete("/{name}")
-async def delete_check(name: str) -> Dict[str, Any]:
-    return _delete_check(name)
+async def delete_check(name: str, if_match: Optional[str] = Header(None)) -> Dict[str, Any]:
+    return await run_blocking(_delete_check, name, _expected_version(if_match))
+
+
+# ── bulk ──────────────────────────────────────────────────────────────────────
+
+MAX_BULK_OPS = 5000
+_BULK_OPS = ("create", "update", "patch", "delete")
+
+
+class _BulkError(Exception):
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+def _deep_merge(base: Dict[str, Any], patch: Dict[str, Any]) -> Dict[str, Any]:
+    out = dict(base)
+    for k, v in patch.items():
+        if isinstance(v, dict) and isinstance(out.get(k), dict):
+            out[k] = _deep_merge(out[k], v)
+        else:
+            out[k] = v
+    return out
+
+
+class _FileBuffer:
+    """Bulk sırasında tek bir yaml dosyasının bellekteki hali (bir kez okunur, bir kez yazılır)."""
+
+    def __init__(self, path: Path, exists: bool) -> None:
+        self.path = path
+        self.data: Dict[str, Any] = {"checks": []}
+        if exists and path.exists():
+            data = load_yaml(path.read_text()) or {}
+            if not isinstance(data, dict):
+                raise _BulkError(422, f"{path.name} is not a check file")
+            data["checks"] = data.get("checks") or []
+            self.data = data
+        self.dirty = False
+
+    def index_of(self, name: str) -> Optional[int]:
+        for i, c in enumerate(self.data["checks"]):
+            if isinstance(c, dict) and c.get("name") == name:
+                return i
+        return None
+
+
+def _bulk_validate(chk: Dict[str, Any]) -> None:
+    errors = validate_check(chk)
+    if errors:
+        raise _BulkError(422, "; ".join(f"{e['loc']}: {e['msg']}" for e in errors))
+
+
+def _bulk_name(op: Dict[str, Any]) -> str:
+    """İşlemin check adı: op.name, yoksa body.name; ikisi de verilip farklıysa 400."""
+    body = op.get("body")
+    body_name = body.get("name") if isinstance(body, dict) else None
+    name = op.get("name") or body_name
+    if not isinstance(name, str) or not name:
+        raise _BulkError(400, "name is required")
+    if op.get("op") == "create" and body_name is not None and body_name != name:
+        raise _BulkError(400, f"name '{name}' does not match body.name '{body_name}'")
+    return name
+
+
+def _bulk_target(op: Dict[str, Any], pending: Dict[str, Path]) -> Path:
+    """
+    İşlemin dokunacağı dosya: create için checks/<name>.yaml; diğerleri aynı batch'te
+    daha önce create edilen bir check'e aitse onun dosyası, değilse katalogdan.
+    """
+    name = _bulk_name(op)
+    if op.get("op") == "create":
+        target = pending[name] = ALARMFW_CONFIG / "checks" / f"{name}.yaml"
+        return target
+    if name in pending:
+        return pending[name]
+    loc = catalog.locate(name)
+    if loc is None:
+        raise _BulkError(404, f"Check '{name}' not found")
+    return loc[0]
+
+
+def _bulk_apply_one(op: Dict[str, Any], buf: _FileBuffer) -> Dict[str, Any]:
+    kind = op["op"]
+    body = op.get("body")
+    if kind == "create":
+        if not isinstance(body, dict):
+            raise _BulkError(400, "body is required")
+        name = _bulk_name(op)
+        if buf.path.exists() or buf.dirty:
+            raise _BulkError(409, f"File {buf.path.name} already exists")
+        new = _strip_meta({**body, "name": name})
+        _bulk_validate(new)
+        buf.data["checks"].append(new)
+        buf.dirty = True
+        return {"name": name, "file": buf.path.name, "version": check_version(new)}
+
+    name = _bulk_name(op)
+    idx = buf.index_of(name)
+    if idx is None:
+        raise _BulkError(404, f"Check '{name}' not found")
+    current = buf.data["checks"][idx]
+    expected = op.get("version")
+    if expected is not None and str(expected) != check_version(current):
+        raise _BulkError(412, f"Check '{name}' was modified by someone else (version mismatch)")
+
+    if kind == "delete":
+        buf.data["checks"].pop(idx)
+        buf.dirty = True
+        return {"name": name}
+    if not isinstance(body, dict):
+        raise _BulkError(400, "body is required")
+    new = _strip_meta(dict(body) if kind == "update" else _deep_merge(current, body))
+    if new.get("name", name) != name:
+        raise _BulkError(400, "renaming a check is not supported")
+    new["name"] = name
+    _bulk_validate(new)
+    buf.data["checks"][idx] = new
+    buf.dirty = True
+    return {"name": name, "version": check_version(new)}
+
+
+# Başarısız batch'in HTTP durumu: sürüm/varlık çakışması (412/409) varsa 409, yoksa
+# işlemlerin en belirgin hatası (doğrulama > bulunamadı > hatalı istek)
+_BULK_FAILURE_PRIORITY = (409, 422, 404, 400)
+
+
+def _bulk_failure_status(failed: List[Dict[str, Any]]) -> int:
+    statuses = {409 if r["status"] == 412 else r["status"] for r in failed}
+    for status in _BULK_FAILURE_PRIORITY:
+        if status in statuses:
+            return status
+    return 400
+
+
+def _bulk_checks(ops: List[Dict[str, Any]], dry_run: bool = False) -> Dict[str, Any]:
+    """
+    Tüm işlemleri dosyalara göre gruplar; her dosya kilit altında bir kez okunur,
+    işlemler sırayla bellekte uygulanır. Katalogdan çözülen hedefler kilit alındıktan
+    sonra yeniden doğrulanır; arada başka dosyaya taşınan/silinen check 409/404 olur. Bir tanesi bile başarısızsa hiçbir dosya
+    yazılmaz (_bulk_failure_status + işlem bazında sonuçlar); aksi halde dosyalar
+    birlikte yazılır.
+    """
+    results: List[Dict[str, Any]] = []
+    targets: List[Optional[Path]] = []
+    pending: Dict[str, Path] = {}
+    for i, op in enumerate(ops):
+        try:
+            if not isinstance(op, dict) or op.get("op") not in _BULK_OPS:
+                raise _BulkError(400, f"op must be one of {', '.join(_BULK_OPS)}")
+            targets.append(_bulk_target(op, pending))
+            results.append({"index": i, "op": op["op"], "ok": True})
+        except _BulkError as e:
+            targets.append(None)
+            results.append({"index": i, "op": (op or {}).get("op") if isinstance(op, dict) else None,
+                            "ok": False, "status": e.status, "error": str(e)})
+
+    paths = {t for t in targets if t is not None}
+    if any(p.parent.name == "checks" for p in paths):
+        (ALARMFW_CONFIG / "checks").mkdir(exist_ok=True)
+    with file_locks(paths):
+        buffers: Dict[Path, _FileBuffer] = {}
+        for i, (op, target) in enumerate(zip(ops, targets)):
+            if target is None:
+                continue
+            try:
+                name = _bulk_name(op)
+                if op["op"] != "create" and pending.get(name) != target:
+                    loc = catalog.locate(name)
+                    if loc is None:
+                        raise _BulkError(404, f"Check '{name}' not found")
+                    if loc[0] != target:
+                        raise _BulkError(409, f"Check '{name}' was moved by someone else")
+                buf = buffers.get(target)
+                if buf is None:
+                    buf = buffers[target] = _FileBuffer(target, exists=True)
+                results[i].update(_bulk_apply_one(op, buf))
+            except _BulkError as e:
+                results[i].update({"ok": False, "status": e.status, "error": str(e)})
+            except yaml.YAMLError as e:
+                results[i].update({"ok": False, "status": 422, "error": f"{target.name}: {e}"})
+
+        failed = [r for r in results if not r["ok"]]
+        if failed:
+            raise HTTPException(
+                _bulk_failure_status(failed), {"applied": False, "failed": len(failed), "results": results},
+            )
+        changes = {
+            b.path: (dump_yaml(b.data) if b.data["checks"] else None)
+            for b in buffers.values() if b.dirty
+        }
+        if not dry_run:
+            atomic_write_many(changes)
+    for path in changes:
+        catalog.invalidate(path)
+    return {
+        "ok": True,
+        "applied": not dry_run,
+        "files_written": sorted(rel_source(p) for p in changes),
+        "results": results,
+    }
+
+
+@router.post("/bulk")
+async def bulk_checks(body: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    {"operations": [{"op": "create|update|patch|delete", "name": ..., "body": {...}, "version": ...}],
+     "dry_run": false}
+    patch: body check'e derin birleştirilir (ör. {"enabled": false}).
+    version verilirse check o sürümde değilse işlem 412 ile başarısız olur.
+    Hepsi uygulanır ya da hiçbiri; hata durumunda işlem bazında sonuçlar döner. Durum kodu
+    sürüm çakışmasında 409, aksi halde işlemlerin en belirgin hatasıdır (422 > 404 > 400).
+    """
+    ops = body.get("operations")
+    if not isinstance(ops, list) or not ops:
+        raise HTTPException(400, "operations must be a non-empty list")
+    if len(ops) > MAX_BULK_OPS:
+        raise HTTPException(400, f"At most {MAX_BULK_OPS} operations allowed")
+    return await run_blocking(_bulk_checks, ops, bool(body.get("dry_run", False)))
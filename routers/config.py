@@ -1,98 +1,90 @@
+import csv
+import io
+import json
+import re
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterator, List, Optional
 
 import yaml
-from fastapi import APIRouter, Depends, HTTPException
-from config import ALARMFW_CONFIG, ALARMFW_SECRETS
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from config import (
+    ALARMFW_CONFIG, ALARMFW_SECRETS, GENERATED_LAYOUT, GENERATED_MODE,
+    GENERATE_DEBOUNCE_MS, GENERATE_MAX_DELAY_MS,
+)
 from auth import require_admin
-from routers._conf import read_conf as _read_conf, write_conf as _write_conf, is_true as _is_true, bool_str as _bool_str
+from async_utils import run_blocking
+from routers._atomic import atomic_write_many, atomic_write_text, file_lock, file_locks
+from routers._check_catalog import dump_yaml, load_yaml
+from routers._conf import read_conf as _read_conf, write_conf as _write_conf, format_conf as _format_conf, is_true as _is_true, bool_str as _bool_str
+from routers._generate_worker import GenerationWorker
+from routers._generator import PodHealthGenerator
 
 router = APIRouter(prefix="/api/config", tags=["config"])
 
 CONF_D    = Path(ALARMFW_CONFIG).parent / "legacy/podhealthalarm/conf.d"
 GENERATED = ALARMFW_CONFIG / "generated/ocp_pod_health.yaml"
 
+_generator = PodHealthGenerator(CONF_D, ALARMFW_CONFIG / "observe.yaml", GENERATED, GENERATED_LAYOUT, GENERATED_MODE)
 
-def _generate_yaml() -> int:
-    """Regenerate config/generated/ocp_pod_health.yaml from conf.d + observe.yaml clusters"""
-    checks = []
 
-    # Cluster bilgisini observe.yaml'dan al (isim → dict)
-    obs_data = _read_observe_yaml()
-    obs_clusters = {
-        c["name"]: c
-        for c in obs_data.get("clusters", [])
-        if isinstance(c, dict) and c.get("name")
-    }
+generation = GenerationWorker(_generator.generate, GENERATE_DEBOUNCE_MS / 1000, GENERATE_MAX_DELAY_MS / 1000)
 
-    for ns_conf in sorted(CONF_D.glob("*.conf")):
-        ns = ns_conf.stem
-        ns_cfg = _read_conf(ns_conf)
 
-        if not _is_true(ns_cfg.get("NAMESPACE_ENABLED")):
-            continue
+def _regenerate() -> Dict[str, Any]:
+    """
+    conf.d / observe.yaml değişikliğini üretim worker'ına bildirir. Worker aktifse
+    üretim arka planda birleştirilerek yapılır (durum: GET /generate/status);
+    değilse burada senkron üretilir ve sonuç cevaba eklenir.
+    """
+    result = generation.notify()
+    if result is None:
+        return {"generation": "pending"}
+    return {"generation": "done", "generated_checks": result.count, "rendered_namespaces": len(result.rendered)}
 
-        clusters = [c.strip() for c in (ns_cfg.get("CLUSTERS", "")).split(",") if c.strip()]
-        if not clusters:
-            continue
 
-        node       = ns_cfg.get("NODE", "OCP")
-        department = ns_cfg.get("DEPARTMENT", "UNKNOWN")
-        severity   = ns_cfg.get("SEVERITY", "5")
-        alertgroup = ns_cfg.get("ALERTGROUP", f"{ns}AlertGroup")
-        alertkey   = ns_cfg.get("POD_HEALTH_ALERTKEY", "OCP_POD_HEALTH")
-
-        zbx  = _is_true(ns_cfg.get("ZABBIX_ENABLED"))
-        mail = _is_true(ns_cfg.get("MAIL_ENABLED"))
-
-        if zbx and mail:
-            primary, fallback = ["zabbix"], ["dev_smtp", "smtp", "dev_outbox"]
-        elif zbx:
-            primary, fallback = ["zabbix"], ["dev_smtp", "dev_outbox"]
-        elif mail:
-            primary, fallback = ["smtp"], ["dev_smtp", "dev_outbox"]
-        else:
-            primary, fallback = ["dev_outbox"], []
+# ── Namespaces ────────────────────────────────────────
 
-        for cl in clusters:
-            cl_data = obs_clusters.get(cl)
-            if not cl_data:
-                continue
-            ocp_api = cl_data.get("ocp_api", "")
-            if not ocp_api:
-                continue
-            ocp_token_file = f"/secrets/{cl}.token"
-            insecure = "true" if cl_data.get("insecure", True) else "false"
-
-            checks.append({
-                "name": f"ocp_pod_health__{ns}__{cl}",
-                "type": "ocp_pod_health",
-                "enabled": True,
-                "params": {
-                    "namespace": ns,
-                    "cluster": cl,
-                    "ocp_api": ocp_api,
-                    "ocp_token_file": ocp_token_file,
-                    "ocp_insecure": insecure,
-                    "timeout_sec": "30",
-                    "node": node,
-                    "department": department,
-                    "severity": severity,
-                    "alertgroup": alertgroup,
-                    "alertkey": alertkey,
-                },
-                "notify": {"primary": primary, "fallback": fallback},
-            })
+def _namespace_view(name: str, raw: Dict[str, str]) -> Dict[str, Any]:
+    """conf.d dosyasının API görünümü; alanlar PUT /namespaces/{name} body'siyle aynı."""
+    return {
+        "name":              name,
+        "namespace_enabled": _is_true(raw.get("NAMESPACE_ENABLED")),
+        "clusters":          [c.strip() for c in raw.get("CLUSTERS", "").split(",") if c.strip()],
+        "zabbix_enabled":    _is_true(raw.get("ZABBIX_ENABLED")),
+        "mail_enabled":      _is_true(raw.get("MAIL_ENABLED")),
+        "severity":          raw.get("SEVERITY", "5"),
+        "node":              raw.get("NODE", ""),
+        "department":        raw.get("DEPARTMENT", ""),
+        "alertkey":          raw.get("POD_HEALTH_ALERTKEY", "OCP_POD_HEALTH"),
+        "alertgroup":        raw.get("ALERTGROUP", ""),
+        "mail_to":           raw.get("MAIL_TO", ""),
+        "mail_cc":           raw.get("MAIL_CC", ""),
+    }
 
-    GENERATED.parent.mkdir(parents=True, exist_ok=True)
-    GENERATED.write_text(
-        yaml.dump({"checks": checks}, allow_unicode=True, default_flow_style=False),
-        encoding="utf-8",
-    )
-    return len(checks)
 
+def _namespace_conf(name: str, body: Dict[str, Any]) -> Dict[str, str]:
+    clusters = body.get("clusters", [])
+    if isinstance(clusters, list):
+        clusters_str = ",".join(clusters)
+    else:
+        clusters_str = str(clusters)
+
+    return {
+        "CLUSTERS":            clusters_str,
+        "NAMESPACE_ENABLED":   _bool_str(body.get("namespace_enabled", True)),
+        "POD_HEALTH_ENABLED":  "true",
+        "ZABBIX_ENABLED":      _bool_str(body.get("zabbix_enabled", False)),
+        "MAIL_ENABLED":        _bool_str(body.get("mail_enabled", False)),
+        "SEVERITY":            str(body.get("severity", "5")),
+        "NODE":                str(body.get("node", "OCP")),
+        "DEPARTMENT":          str(body.get("department", "")),
+        "POD_HEALTH_ALERTKEY": str(body.get("alertkey", "OCP_POD_HEALTH")),
+        "ALERTGROUP":          str(body.get("alertgroup", f"{name}AlertGroup")),
+        "MAIL_TO":             str(body.get("mail_to", "")),
+        "MAIL_CC":             str(body.get("mail_cc", "")),
+    }
 
-# ── Namespaces ────────────────────────────────────────
 
 @router.get("/namespaces")
 async def list_namespaces() -> List[Dict[str, Any]]:
@@ -101,24 +93,10 @@ async def list_namespaces() -> List[Dict[str, Any]]:
             return []
         result = []
         for f in sorted(CONF_D.glob("*.conf")):
-            raw = _read_conf(f)
-            result.append({
-                "name":              f.stem,
-                "namespace_enabled": _is_true(raw.get("NAMESPACE_ENABLED")),
-                "clusters":          [c.strip() for c in raw.get("CLUSTERS", "").split(",") if c.strip()],
-                "zabbix_enabled":    _is_true(raw.get("ZABBIX_ENABLED")),
-                "mail_enabled":      _is_true(raw.get("MAIL_ENABLED")),
-                "severity":          raw.get("SEVERITY", "5"),
-                "node":              raw.get("NODE", ""),
-                "department":        raw.get("DEPARTMENT", ""),
-                "alertkey":          raw.get("POD_HEALTH_ALERTKEY", "OCP_POD_HEALTH"),
-                "alertgroup":        raw.get("ALERTGROUP", ""),
-                "mail_to":           raw.get("MAIL_TO", ""),
-                "mail_cc":           raw.get("MAIL_CC", ""),
-            })
+            result.append(_namespace_view(f.stem, _read_conf(f)))
         return result
 
-    return _list_namespaces()
+    return await run_blocking(_list_namespaces)
 
 
 @router.get("/namespaces/{name}")
@@ -127,72 +105,56 @@ async def get_namespace(name: str) -> Dict[str, Any]:
         f = CONF_D / f"{name}.conf"
         if not f.exists():
             raise HTTPException(404, f"Namespace '{name}' not found")
-        raw = _read_conf(f)
-        return {
-            "name":              name,
-            "namespace_enabled": _is_true(raw.get("NAMESPACE_ENABLED")),
-            "clusters":          [c.strip() for c in raw.get("CLUSTERS", "").split(",") if c.strip()],
-            "zabbix_enabled":    _is_true(raw.get("ZABBIX_ENABLED")),
-            "mail_enabled":      _is_true(raw.get("MAIL_ENABLED")),
-            "severity":          raw.get("SEVERITY", "5"),
-            "node":              raw.get("NODE", ""),
-            "department":        raw.get("DEPARTMENT", ""),
-            "alertkey":          raw.get("POD_HEALTH_ALERTKEY", "OCP_POD_HEALTH"),
-            "alertgroup":        raw.get("ALERTGROUP", ""),
-            "mail_to":           raw.get("MAIL_TO", ""),
-            "mail_cc":           raw.get("MAIL_CC", ""),
-        }
+        return _namespace_view(name, _read_conf(f))
 
-    return _get_namespace()
+    return await run_blocking(_get_namespace)
 
 
 @router.put("/namespaces/{name}", dependencies=[Depends(require_admin)])
 async def upsert_namespace(name: str, body: Dict[str, Any]) -> Dict[str, Any]:
     def _upsert_namespace() -> Dict[str, Any]:
         f = CONF_D / f"{name}.conf"
-        clusters = body.get("clusters", [])
-        if isinstance(clusters, list):
-            clusters_str = ",".join(clusters)
-        else:
-            clusters_str = str(clusters)
-
-        data = {
-            "CLUSTERS":            clusters_str,
-            "NAMESPACE_ENABLED":   _bool_str(body.get("namespace_enabled", True)),
-            "POD_HEALTH_ENABLED":  "true",
-            "ZABBIX_ENABLED":      _bool_str(body.get("zabbix_enabled", False)),
-            "MAIL_ENABLED":        _bool_str(body.get("mail_enabled", False)),
-            "SEVERITY":            str(body.get("severity", "5")),
-            "NODE":                str(body.get("node", "OCP")),
-            "DEPARTMENT":          str(body.get("department", "")),
-            "POD_HEALTH_ALERTKEY": str(body.get("alertkey", "OCP_POD_HEALTH")),
-            "ALERTGROUP":          str(body.get("alertgroup", f"{name}AlertGroup")),
-            "MAIL_TO":             str(body.get("mail_to", "")),
-            "MAIL_CC":             str(body.get("mail_cc", "")),
-        }
-        _write_conf(f, data)
-        count = _generate_yaml()
-        return {"ok": True, "name": name, "generated_checks": count}
+        with file_lock(f):
+            _write_conf(f, _namespace_conf(name, body))
+        return {"ok": True, "name": name, **_regenerate()}
 
-    return _upsert_namespace()
+    return await run_blocking(_upsert_namespace)
 
 
 @router.delete("/namespaces/{name}", dependencies=[Depends(require_admin)])
 async def delete_namespace(name: str) -> Dict[str, Any]:
     def _delete_namespace() -> Dict[str, Any]:
         f = CONF_D / f"{name}.conf"
-        if not f.exists():
-            raise HTTPException(404, f"Namespace '{name}' not found")
-        f.unlink()
-        count = _generate_yaml()
-        return {"ok": True, "name": name, "generated_checks": count}
+        with file_lock(f):
+            if not f.exists():
+                raise HTTPException(404, f"Namespace '{name}' not found")
+            f.unlink()
+        return {"ok": True, "name": name, **_regenerate()}
 
-    return _delete_namespace()
+    return await run_blocking(_delete_namespace)
 
 
 # ── Clusters ──────────────────────────────────────────
 # Tek kaynak: observe.yaml (Secrets sayfasında eklenen cluster'lar burada görünür)
 
+def _merge_cluster(clusters: List[Dict[str, Any]], name: str, body: Dict[str, Any]) -> None:
+    """ocp_api ve insecure alanlarını yerinde günceller/ekler; prometheus ve diğer alanları korur."""
+    for i, c in enumerate(clusters):
+        if isinstance(c, dict) and c.get("name") == name:
+            clusters[i] = {
+                **c,
+                "name":     name,
+                "ocp_api":  str(body.get("ocp_api", c.get("ocp_api", ""))),
+                "insecure": bool(body.get("insecure", c.get("insecure", True))),
+            }
+            return
+    clusters.append({
+        "name":     name,
+        "ocp_api":  str(body.get("ocp_api", "")),
+        "insecure": bool(body.get("insecure", True)),
+    })
+
+
 @router.get("/clusters")
 async def list_clusters() -> List[Dict[str, Any]]:
     def _list_clusters() -> List[Dict[str, Any]]:
@@ -210,7 +172,7 @@ async def list_clusters() -> List[Dict[str, Any]]:
             })
         return result
 
-    return _list_clusters()
+    return await run_blocking(_list_clusters)
 
 
 @router.get("/clusters/{name}")
@@ -226,55 +188,47 @@ async def get_cluster(name: str) -> Dict[str, Any]:
                 }
         raise HTTPException(404, f"Cluster '{name}' not found")
 
-    return _get_cluster()
+    return await run_blocking(_get_cluster)
 
 
 @router.put("/clusters/{name}", dependencies=[Depends(require_admin)])
 async def upsert_cluster(name: str, body: Dict[str, Any]) -> Dict[str, Any]:
     """ocp_api ve insecure alanlarını günceller; prometheus ve diğer alanları korur."""
     def _upsert_cluster() -> Dict[str, Any]:
-        data     = _read_observe_yaml()
-        clusters = data.get("clusters", [])
-        found    = False
-        for i, c in enumerate(clusters):
-            if isinstance(c, dict) and c.get("name") == name:
-                clusters[i] = {
-                    **c,
-                    "name":     name,
-                    "ocp_api":  str(body.get("ocp_api", c.get("ocp_api", ""))),
-                    "insecure": bool(body.get("insecure", c.get("insecure", True))),
-                }
-                found = True
-                break
-        if not found:
-            clusters.append({
-                "name":     name,
-                "ocp_api":  str(body.get("ocp_api", "")),
-                "insecure": bool(body.get("insecure", True)),
-            })
-        data["clusters"] = clusters
-        _write_observe_yaml(data)
+        with _locked_observe_yaml() as data:
+            _merge_cluster(data["clusters"], name, body)
         return {"ok": True, "name": name}
 
-    return _upsert_cluster()
+    return await run_blocking(_upsert_cluster)
 
 
 @router.delete("/clusters/{name}", dependencies=[Depends(require_admin)])
 async def delete_cluster(name: str) -> Dict[str, Any]:
     def _delete_cluster() -> Dict[str, Any]:
-        data     = _read_observe_yaml()
-        clusters = [c for c in data.get("clusters", []) if isinstance(c, dict) and c.get("name") != name]
-        data["clusters"] = clusters
-        _write_observe_yaml(data)
+        with _locked_observe_yaml() as data:
+            data["clusters"] = [c for c in data["clusters"] if c.get("name") != name]
         return {"ok": True, "name": name}
 
-    return _delete_cluster()
+    return await run_blocking(_delete_cluster)
 
 
 @router.post("/generate", dependencies=[Depends(require_admin)])
-async def generate() -> Dict[str, Any]:
-    count = _generate_yaml()
-    return {"ok": True, "generated_checks": count}
+async def generate(full: bool = Query(False, description="Manifest'i yok sayıp tüm namespace'leri yeniden üret")) -> Dict[str, Any]:
+    result = await run_blocking(generation.run_now, full)
+    return {
+        "ok": True,
+        "generated_checks": result.count,
+        "written": result.written,
+        "rendered_namespaces": len(result.rendered),
+        "removed_namespaces": len(result.removed),
+        "files": result.files,
+    }
+
+
+@router.get("/generate/status")
+async def generate_status() -> Dict[str, Any]:
+    """Bekleyen / çalışan / son tamamlanan üretim ve süreleri."""
+    return generation.status()
 
 
 # ── Observe clusters (observe.yaml) ───────────────────
@@ -293,16 +247,25 @@ def _read_observe_yaml() -> Dict[str, Any]:
     data["clusters"] = clusters
     return data
 
-def _write_observe_yaml(data: Dict[str, Any]) -> None:
+def _observe_yaml_text(data: Dict[str, Any]) -> str:
+    return yaml.dump(data, allow_unicode=True, default_flow_style=False)
+
+@contextmanager
+def _locked_observe_yaml() -> Iterator[Dict[str, Any]]:
+    """
+    observe.yaml read-modify-write: bulk import ile aynı dosya kilidi altında okur,
+    blok hatasız biterse atomik yazar.
+    """
     p = _observe_yaml_path()
-    p.parent.mkdir(parents=True, exist_ok=True)
-    with open(p, "w") as f:
-        yaml.dump(data, f, allow_unicode=True, default_flow_style=False)
+    with file_lock(p):
+        data = _read_observe_yaml()
+        yield data
+        atomic_write_text(p, _observe_yaml_text(data))
 
 
 @router.get("/observe-clusters")
 async def list_observe_clusters() -> List[Dict[str, Any]]:
-    data = _read_observe_yaml()
+    data = await run_blocking(_read_observe_yaml)
     return data.get("clusters", [])
 
 
@@ -317,30 +280,213 @@ async def upsert_observe_cluster(name: str, body: Dict[str, Any]) -> Dict[str, A
             "prometheus_url":        str(body.get("prometheus_url", "")),
             "prometheus_token_file": str(ALARMFW_SECRETS / f"{name}-prometheus.token"),
         }
-        data = _read_observe_yaml()
-        clusters = data.get("clusters", [])
-        found = False
-        for i, c in enumerate(clusters):
-            if isinstance(c, dict) and c.get("name") == name:
-                clusters[i] = entry
-                found = True
-                break
-        if not found:
-            clusters.append(entry)
-        data["clusters"] = clusters
-        _write_observe_yaml(data)
+        with _locked_observe_yaml() as data:
+            clusters = data["clusters"]
+            for i, c in enumerate(clusters):
+                if c.get("name") == name:
+                    clusters[i] = entry
+                    break
+            else:
+                clusters.append(entry)
         return {"ok": True, "name": name}
 
-    return _upsert_observe_cluster()
+    return await run_blocking(_upsert_observe_cluster)
 
 
 @router.delete("/observe-clusters/{name}", dependencies=[Depends(require_admin)])
 async def delete_observe_cluster(name: str) -> Dict[str, Any]:
     def _delete_observe_cluster() -> Dict[str, Any]:
-        data = _read_observe_yaml()
-        clusters = [c for c in data.get("clusters", []) if isinstance(c, dict) and c.get("name") != name]
-        data["clusters"] = clusters
-        _write_observe_yaml(data)
+        with _locked_observe_yaml() as data:
+            data["clusters"] = [c for c in data["clusters"] if c.get("name") != name]
         return {"ok": True, "name": name}
 
-    return _delete_observe_cluster()
+    return await run_blocking(_delete_observe_cluster)
+
+
+# ── Bulk onboarding / export ──────────────────────────
+# Tek istekte cluster (observe.yaml + token) ve namespace (conf.d) yazımı; üretim bir kez bildirilir.
+# Gövde JSON ya da YAML ({"clusters": [...], "namespaces": [...], "delete_namespaces": [...]}),
+# veya yalnızca namespace satırları içeren CSV olabilir. Export aynı biçimi döner.
+
+_NS_NAME      = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]*$")
+_CLUSTER_NAME = re.compile(r"^[A-Za-z0-9_-]+$")      # token dosya adı (bkz. secrets.upload_secret)
+
+_CSV_FIELDS = (
+    "name", "clusters", "namespace_enabled", "zabbix_enabled", "mail_enabled", "severity",
+    "node", "department", "alertkey", "alertgroup", "mail_to", "mail_cc",
+)
+_CSV_BOOLS = ("namespace_enabled", "zabbix_enabled", "mail_enabled")
+
+
+def _parse_csv(text: str) -> Dict[str, Any]:
+    """CSV: başlık satırı + namespace başına bir satır; clusters ';' ile ayrılır."""
+    namespaces = []
+    for row in csv.DictReader(io.StringIO(text)):
+        item: Dict[str, Any] = {k: (v or "").strip() for k, v in row.items() if k and v is not None and v.strip() != ""}
+        if "clusters" in item:
+            item["clusters"] = [c.strip() for c in item["clusters"].split(";") if c.strip()]
+        for key in _CSV_BOOLS:
+            if key in item:
+                item[key] = item[key].lower() in ("true", "1", "yes")
+        namespaces.append(item)
+    return {"namespaces": namespaces}
+
+
+def _parse_bulk(raw: bytes, content_type: str) -> Dict[str, Any]:
+    ctype = content_type.split(";")[0].strip().lower()
+    text = raw.decode("utf-8-sig")
+    try:
+        if ctype == "text/csv":
+            return _parse_csv(text)
+        if ctype in ("application/yaml", "application/x-yaml", "text/yaml", "text/x-yaml"):
+            data = load_yaml(text)
+        else:
+            data = json.loads(text or "{}")
+    except (ValueError, yaml.YAMLError, csv.Error) as e:
+        raise HTTPException(400, f"Invalid bulk body: {e}")
+    if not isinstance(data, dict):
+        raise HTTPException(400, "Bulk body must be an object")
+    return data
+
+
+def _bulk_errors(payload: Dict[str, Any]) -> List[Dict[str, str]]:
+    errors: List[Dict[str, str]] = []
+
+    def _items(key: str) -> List[Any]:
+        items = payload.get(key) or []
+        if not isinstance(items, list):
+            errors.append({"loc": key, "msg": "must be a list"})
+            return []
+        return items
+
+    def _check_names(key: str, items: List[Any], pattern: "re.Pattern[str]") -> None:
+        seen = set()
+        for i, item in enumerate(items):
+            name = item.get("name") if isinstance(item, dict) else item if key == "delete_namespaces" else None
+            if not isinstance(name, str) or not pattern.match(name):
+                errors.append({"loc": f"{key}.{i}.name", "msg": f"invalid name: {name!r}"})
+            elif name in seen:
+                errors.append({"loc": f"{key}.{i}.name", "msg": f"duplicate name: {name}"})
+            seen.add(name)
+
+    clusters = _items("clusters")
+    namespaces = _items("namespaces")
+    deletes = _items("delete_namespaces")
+    _check_names("clusters", clusters, _CLUSTER_NAME)
+    _check_names("namespaces", namespaces, _NS_NAME)
+    _check_names("delete_namespaces", deletes, _NS_NAME)
+    for i, c in enumerate(clusters):
+        if not isinstance(c, dict):
+            continue
+        api = c.get("ocp_api")
+        if api is not None and api != "" and not str(api).startswith(("http://", "https://")):
+            errors.append({"loc": f"clusters.{i}.ocp_api", "msg": "must be an http(s) URL"})
+        if c.get("token") is not None and not str(c["token"]).strip():
+            errors.append({"loc": f"clusters.{i}.token", "msg": "must not be empty"})
+    for i, ns in enumerate(namespaces):
+        if isinstance(ns, dict) and not isinstance(ns.get("clusters", []), (list, str)):
+            errors.append({"loc": f"namespaces.{i}.clusters", "msg": "must be a list or comma separated string"})
+    overlap = {n.get("name") for n in namespaces if isinstance(n, dict)} & {d for d in deletes if isinstance(d, str)}
+    for name in sorted(overlap):
+        errors.append({"loc": "delete_namespaces", "msg": f"{name} is both upserted and deleted"})
+    return errors
+
+
+def _bulk_onboard(payload: Dict[str, Any], dry_run: bool) -> Dict[str, Any]:
+    errors = _bulk_errors(payload)
+    if errors:
+        raise HTTPException(422, {"message": "Invalid bulk onboarding request", "errors": errors})
+
+    clusters: List[Dict[str, Any]] = payload.get("clusters") or []
+    namespaces: List[Dict[str, Any]] = payload.get("namespaces") or []
+    deletes: List[str] = payload.get("delete_namespaces") or []
+    missing = [n for n in deletes if not (CONF_D / f"{n}.conf").exists()]
+    if missing:
+        raise HTTPException(404, f"Namespaces not found: {', '.join(missing)}")
+
+    tokens = {
+        ALARMFW_SECRETS / f"{c['name']}.token": str(c["token"]).strip()
+        for c in clusters if c.get("token") is not None
+    }
+    summary = {
+        "clusters": len(clusters), "tokens": len(tokens),
+        "namespaces": len(namespaces), "deleted_namespaces": len(deletes),
+    }
+    if dry_run:
+        return {"ok": True, "dry_run": True, **summary}
+
+    # Token'lar üretimi etkilemez; önce 0600 izinle yazılır ki check'ler oluştuğunda hazır olsunlar
+    if tokens:
+        atomic_write_many(tokens, mode=0o600)
+
+    observe = _observe_yaml_path()
+    changes: Dict[Path, Optional[str]] = {}
+    for ns in namespaces:
+        changes[CONF_D / f"{ns['name']}.conf"] = _format_conf(_namespace_conf(ns["name"], ns))
+    for name in deletes:
+        changes[CONF_D / f"{name}.conf"] = None
+    with file_locks([observe, *changes]):
+        if clusters:
+            data = _read_observe_yaml()
+            for c in clusters:
+                _merge_cluster(data["clusters"], c["name"], c)
+            changes[observe] = _observe_yaml_text(data)
+        if changes:
+            atomic_write_many(changes)
+
+    return {"ok": True, **summary, "files_written": len(changes) + len(tokens), **_regenerate()}
+
+
+@router.post("/bulk", dependencies=[Depends(require_admin)])
+async def bulk_onboard(
+    request: Request,
+    dry_run: bool = Query(False, description="Yalnızca doğrula, hiçbir dosyaya yazma"),
+) -> Dict[str, Any]:
+    """
+    Cluster'ları (observe.yaml + opsiyonel token), namespace'leri (conf.d) tek geçişte yazar
+    ve generated check'lerin üretimini bir kez tetikler. Namespace alanları PUT /namespaces/{name} ile aynıdır.
+    """
+    raw = await request.body()
+    payload = await run_blocking(_parse_bulk, raw, request.headers.get("content-type", ""))
+    return await run_blocking(_bulk_onboard, payload, dry_run)
+
+
+def _bulk_export() -> Dict[str, Any]:
+    data = _read_observe_yaml()
+    clusters = [{
+        "name":      c["name"],
+        "ocp_api":   c.get("ocp_api", ""),
+        "insecure":  bool(c.get("insecure", True)),
+        "has_token": (ALARMFW_SECRETS / f"{c['name']}.token").exists(),
+    } for c in data.get("clusters", []) if c.get("name")]
+    namespaces = [_namespace_view(f.stem, _read_conf(f)) for f in sorted(CONF_D.glob("*.conf"))] if CONF_D.exists() else []
+    return {"clusters": clusters, "namespaces": namespaces}
+
+
+def _export_csv(namespaces: List[Dict[str, Any]]) -> str:
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=_CSV_FIELDS, lineterminator="\n")
+    writer.writeheader()
+    for ns in namespaces:
+        row = {k: ns.get(k, "") for k in _CSV_FIELDS}
+        row["clusters"] = ";".join(ns["clusters"])
+        for key in _CSV_BOOLS:
+            row[key] = _bool_str(ns[key])
+        writer.writerow(row)
+    return buf.getvalue()
+
+
+@router.get("/bulk/export")
+async def bulk_export(
+    format: str = Query("json", pattern="^(json|yaml|csv)$"),
+) -> Any:
+    """POST /bulk'a olduğu gibi geri verilebilen export (token içerikleri dahil edilmez)."""
+    data = await run_blocking(_bulk_export)
+    if format == "yaml":
+        return Response(dump_yaml(data), media_type="application/yaml")
+    if format == "csv":
+        return Response(
+            _export_csv(data["namespaces"]), media_type="text/csv",
+            headers={"Content-Disposition": 'attachment; filename="namespaces.csv"'},
+        )
+    return data
@@ -1,28 +1,61 @@
-import json
-import sqlite3
-import yaml
-from fastapi import APIRouter, Query
+import threading
+from fastapi import APIRouter, HTTPException, Query, Request, Response
 from typing import Any, Dict, List, Optional, Set, Tuple
 from pathlib import Path
-from config import ALARMFW_CONFIG, ALARMFW_STATE
+from config import ALARMFW_CONFIG
+from async_utils import run_blocking
+from fast_json import FastJSONResponse, fast_json
+from routers import _etag, _monitor_index
+from routers._check_catalog import generated_files, load_yaml
+from routers._fields import parse_fields
 
 router = APIRouter(prefix="/api/monitor", tags=["monitor"])
 
 OCP_CONF_DIR = ALARMFW_CONFIG / "generated"
-STATE_DB     = ALARMFW_STATE / "alarmfw.sqlite"
+
+
+def _config_files() -> List[Path]:
+    return generated_files(OCP_CONF_DIR)
+
+
+_config_pairs_cache: Tuple[Any, List[Tuple[str, str]]] = (None, [])
+# dosya → ((mtime_ns, size), o dosyadaki çiftler); shard'lı düzende yalnızca değişen shard parse edilir
+_config_file_pairs: Dict[Path, Tuple[Tuple[int, int], List[Tuple[str, str]]]] = {}
 
 
 def _config_ns_clusters() -> List[Tuple[str, str]]:
     """
-    generated/ altındaki yaml'lardan (namespace, cluster) çiftlerini döner.
+    generated/ altındaki yaml'lardan (ve shard dizinlerinden) (namespace, cluster) çiftlerini döner.
     ocp_pod_health ve ocp_cluster_snapshot tiplerini destekler.
+    Dosyaların mtime/size parmak izi değişmedikçe yaml'lar yeniden parse edilmez.
     """
+    global _config_pairs_cache
+    files = _config_files()
+    fingerprint = _etag.files_fingerprint(files)
+    if _config_pairs_cache[0] == fingerprint:
+        return _config_pairs_cache[1]
+    stamps = {Path(p): (mtime, size) for p, mtime, size in fingerprint}
+    for stale in set(_config_file_pairs) - set(stamps):
+        del _config_file_pairs[stale]
+    pairs: List[Tuple[str, str]] = []
+    for f in files:
+        stamp = stamps.get(f)
+        if stamp is None:
+            continue
+        cached = _config_file_pairs.get(f)
+        if cached is None or cached[0] != stamp:
+            cached = (stamp, _scan_config_ns_clusters([f]))
+            _config_file_pairs[f] = cached
+        pairs.extend(cached[1])
+    _config_pairs_cache = (fingerprint, pairs)
+    return pairs
+
+
+def _scan_config_ns_clusters(files: List[Path]) -> List[Tuple[str, str]]:
     pairs: List[Tuple[str, str]] = []
-    if not OCP_CONF_DIR.exists():
-        return pairs
-    for f in OCP_CONF_DIR.glob("*.yaml"):
+    for f in files:
         try:
-            data = yaml.safe_load(f.read_text()) or {}
+            data = load_yaml(f.read_text()) or {}
         except Exception:
             continue
         for check in data.get("checks", []) or []:
@@ -45,95 +78,285 @@ def _config_ns_clusters() -> List[Tuple[str, str]]:
     return pairs
 
 
-def _read_sqlite_alarms() -> List[Dict[str, Any]]:
-    """SQLite alarm_state tablosundan son payload'ları okur."""
-    if not STATE_DB.exists():
-        return []
+# Monitor satırı alanları (bkz. _monitor_index.row_from_payload)
+_ROW_FIELDS = ("namespace", "cluster", "status", "timestamp_utc", "pods", "alarm_name", "severity")
+
+
+def _parse_monitor_fields(raw: Optional[str]) -> Optional[List[str]]:
+    fields = parse_fields(raw)
+    if fields is None:
+        return None
+    unknown = [f for f in fields if f not in _ROW_FIELDS]
+    if unknown:
+        raise HTTPException(400, f"Unknown monitor field(s): {', '.join(unknown)}")
+    return fields
+
+
+def _read_sqlite_alarms(cluster: Optional[str] = None, namespace: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    alarm_state son snapshot satırları. Süreç içi index'ten okunur; index yalnızca
+    DB değiştiğinde ve yalnızca değişen satırlar için payload decode eder.
+    """
     try:
-        conn = sqlite3.connect(str(STATE_DB), timeout=5)
-        conn.execute("PRAGMA journal_mode=WAL;")
-        cur = conn.execute(
-            "SELECT last_status, payload_json FROM alarm_state WHERE payload_json IS NOT NULL"
-        )
-        results = []
-        for status, pjson in cur.fetchall():
-            try:
-                data = json.loads(pjson)
-                ev   = data.get("evidence") or {}
-                results.append({
-                    "namespace":     ev.get("namespace", ""),
-                    "cluster":       ev.get("cluster", ""),
-                    "status":        data.get("status", status),
-                    "timestamp_utc": data.get("timestamp_utc", ""),
-                    "pods":          ev.get("pods", []),
-                    "alarm_name":    data.get("alarm_name", ""),
-                    "severity":      data.get("severity", ""),
-                })
-            except Exception:
-                continue
-        conn.close()
-        return results
+        return _monitor_index.index.rows(cluster, namespace)
     except Exception:
         return []
 
 
+def _db_pairs() -> Set[Tuple[str, str]]:
+    """SQLite snapshot'larındaki (cluster, namespace) çiftleri."""
+    try:
+        return _monitor_index.index.pairs()
+    except Exception:
+        return set()
+
+
+def _config_etag() -> str:
+    """DB değişikliği + generated/ yaml'larının mtime'ları."""
+    return _etag.compute(_etag.files_fingerprint(_config_files()))
+
+
+# ── health matrix ─────────────────────────────────────────────────────────────
+
+_STATUS_RANK = {"ERROR": 3, "PROBLEM": 2, "OK": 1}
+_PROBLEM_STATUSES = ("PROBLEM", "ERROR")
+_HEALTHY_PHASES = ("running", "succeeded")
+MATRIX_CELL_FIELDS = ["status", "severity", "problem_pods"]
+
+_matrix_lock = threading.Lock()
+_matrix_cache: Tuple[Optional[str], Dict[str, Any]] = (None, {})
+
+
+def _build_matrix() -> Dict[str, Any]:
+    """
+    cluster × namespace yoğun matrisi. Bir hücrede birden çok snapshot varsa en kötü
+    statü (ERROR > PROBLEM > OK) ve o statüdeki snapshot'ların en yüksek severity'si
+    alınır; problem_pods PROBLEM/ERROR snapshot'larındaki sağlıksız podların
+    (_pod_unhealthy) toplamıdır. Config'te olup henüz verisi olmayan çiftler
+    [None, None, 0], hiç tanımlı olmayanlar null'dır.
+    """
+    cells: Dict[Tuple[str, str], List[Any]] = {}
+    for ns, cl in _config_ns_clusters():
+        cells.setdefault((cl, ns), [None, None, 0])
+    for row in _read_sqlite_alarms():
+        cl, ns = row["cluster"], row["namespace"]
+        if not cl or not ns:
+            continue
+        cell = cells.setdefault((cl, ns), [None, None, 0])
+        status = row.get("status") or ""
+        severity = row.get("severity") or None
+        rank, cell_rank = _STATUS_RANK.get(status, 0), _STATUS_RANK.get(cell[0] or "", 0)
+        if rank > cell_rank or (
+            rank == cell_rank and cell[0] is not None and _severity_rank(severity) > _severity_rank(cell[1])
+        ):
+            cell[0], cell[1] = status, severity
+        if status in _PROBLEM_STATUSES:
+            cell[2] += sum(1 for pod in row.get("pods") or [] if _pod_unhealthy(pod))
+
+    clusters   = sorted({cl for cl, _ in cells})
+    namespaces = sorted({ns for _, ns in cells})
+    cl_index   = {cl: i for i, cl in enumerate(clusters)}
+    ns_index   = {ns: j for j, ns in enumerate(namespaces)}
+    matrix: List[List[Optional[List[Any]]]] = [[None] * len(namespaces) for _ in clusters]
+    for (cl, ns), cell in cells.items():
+        matrix[cl_index[cl]][ns_index[ns]] = cell
+    return {
+        "clusters":    clusters,
+        "namespaces":  namespaces,
+        "cell_fields": MATRIX_CELL_FIELDS,
+        "cells":       matrix,
+    }
+
+
+def _severity_rank(severity: Optional[str]) -> int:
+    """Zabbix severity'si (0-5, büyük olan daha ağır); sayısal değilse en düşük."""
+    try:
+        return int(severity)  # type: ignore[arg-type]
+    except (TypeError, ValueError):
+        return -1
+
+
+def _get_matrix(etag: str) -> Dict[str, Any]:
+    """Matris veri (DB veya config) değiştiğinde bir kez kurulur, tüm istemciler paylaşır."""
+    global _matrix_cache
+    if _matrix_cache[0] == etag:
+        return _matrix_cache[1]
+    with _matrix_lock:
+        if _matrix_cache[0] != etag:
+            _matrix_cache = (etag, _build_matrix())
+        return _matrix_cache[1]
+
+
+# ── pod filtreleri ────────────────────────────────────────────────────────────
+# evidence.pods elemanları check tipine göre farklı anahtarlar taşıyabilir;
+# yaygın adlandırmalar (phase/status, ready, restarts/restart_count) kabul edilir.
+
+def _pod_name(pod: Any) -> str:
+    return str(pod.get("name", "")) if isinstance(pod, dict) else str(pod)
+
+
+def _pod_phase(pod: Any) -> str:
+    if not isinstance(pod, dict):
+        return ""
+    return str(pod.get("phase") or pod.get("status") or "")
+
+
+def _pod_ready(pod: Any) -> Optional[bool]:
+    """ready: bool veya "1/2" biçiminde olabilir; bilinmiyorsa None."""
+    if not isinstance(pod, dict):
+        return None
+    ready = pod.get("ready")
+    if isinstance(ready, bool):
+        return ready
+    if isinstance(ready, str) and "/" in ready:
+        have, _, want = ready.partition("/")
+        return have.strip() == want.strip()
+    return None
+
+
+def _pod_restarts(pod: Any) -> int:
+    if not isinstance(pod, dict):
+        return 0
+    for key in ("restarts", "restart_count", "restartCount"):
+        try:
+            return int(pod[key])
+        except (KeyError, TypeError, ValueError):
+            continue
+    return 0
+
+
+def _pod_unhealthy(pod: Any) -> bool:
+    """Hazır değil, phase Running/Succeeded dışında ya da restart etmiş pod; bilinmeyen alanlar sağlıklı sayılır."""
+    if _pod_ready(pod) is False or _pod_restarts(pod) > 0:
+        return True
+    phase = _pod_phase(pod).lower()
+    return bool(phase) and phase not in _HEALTHY_PHASES
+
+
+class _PodQuery:
+    def __init__(
+        self,
+        phase:        Optional[str],
+        not_ready:    bool,
+        restarts_gt:  Optional[int],
+        name_prefix:  Optional[str],
+        limit:        Optional[int],
+        offset:       int,
+    ) -> None:
+        self.phases = {p.strip().lower() for p in phase.split(",") if p.strip()} if phase else set()
+        self.not_ready = not_ready
+        self.restarts_gt = restarts_gt
+        self.name_prefix = name_prefix or ""
+        self.limit = limit
+        self.offset = offset
+
+    @property
+    def active(self) -> bool:
+        return bool(self.phases or self.not_ready or self.restarts_gt is not None
+                    or self.name_prefix or self.limit is not None or self.offset)
+
+    def matches(self, pod: Any) -> bool:
+        if self.phases and _pod_phase(pod).lower() not in self.phases:
+            return False
+        if self.not_ready and _pod_ready(pod) is not False:
+            return False
+        if self.restarts_gt is not None and _pod_restarts(pod) <= self.restarts_gt:
+            return False
+        if self.name_prefix and not _pod_name(pod).startswith(self.name_prefix):
+            return False
+        return True
+
+    def apply(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        """Satırın pod listesini filtreleyip sayfalar; index'teki satır değiştirilmez."""
+        pods = [p for p in row.get("pods") or [] if self.matches(p)]
+        end = None if self.limit is None else self.offset + self.limit
+        return {**row, "pods": pods[self.offset:end], "pods_total": len(pods)}
+
+
 # ── endpoints ─────────────────────────────────────────────────────────────────
 
-@router.get("/pods")
+@router.get("/pods", response_class=FastJSONResponse)
 async def get_pods(
+    request:   Request,
+    response:  Response,
     cluster:   Optional[str] = Query(None),
     namespace: Optional[str] = Query(None),
+    fields:    Optional[str] = Query(None, description="Virgülle ayrılmış alanlar, ör. namespace,cluster,status"),
+    pod_phase:        Optional[str] = Query(None, description="Virgülle ayrılmış pod phase'leri, ör. Pending,Failed"),
+    pod_not_ready:    bool          = Query(False),
+    pod_restarts_gt:  Optional[int] = Query(None, ge=0),
+    pod_name_prefix:  Optional[str] = Query(None),
+    pod_limit:        Optional[int] = Query(None, ge=0, le=1000),
+    pod_offset:       int           = Query(0, ge=0),
 ) -> List[Dict[str, Any]]:
     """
     ?cluster=X   → o cluster'daki tüm namespace'lerin son snapshot'ı
     ?namespace=X → tüm cluster'lardaki o namespace'in snapshot'ı
     İkisi birden verilirse cluster + namespace filtresi uygulanır.
+    ?fields=...  → yalnızca istenen alanlar döner.
+    ?pod_*       → her snapshot'ın pod listesi sunucuda filtrelenir/sayfalanır;
+                   pods_total filtreye uyan pod sayısını (sayfalamadan önce) verir.
     Sadece PROBLEM veya ERROR statüsleri döner.
     """
-    def _get_pods() -> List[Dict[str, Any]]:
-        alarms = _read_sqlite_alarms()
-        results = []
-
-        for item in alarms:
-            ns = item["namespace"]
-            cl = item["cluster"]
-
-            if cluster and namespace:
-                if cl != cluster or ns != namespace:
-                    continue
-            elif cluster:
-                if cl != cluster:
-                    continue
-            elif namespace:
-                if ns != namespace:
-                    continue
-
-            results.append(item)
+    wanted = _parse_monitor_fields(fields)
+    pod_query = _PodQuery(pod_phase, pod_not_ready, pod_restarts_gt, pod_name_prefix, pod_limit, pod_offset)
+    cached = _etag.not_modified(request, response, await run_blocking(_etag.compute))
+    if cached is not None:
+        return cached
 
+    def _get_pods() -> List[Dict[str, Any]]:
+        results = _read_sqlite_alarms(cluster or None, namespace or None)
         results = [r for r in results if r.get("status") in ("PROBLEM", "ERROR")]
         results.sort(key=lambda r: (r["namespace"], r["cluster"]))
+        if pod_query.active and (wanted is None or "pods" in wanted):
+            results = [pod_query.apply(r) for r in results]
+            if wanted is not None:
+                results = [{f: r[f] for f in [*wanted, "pods_total"]} for r in results]
+        elif wanted is not None:
+            results = [{f: r[f] for f in wanted} for r in results]
         return results
 
-    return _get_pods()
+    return fast_json(await run_blocking(_get_pods), response)
+
+
+@router.get("/matrix")
+async def get_matrix(request: Request, response: Response) -> Dict[str, Any]:
+    """
+    Overview heatmap için cluster × namespace sağlık matrisi:
+    cells[i][j] = [status, severity, problem_pods] (clusters[i], namespaces[j]) veya null.
+    """
+    etag = await run_blocking(_config_etag)
+    cached = _etag.not_modified(request, response, etag)
+    if cached is not None:
+        return cached
+    return await run_blocking(_get_matrix, etag)
 
 
 @router.get("/namespaces")
-async def list_monitor_namespaces() -> List[str]:
+async def list_monitor_namespaces(request: Request, response: Response) -> List[str]:
     """Config + SQLite'tan tüm namespace'leri döner."""
+    cached = _etag.not_modified(request, response, await run_blocking(_config_etag))
+    if cached is not None:
+        return cached
+
     def _list_monitor_namespaces() -> List[str]:
         from_config: Set[str] = {ns for ns, _ in _config_ns_clusters()}
-        from_db: Set[str] = {r["namespace"] for r in _read_sqlite_alarms() if r["namespace"]}
+        from_db: Set[str] = {ns for _, ns in _db_pairs() if ns}
         return sorted(from_config | from_db)
 
-    return _list_monitor_namespaces()
+    return await run_blocking(_list_monitor_namespaces)
 
 
 @router.get("/clusters")
-async def list_monitor_clusters() -> List[str]:
+async def list_monitor_clusters(request: Request, response: Response) -> List[str]:
     """Config + SQLite'tan tüm cluster'ları döner."""
+    cached = _etag.not_modified(request, response, await run_blocking(_config_etag))
+    if cached is not None:
+        return cached
+
     def _list_monitor_clusters() -> List[str]:
         from_config: Set[str] = {cl for _, cl in _config_ns_clusters()}
-        from_db: Set[str] = {r["cluster"] for r in _read_sqlite_alarms() if r["cluster"]}
+        from_db: Set[str] = {cl for cl, _ in _db_pairs() if cl}
         return sorted(from_config | from_db)
 
-    return _list_monitor_clusters()
+    return await run_blocking(_list_monitor_clusters)
@@ -2,6 +2,7 @@ import yaml
 from fastapi import APIRouter, HTTPException
 from typing import Any, Dict
 from config import ALARMFW_CONFIG
+from async_utils import run_blocking
 
 router = APIRouter(prefix="/api/notifiers", tags=["notifiers"])
 
@@ -33,7 +34,7 @@ async def list_notifiers() -> Dict[str, Any]:
                 result[name] = {**_mask(cfg or {}), "_source_file": f.name}
         return result
 
-    return _list_notifiers()
+    return await run_blocking(_list_notifiers)
 
 
 @router.get("/{name}")
@@ -46,7 +47,7 @@ async def get_notifier(name: str) -> Dict[str, Any]:
                 return {**_mask(notifiers[name] or {}), "_source_file": f.name}
         raise HTTPException(404, f"Notifier '{name}' not found")
 
-    return _get_notifier()
+    return await run_blocking(_get_notifier)
 
 
 @router.put("/{name}")
@@ -66,4 +67,4 @@ async def update_notifier(name: str, body: Dict[str, Any]) -> Dict[str, Any]:
                 return {"ok": True, "name": name}
         raise HTTPException(404, f"Notifier '{name}' not found")
 
-    return _update_notifier()
+    return await run_blocking(_update_notifier)
@@ -10,13 +10,14 @@ import yaml
 from fastapi import APIRouter, Depends, HTTPException, Request
 from config import ALARMFW_CONFIG, ALARMFW_STATE
 from auth import require_admin
+from async_utils import run_blocking
+from state_db import read_conn
 
 router = APIRouter(prefix="/api/policies", tags=["policies"])
 
 _DEDUP_FILE       = ALARMFW_CONFIG / "policies/dedup.yaml"
 _MAINTENANCE_FILE = ALARMFW_CONFIG / "policies/maintenance.yaml"
 _POLICIES_DB      = ALARMFW_STATE  / "policies.sqlite"
-_ALARM_DB         = ALARMFW_STATE  / "alarmfw.sqlite"
 
 
 # ── SQLite helpers ─────────────────────────────────────
@@ -69,7 +70,7 @@ async def get_dedup() -> Dict[str, Any]:
         data = yaml.safe_load(_DEDUP_FILE.read_text()) or {}
         return data.get("dedup_policy") or data
 
-    return _get_dedup()
+    return await run_blocking(_get_dedup)
 
 
 @router.put("/dedup")
@@ -85,7 +86,7 @@ async def update_dedup(body: Dict[str, Any]) -> Dict[str, Any]:
         _DEDUP_FILE.write_text(yaml.dump(data, allow_unicode=True, default_flow_style=False))
         return {"ok": True}
 
-    return _update_dedup()
+    return await run_blocking(_update_dedup)
 
 
 # ── Maintenance YAML helpers ───────────────────────────
@@ -159,7 +160,7 @@ def _save_version(
 
 @router.get("/maintenance")
 async def get_maintenance() -> Dict[str, Any]:
-    return _read_maintenance()
+    return await run_blocking(_read_maintenance)
 
 
 @router.put("/maintenance", dependencies=[Depends(require_admin)])
@@ -186,7 +187,7 @@ async def update_maintenance(body: Dict[str, Any], request: Request) -> Dict[str
 
         return {"ok": True, "silences": len(new_policy["silences"]), "version_id": ver_id}
 
-    return _update_maintenance()
+    return await run_blocking(_update_maintenance)
 
 
 @router.post("/maintenance/silences", dependencies=[Depends(require_admin)])
@@ -216,7 +217,7 @@ async def create_silence(body: Dict[str, Any], request: Request) -> Dict[str, An
 
         return {"ok": True, "id": silence_id, "version_id": ver_id}
 
-    return _create_silence()
+    return await run_blocking(_create_silence)
 
 
 @router.delete("/maintenance/silences/{silence_id}", dependencies=[Depends(require_admin)])
@@ -245,7 +246,7 @@ async def delete_silence(silence_id: str, request: Request) -> Dict[str, Any]:
 
         return {"ok": True, "id": silence_id, "version_id": ver_id}
 
-    return _delete_silence()
+    return await run_blocking(_delete_silence)
 
 
 # ── Dry-run ────────────────────────────────────────────
@@ -283,45 +284,40 @@ async def dry_run_silence(body: Dict[str, Any]) -> Dict[str, Any]:
         end   = _parse_utc(silence.get("ends_at_utc"))
         active = bool(start and end and start <= now < end)
 
-        matches: List[Dict[str, Any]] = []
-        total_candidates = 0
-
-        if _ALARM_DB.exists():
-            conn = sqlite3.connect(str(_ALARM_DB), timeout=5)
-            conn.row_factory = sqlite3.Row
-            try:
+        rows: List[sqlite3.Row] = []
+        with read_conn() as conn:
+            if conn is not None:
                 rows = conn.execute(
                     "SELECT alarm_name, payload_json FROM alarm_state WHERE payload_json IS NOT NULL"
                 ).fetchall()
-            finally:
-                conn.close()
 
-            total_candidates = len(rows)
-            for row in rows:
-                try:
-                    payload = json.loads(row["payload_json"])
-                except Exception:
-                    continue
-
-                alarm_name = payload.get("alarm_name", row["alarm_name"] or "")
-                cluster    = payload.get("cluster", "")
-                namespace  = payload.get("namespace", "")
-
-                if not (
-                    _match(silence.get("alarm_name"), alarm_name)
-                    and _match(silence.get("cluster"),    cluster)
-                    and _match(silence.get("namespace"),  namespace)
-                ):
-                    continue
-
-                matches.append({
-                    "alarm_name":  alarm_name or "",
-                    "cluster":     cluster or "",
-                    "namespace":   namespace or "",
-                    "check_name":  alarm_name or "",
-                    "check_type":  payload.get("tags", {}).get("type", ""),
-                    "source_file": "",
-                })
+        matches: List[Dict[str, Any]] = []
+        total_candidates = len(rows)
+        for row in rows:
+            try:
+                payload = json.loads(row["payload_json"])
+            except Exception:
+                continue
+
+            alarm_name = payload.get("alarm_name", row["alarm_name"] or "")
+            cluster    = payload.get("cluster", "")
+            namespace  = payload.get("namespace", "")
+
+            if not (
+                _match(silence.get("alarm_name"), alarm_name)
+                and _match(silence.get("cluster"),    cluster)
+                and _match(silence.get("namespace"),  namespace)
+            ):
+                continue
+
+            matches.append({
+                "alarm_name":  alarm_name or "",
+                "cluster":     cluster or "",
+                "namespace":   namespace or "",
+                "check_name":  alarm_name or "",
+                "check_type":  payload.get("tags", {}).get("type", ""),
+                "source_file": "",
+            })
 
         return {
             "ok": True,
@@ -332,7 +328,7 @@ async def dry_run_silence(body: Dict[str, Any]) -> Dict[str, Any]:
             "matches": matches,
         }
 
-    return _dry_run_silence()
+    return await run_blocking(_dry_run_silence)
 
 
 # ── Audit ──────────────────────────────────────────────
@@ -366,7 +362,7 @@ async def get_audit(
 
         return {"entries": entries, "count": len(entries)}
 
-    return _get_audit()
+    return await run_blocking(_get_audit)
 
 
 # ── Versions ───────────────────────────────────────────
@@ -400,7 +396,7 @@ async def get_versions(
 
         return {"policy": policy, "entries": entries, "count": len(entries)}
 
-    return _get_versions()
+    return await run_blocking(_get_versions)
 
 
 # ── Rollback ───────────────────────────────────────────
@@ -450,4 +446,4 @@ async def rollback_version(body: Dict[str, Any], request: Request) -> Dict[str,
             "version_id": new_ver_id,
         }
 
-    return _rollback_version()
+    return await run_blocking(_rollback_version)
@@ -1,18 +1,14 @@
-from fastapi import APIRouter, HTTPException
-from typing import Any, Dict
+from fastapi import APIRouter, HTTPException, Query
+from typing import Any, Dict, List, Optional
 import subprocess
-import threading
-import time
 import json
 import socket
-from config import COMPOSE_RUN_CONFIG
+from config import ALARMFW_STATE, COMPOSE_RUN_CONFIG, RUN_HISTORY_KEEP, RUN_MAX_CONCURRENT, RUN_TIMEOUT_SEC
+from async_utils import run_blocking
+from routers._run_queue import STATUSES, RunQueue
 
 router = APIRouter(prefix="/api/run", tags=["runner"])
 
-# Son run sonucunu bellekte tut
-_last_run: Dict[str, Any] = {}
-_run_lock = threading.Lock()
-
 
 def _get_mount_args() -> list:
     """
@@ -47,52 +43,68 @@ def _get_mount_args() -> list:
         return []
 
 
-def _do_run(config: str) -> None:
-    global _last_run
-    started = time.time()
+def _do_run(config: str) -> Dict[str, Any]:
+    """alarmfw engine'i ayrı container'da çalıştırır; sonuç run kuyruğuna yazılır."""
     try:
         vol_args = _get_mount_args()
         if not vol_args:
-            _last_run = {
+            return {
                 "status": "error", "exit_code": -1, "stdout": "",
                 "stderr": "Container mount bilgisi alınamadı (docker inspect başarısız)",
-                "config": config, "started_at": started,
             }
-            return
 
         cmd = ["docker", "run", "--rm"] + vol_args + [
             "alarmfw:latest", "run", "--config", config
         ]
-        proc = subprocess.run(cmd, capture_output=True, text=True, timeout=120)
-        _last_run = {
+        proc = subprocess.run(cmd, capture_output=True, text=True, timeout=RUN_TIMEOUT_SEC)
+        return {
             "status": "done",
             "exit_code": proc.returncode,
             "stdout": proc.stdout[-8000:],
             "stderr": proc.stderr[-2000:],
-            "duration_sec": round(time.time() - started, 1),
-            "config": config,
-            "started_at": started,
         }
     except subprocess.TimeoutExpired:
-        _last_run = {"status": "timeout", "exit_code": -1, "stdout": "", "stderr": "Timeout", "config": config}
+        return {"status": "timeout", "exit_code": -1, "stdout": "", "stderr": "Timeout"}
     except Exception as e:
-        _last_run = {"status": "error", "exit_code": -1, "stdout": "", "stderr": str(e), "config": config}
+        return {"status": "error", "exit_code": -1, "stdout": "", "stderr": str(e)}
+
+
+run_queue = RunQueue(ALARMFW_STATE / "runs.sqlite", _do_run, RUN_MAX_CONCURRENT, RUN_HISTORY_KEEP)
 
 
 @router.post("")
 async def trigger_run(body: Dict[str, Any] = {}) -> Dict[str, Any]:
-    global _last_run
-    with _run_lock:
-        if _last_run.get("status") == "running":
-            raise HTTPException(409, "A run is already in progress")
-        config = body.get("config", COMPOSE_RUN_CONFIG)
-        _last_run = {"status": "running", "config": config}
+    """Run'ı kuyruğa ekler; aynı config için bekleyen run varsa o döner."""
+    config = str(body.get("config") or COMPOSE_RUN_CONFIG)
+    run = await run_blocking(run_queue.submit, config)
+    message = "Run already queued" if run["coalesced"] else f"Run {run['status']}"
+    return {"ok": True, "message": message, "config": config, "id": run["id"], "status": run["status"], "run": run}
+
 
-    t = threading.Thread(target=_do_run, args=(config,), daemon=True)
-    t.start()
-    return {"ok": True, "message": "Run started", "config": config}
+@router.get("")
+async def list_runs(
+    limit: int = Query(50, ge=1, le=500),
+    status: Optional[str] = Query(None, pattern="^(" + "|".join(STATUSES) + ")$"),
+    config: Optional[str] = None,
+    before_id: Optional[int] = Query(None, ge=1, description="Sayfalama: bu id'den eski run'lar"),
+) -> List[Dict[str, Any]]:
+    """Run geçmişi (yeniden eskiye); süre, exit code ve çıktıların son kısmı."""
+    return await run_blocking(run_queue.history, limit, status, config, before_id)
+
+
+@router.get("/stats")
+async def run_stats() -> Dict[str, Any]:
+    return await run_blocking(run_queue.stats)
 
 
 @router.get("/last")
 async def get_last_run() -> Dict[str, Any]:
-    return _last_run or {"status": "never_run"}
+    return await run_blocking(run_queue.last) or {"status": "never_run"}
+
+
+@router.get("/{run_id}")
+async def get_run(run_id: int) -> Dict[str, Any]:
+    run = await run_blocking(run_queue.get, run_id)
+    if run is None:
+        raise HTTPException(404, f"Run {run_id} not found")
+    return run
@@ -2,6 +2,7 @@ import os
 from fastapi import APIRouter, HTTPException, UploadFile, File
 from typing import Any, Dict, List
 from config import ALARMFW_SECRETS
+from async_utils import run_blocking
 
 router = APIRouter(prefix="/api/secrets", tags=["secrets"])
 
@@ -22,7 +23,7 @@ async def list_secrets() -> List[Dict[str, Any]]:
             })
         return result
 
-    return _list_secrets()
+    return await run_blocking(_list_secrets)
 
 
 @router.put("/{cluster}")
@@ -38,7 +39,7 @@ async def upload_secret(cluster: str, file: UploadFile = File(...)) -> Dict[str,
         os.chmod(dest, 0o600)
         return {"ok": True, "cluster": cluster, "file": dest.name}
 
-    return _write_secret()
+    return await run_blocking(_write_secret)
 
 
 @router.put("/{cluster}/text")
@@ -57,7 +58,7 @@ async def upload_secret_text(cluster: str, body: Dict[str, Any]) -> Dict[str, An
         os.chmod(dest, 0o600)
         return {"ok": True, "cluster": cluster, "file": dest.name}
 
-    return _write_secret_text()
+    return await run_blocking(_write_secret_text)
 
 
 @router.delete("/{cluster}")
@@ -69,4 +70,4 @@ async def delete_secret(cluster: str) -> Dict[str, Any]:
         dest.unlink()
         return {"ok": True, "cluster": cluster}
 
-    return _delete_secret()
+    return await run_blocking(_delete_secret)
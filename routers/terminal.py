@@ -90,9 +90,10 @@ async def oc_whoami() -> Dict[str, Any]:
 @router.get("/clusters")
 async def list_clusters() -> List[Dict[str, Any]]:
     """Login için mevcut cluster listesi."""
+    clusters = await run_blocking(_get_clusters)
     return [
         {"name": c["name"], "ocp_api": c["ocp_api"]}
-        for c in _get_clusters().values()
+        for c in clusters.values()
         if c.get("ocp_api")
     ]
 
@@ -0,0 +1,112 @@
+"""
+Büyük liste cevapları için serileştirme + sıkıştırma benchmark'ı.
+
+/api/alarms/history (limit=1000, payload decode edilmiş) ve /api/monitor/pods
+benzeri sentetik veri üretir; FastAPI varsayılan yolu ile fast_json yolunu ve
+identity / gzip / br cevap boyutlarını karşılaştırır.
+
+    python scripts/bench_responses.py [--rows 1000] [--pods 200] [--repeat 20]
+"""
+from __future__ import annotations
+
+import argparse
+import gzip
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+
+import fast_json  # noqa: E402
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def _history_rows(n: int) -> List[Dict[str, Any]]:
+    rows = []
+    for i in range(n):
+        rows.append({
+            "id": i, "event_ts": 1_700_000_000 + i, "timestamp_utc": "2024-01-01T00:00:00Z",
+            "event_type": "STATE_CHANGE", "dedup_key": f"ocp_pod_health__ns{i % 40}__c{i % 5}",
+            "alarm_name": f"ocp_pod_health__ns{i % 40}__c{i % 5}", "status": "PROBLEM",
+            "prev_status": "OK", "severity": "3", "cluster": f"c{i % 5}", "namespace": f"ns{i % 40}",
+            "message": "pod health degraded",
+            "payload": {
+                "status": "PROBLEM", "severity": "3", "evaluation_latency_ms": 120 + i % 50,
+                "evidence": {
+                    "cluster": f"c{i % 5}", "namespace": f"ns{i % 40}",
+                    "pods": [{"name": f"app-{i}-{j}", "phase": "Running", "ready": "0/1", "restarts": j}
+                             for j in range(5)],
+                },
+            },
+        })
+    return rows
+
+
+def _pod_rows(snapshots: int, pods: int) -> List[Dict[str, Any]]:
+    return [{
+        "namespace": f"ns{i}", "cluster": f"c{i % 5}", "status": "PROBLEM",
+        "timestamp_utc": "2024-01-01T00:00:00Z", "alarm_name": f"snap{i}", "severity": "3",
+        "pods": [{"name": f"pod-{i}-{j}", "phase": "Running" if j % 7 else "CrashLoopBackOff",
+                  "ready": "1/1" if j % 7 else "0/1", "restarts": 0 if j % 7 else 12}
+                 for j in range(pods)],
+    } for i in range(snapshots)]
+
+
+def _timeit(fn: Callable[[], bytes], repeat: int) -> float:
+    fn()
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+
+def _bench(name: str, data: List[Dict[str, Any]], repeat: int) -> None:
+    adapter = TypeAdapter(List[Dict[str, Any]])
+    paths = {
+        # FastAPI: response_model doğrulaması + jsonable_encoder + json.dumps (klasik yol)
+        "jsonable_encoder+json": lambda: json.dumps(
+            jsonable_encoder(adapter.validate_python(data)), ensure_ascii=False,
+        ).encode(),
+        # FastAPI >=0.115 response_model'li varsayılan yol (pydantic dump_json)
+        "pydantic dump_json": lambda: adapter.dump_json(adapter.validate_python(data)),
+        "fast_json": lambda: fast_json.dumps(data),
+    }
+    print(f"\n== {name} ({len(data)} rows) — JSON engine: {'orjson' if fast_json.orjson else 'stdlib json'}")
+    for label, fn in paths.items():
+        print(f"  {label:<24} {_timeit(fn, repeat):8.2f} ms")
+
+    body = fast_json.dumps(data)
+    sizes = {"identity": len(body), "gzip-6": len(gzip.compress(body, 6))}
+    t_gz = _timeit(lambda: gzip.compress(body, 6), repeat)
+    line = f"  gzip-6 {t_gz:.2f} ms"
+    if brotli is not None:
+        sizes["br-5"] = len(brotli.compress(body, quality=5))
+        line += f", br-5 {_timeit(lambda: brotli.compress(body, quality=5), repeat):.2f} ms"
+    print("  wire bytes: " + ", ".join(f"{k}={v:,}" for k, v in sizes.items()))
+    print(line)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=1000)
+    ap.add_argument("--snapshots", type=int, default=50)
+    ap.add_argument("--pods", type=int, default=200)
+    ap.add_argument("--repeat", type=int, default=20)
+    args = ap.parse_args()
+    _bench("/api/alarms/history", _history_rows(args.rows), args.repeat)
+    _bench("/api/monitor/pods", _pod_rows(args.snapshots, args.pods), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,336 @@
+"""
+alarmfw.sqlite için paylaşılan, uzun ömürlü read-only bağlantı havuzu.
+
+Router'lar her istekte sqlite3.connect açmak yerine buradan bağlantı ödünç alır:
+
+    with read_conn() as conn:
+        if conn is None:      # DB henüz oluşmamış
+            return []
+        rows = conn.execute(...).fetchall()
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, Iterator, Optional, Tuple
+
+from async_utils import run_blocking
+from config import (
+    ALARMFW_STATE,
+    STATE_DB_CACHE_MB,
+    STATE_DB_MMAP_MB,
+    STATE_DB_POOL_SIZE,
+    STATE_DB_POOL_TIMEOUT,
+)
+
+log = logging.getLogger(__name__)
+
+STATE_DB = ALARMFW_STATE / "alarmfw.sqlite"
+
+# Engine'in alarm_history şeması + API'nin okuma yolunun ihtiyaç duyduğu index'ler.
+# Okuma isteklerinde DDL çalışmaz; bu script DB dosyası başına bir kez uygulanır.
+_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS alarm_history (
+        id            INTEGER PRIMARY KEY AUTOINCREMENT,
+        event_ts      INTEGER NOT NULL,
+        timestamp_utc TEXT,
+        event_type    TEXT NOT NULL,
+        dedup_key     TEXT NOT NULL,
+        alarm_name    TEXT,
+        status        TEXT NOT NULL,
+        prev_status   TEXT,
+        severity      TEXT,
+        cluster       TEXT,
+        namespace     TEXT,
+        message       TEXT,
+        payload_json  TEXT
+    );
+    CREATE INDEX IF NOT EXISTS idx_alarm_history_event_ts
+        ON alarm_history(event_ts);
+    CREATE INDEX IF NOT EXISTS idx_alarm_history_cluster_ns_ts
+        ON alarm_history(cluster, namespace, event_ts);
+    CREATE INDEX IF NOT EXISTS idx_alarm_history_ns_ts
+        ON alarm_history(namespace, event_ts);
+    CREATE INDEX IF NOT EXISTS idx_alarm_history_dedup_ts
+        ON alarm_history(dedup_key, event_ts);
+    CREATE INDEX IF NOT EXISTS idx_alarm_history_alarm_ts
+        ON alarm_history(alarm_name, event_ts);
+    CREATE INDEX IF NOT EXISTS idx_alarm_history_status_ts
+        ON alarm_history(status, event_ts);
+    CREATE INDEX IF NOT EXISTS idx_alarm_state_change
+        ON alarm_state(last_change_ts, dedup_key);
+    CREATE INDEX IF NOT EXISTS idx_alarm_state_status_change
+        ON alarm_state(last_status, last_change_ts, dedup_key);
+"""
+
+_BOOTSTRAP_RETRY_SEC = 60
+# Arka planda DB dosyasının yeniden oluşturulup oluşturulmadığına (inode) bakma aralığı
+_SCHEMA_WATCH_SEC = 10
+
+
+def ensure_schema(path: Path = STATE_DB) -> bool:
+    """
+    alarm_history tablosunu ve okuma index'lerini oluşturur (idempotent).
+    DB yoksa ya da engine henüz alarm_state'i oluşturmadıysa False döner.
+    """
+    if not path.exists():
+        return False
+    conn = sqlite3.connect(str(path), timeout=5)
+    try:
+        has_state = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name='alarm_state'"
+        ).fetchone()
+        if not has_state:
+            return False
+        conn.executescript(_SCHEMA)
+        conn.execute("PRAGMA optimize;")
+        conn.commit()
+        return True
+    finally:
+        conn.close()
+
+
+class PoolTimeout(sqlite3.OperationalError):
+    """Havuzda süre içinde boş bağlantı bulunamadı."""
+
+
+class ReadPool:
+    """Sınırlı sayıda read-only sqlite3 bağlantısını thread'ler arasında paylaştırır."""
+
+    def __init__(
+        self,
+        path: Path,
+        size: int,
+        timeout: float,
+        mmap_mb: int,
+        cache_mb: int,
+        on_new_file: Optional[Callable[[Path], bool]] = None,
+    ) -> None:
+        self.path     = path
+        self.size     = max(1, size)
+        self.timeout  = timeout
+        self.mmap_mb  = mmap_mb
+        self.cache_mb = cache_mb
+
+        self._on_new_file = on_new_file
+        self._bootstrapped_inode: Optional[int] = None
+        self._bootstrap_failed_at = 0.0
+        self._bootstrap_lock = threading.Lock()
+
+        self._idle: "queue.LifoQueue[Tuple[sqlite3.Connection, int]]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._lock  = threading.Lock()
+        self._open  = 0
+
+        self._acquired_total = 0
+        self._timeouts_total = 0
+        self._wait_ms_total  = 0.0
+        self._wait_ms_max    = 0.0
+        self._recent_waits: Deque[float] = deque(maxlen=1024)
+
+    # ── connection lifecycle ──────────────────────────
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            f"file:{self.path}?mode=ro",
+            uri=True,
+            timeout=5,
+            check_same_thread=False,
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA query_only=ON;")
+        conn.execute(f"PRAGMA mmap_size={self.mmap_mb * 1024 * 1024};")
+        conn.execute(f"PRAGMA cache_size=-{self.cache_mb * 1024};")
+        return conn
+
+    def _discard(self, conn: sqlite3.Connection) -> None:
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._lock:
+            self._open -= 1
+
+    def _take(self, inode: int) -> sqlite3.Connection:
+        # Dosya yeniden oluşturulduysa (inode değiştiyse) eski bağlantılar atılır
+        while True:
+            try:
+                conn, conn_inode = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            if conn_inode == inode:
+                return conn
+            self._discard(conn)
+        conn = self._connect()
+        with self._lock:
+            self._open += 1
+        return conn
+
+    def bootstrap(self, force: bool = True) -> bool:
+        """
+        Mevcut DB dosyası için on_new_file hook'unu (şema/index) bir kez çalıştırır.
+        Yalnızca lifespan ve arka plan döngüsünden çağrılır; okuma yolu DDL çalıştırmaz,
+        çünkü engine'in tuttuğu yazma kilidini bekleyebilir. force=False iken başarısız
+        denemeler _BOOTSTRAP_RETRY_SEC'te bir tekrarlanır.
+        """
+        try:
+            inode = os.stat(self.path).st_ino
+        except FileNotFoundError:
+            return False
+        self._maybe_bootstrap(inode, force=force)
+        return self._bootstrapped_inode == inode
+
+    def _maybe_bootstrap(self, inode: int, force: bool = False) -> None:
+        if self._on_new_file is None or self._bootstrapped_inode == inode:
+            return
+        if not force and time.monotonic() - self._bootstrap_failed_at < _BOOTSTRAP_RETRY_SEC:
+            return
+        with self._bootstrap_lock:
+            if self._bootstrapped_inode == inode:
+                return
+            try:
+                ok = self._on_new_file(self.path)
+            except sqlite3.Error as e:
+                log.warning("state db bootstrap failed: %s", e)
+                ok = False
+            if ok:
+                self._bootstrapped_inode = inode
+            else:
+                self._bootstrap_failed_at = time.monotonic()
+
+    @contextmanager
+    def connection(self) -> Iterator[Optional[sqlite3.Connection]]:
+        try:
+            inode = os.stat(self.path).st_ino
+        except FileNotFoundError:
+            yield None
+            return
+
+        started = time.perf_counter()
+        if not self._slots.acquire(timeout=self.timeout):
+            with self._lock:
+                self._timeouts_total += 1
+            raise PoolTimeout(f"state db pool exhausted ({self.size} connections busy)")
+        waited_ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            self._acquired_total += 1
+            self._wait_ms_total  += waited_ms
+            self._wait_ms_max     = max(self._wait_ms_max, waited_ms)
+            self._recent_waits.append(waited_ms)
+
+        conn: Optional[sqlite3.Connection] = None
+        try:
+            conn = self._take(inode)
+            yield conn
+        except sqlite3.DatabaseError:
+            if conn is not None:
+                self._discard(conn)
+                conn = None
+            raise
+        finally:
+            if conn is not None:
+                if conn.in_transaction:
+                    conn.rollback()
+                self._idle.put((conn, inode))
+            self._slots.release()
+
+    def close(self) -> None:
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._discard(conn)
+
+    # ── stats ─────────────────────────────────────────
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            recent = sorted(self._recent_waits)
+            acquired = self._acquired_total
+            return {
+                "path":            str(self.path),
+                "size":            self.size,
+                "open":            self._open,
+                "idle":            self._idle.qsize(),
+                "acquired_total":  acquired,
+                "timeouts_total":  self._timeouts_total,
+                "wait_ms_avg":     round(self._wait_ms_total / acquired, 3) if acquired else 0,
+                "wait_ms_max":     round(self._wait_ms_max, 3),
+                "wait_ms_p95":     round(recent[min(len(recent) - 1, int(len(recent) * 0.95))], 3) if recent else 0,
+            }
+
+
+pool = ReadPool(
+    STATE_DB,
+    size=STATE_DB_POOL_SIZE,
+    timeout=STATE_DB_POOL_TIMEOUT,
+    mmap_mb=STATE_DB_MMAP_MB,
+    cache_mb=STATE_DB_CACHE_MB,
+    on_new_file=ensure_schema,
+)
+
+
+async def watch_schema(interval_sec: float = _SCHEMA_WATCH_SEC) -> None:
+    """
+    DB dosyası sonradan oluşur ya da yeniden oluşturulursa şema/index'i arka planda
+    kurar (app lifespan'inden başlatılır).
+    """
+    while True:
+        await asyncio.sleep(interval_sec)
+        try:
+            await run_blocking(pool.bootstrap, False)
+        except Exception:
+            log.exception("state db schema bootstrap failed")
+
+
+def read_conn():
+    """Paylaşılan havuzdan read-only bağlantı ödünç alır (DB yoksa None verir)."""
+    return pool.connection()
+
+
+# ── Değişiklik takibi ──────────────────────────────────
+# PRAGMA data_version bağlantıya özeldir: aynı bağlantıda, başka bir bağlantının
+# commit'inden sonra artar. Havuzdaki bağlantılar arasında karşılaştırılamadığı için
+# değişiklik takibi tek, ayrı bir izleme bağlantısı üzerinden yapılır.
+
+_watch_lock  = threading.Lock()
+_watch_conn: Optional[sqlite3.Connection] = None
+_watch_inode: Optional[int] = None
+
+
+def change_token() -> Optional[Tuple[int, int, Any]]:
+    """
+    (inode, data_version, MAX(alarm_state.last_change_ts)) — DB'deki herhangi bir
+    commit'te değişir. DB yoksa None. Payload satırlarına dokunmaz.
+    """
+    global _watch_conn, _watch_inode
+    try:
+        inode = os.stat(STATE_DB).st_ino
+    except FileNotFoundError:
+        return None
+    with _watch_lock:
+        if _watch_conn is None or _watch_inode != inode:
+            if _watch_conn is not None:
+                _watch_conn.close()
+            _watch_conn = pool._connect()
+            _watch_inode = inode
+        try:
+            version = _watch_conn.execute("PRAGMA data_version").fetchone()[0]
+            try:
+                max_ts = _watch_conn.execute("SELECT MAX(last_change_ts) FROM alarm_state").fetchone()[0]
+            except sqlite3.OperationalError:
+                max_ts = None
+        except sqlite3.DatabaseError:
+            _watch_conn.close()
+            _watch_conn = None
+            raise
+    return inode, version, max_ts
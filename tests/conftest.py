@@ -0,0 +1,113 @@
+"""
+Ortak test fixture'ları.
+Env, app import edilmeden önce geçici dizinlere yönlendirilir; router modülleri
+path'leri import anında okuduğu için test modülleri router'ları lazy import etmeli.
+"""
+import os
+import sys
+import asyncio
+import sqlite3
+from pathlib import Path
+
+import httpx
+import pytest
+
+# alarmfw-api kök dizinini path'e ekle
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+# Env'i test için ayarla — gerçek dosyalara dokunmadan çalışsın
+@pytest.fixture(scope="session", autouse=True)
+def _tmp_dirs(tmp_path_factory):
+    tmp = tmp_path_factory.mktemp("alarmfw_test")
+    state = tmp / "state"
+    config = tmp / "config"
+    secrets = tmp / "secrets"
+    for d in (state, config, secrets, config / "generated", config / "policies",
+              config / "notifiers", tmp / "legacy" / "podhealthalarm" / "conf.d"):
+        d.mkdir(parents=True, exist_ok=True)
+
+    # Minimal observe.yaml
+    (config / "observe.yaml").write_text("clusters: []\n")
+    # Minimal maintenance.yaml
+    (config / "policies" / "maintenance.yaml").write_text("silences: []\n")
+
+    os.environ["ALARMFW_ROOT"]    = str(tmp)
+    os.environ["ALARMFW_CONFIG"]  = str(config)
+    os.environ["ALARMFW_STATE"]   = str(state)
+    os.environ["ALARMFW_SECRETS"] = str(secrets)
+    os.environ["ALARMFW_API_KEY"] = ""   # auth kapalı
+    return tmp
+
+
+@pytest.fixture(scope="session")
+def app(_tmp_dirs):
+    from main import app
+    return app
+
+
+async def _request_async(app, method: str, path: str, **kwargs):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+        return await client.request(method, path, **kwargs)
+
+
+def _request(app, method: str, path: str, **kwargs):
+    return asyncio.run(_request_async(app, method, path, **kwargs))
+
+
+# alarmfw engine'in state şeması (test için minimal kopya)
+_STATE_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS alarm_state (
+        dedup_key      TEXT PRIMARY KEY,
+        last_status    TEXT,
+        last_sent_ts   INTEGER,
+        last_change_ts INTEGER,
+        alarm_name     TEXT,
+        payload_json   TEXT
+    );
+    CREATE TABLE IF NOT EXISTS alarm_history (
+        id            INTEGER PRIMARY KEY AUTOINCREMENT,
+        event_ts      INTEGER NOT NULL,
+        timestamp_utc TEXT,
+        event_type    TEXT NOT NULL,
+        dedup_key     TEXT NOT NULL,
+        alarm_name    TEXT,
+        status        TEXT NOT NULL,
+        prev_status   TEXT,
+        severity      TEXT,
+        cluster       TEXT,
+        namespace     TEXT,
+        message       TEXT,
+        payload_json  TEXT
+    );
+"""
+
+
+@pytest.fixture
+def state_db(app, _tmp_dirs):
+    """
+    alarmfw.sqlite'ı engine gibi yazan bir bağlantı döner.
+    Test sonunda tablolar boşaltılır (dosya silinmez; diğer testler boş DB görür).
+    """
+    path = _tmp_dirs / "state" / "alarmfw.sqlite"
+    conn = sqlite3.connect(str(path))
+    conn.execute("PRAGMA journal_mode=WAL;")
+    conn.executescript(_STATE_SCHEMA)
+    conn.commit()
+    # Süreç içi snapshot index'i ve rollup DB'si önceki testin satırlarını taşımasın
+    from routers import _monitor_index, _rollup
+    _monitor_index.index = _monitor_index.SnapshotIndex()
+    with _rollup._lock:
+        if _rollup._conn is not None:
+            _rollup._conn.close()
+        _rollup._conn = _rollup._metrics = None
+        for suffix in ("", "-wal", "-shm"):
+            Path(f"{_rollup.ROLLUP_DB}{suffix}").unlink(missing_ok=True)
+    try:
+        yield conn
+    finally:
+        conn.execute("DELETE FROM alarm_state")
+        conn.execute("DELETE FROM alarm_history")
+        conn.commit()
+        conn.close()
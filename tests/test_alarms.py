@@ -0,0 +1,450 @@
+"""
+/api/alarms endpoint testleri — geçici alarmfw.sqlite üzerinde çalışır.
+"""
+import json
+from contextlib import closing
+
+from conftest import _request
+
+
+def _insert_state(conn, key, status, ts, cluster="c1", namespace="ns1", alarm_name=None):
+    payload = {
+        "alarm_name": alarm_name or key,
+        "status": status,
+        "timestamp_utc": "",
+        "evidence": {"cluster": cluster, "namespace": namespace, "pods": []},
+    }
+    conn.execute(
+        "INSERT INTO alarm_state(dedup_key,last_status,last_sent_ts,last_change_ts,alarm_name,payload_json) "
+        "VALUES(?,?,?,?,?,?)",
+        (key, status, ts, ts, alarm_name or key, json.dumps(payload)),
+    )
+
+
+def test_alarms_status_filter_applied_before_limit(app, state_db):
+    for i in range(10):
+        _insert_state(state_db, f"ok{i}", "OK", 2000 + i)
+    for i in range(3):
+        _insert_state(state_db, f"p{i}", "PROBLEM", 1000 + i)
+    state_db.commit()
+
+    r = _request(app, "GET", "/api/alarms", params={"status": "problem", "limit": 5})
+    assert r.status_code == 200
+    assert [a["alarm_name"] for a in r.json()] == ["p2", "p1", "p0"]
+    assert "X-Next-Cursor" not in r.headers
+
+
+def test_alarms_cluster_namespace_filter(app, state_db):
+    _insert_state(state_db, "a", "PROBLEM", 1, cluster="c1", namespace="ns1")
+    _insert_state(state_db, "b", "PROBLEM", 2, cluster="c2", namespace="ns1")
+    _insert_state(state_db, "c", "PROBLEM", 3, cluster="c2", namespace="ns2")
+    state_db.commit()
+
+    r = _request(app, "GET", "/api/alarms", params={"cluster": "c2", "namespace": "ns1"})
+    assert [a["alarm_name"] for a in r.json()] == ["b"]
+
+
+def test_alarms_keyset_pagination(app, state_db):
+    # Aynı last_change_ts'e sahip satırlar dedup_key ile ayrışmalı
+    for i in range(7):
+        _insert_state(state_db, f"k{i}", "PROBLEM", 100 + i // 2)
+    state_db.commit()
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 3}
+        if cursor:
+            params["cursor"] = cursor
+        r = _request(app, "GET", "/api/alarms", params=params)
+        assert r.status_code == 200
+        seen += [a["alarm_name"] for a in r.json()]
+        cursor = r.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert seen == ["k6", "k5", "k4", "k3", "k2", "k1", "k0"]
+
+
+def test_alarms_invalid_cursor(app, state_db):
+    r = _request(app, "GET", "/api/alarms", params={"cursor": "not-a-cursor"})
+    assert r.status_code == 400
+
+
+def test_state_db_pool_is_read_only_and_reused(app, state_db):
+    import sqlite3
+    import state_db as sdb
+
+    before = sdb.pool.stats()
+    for _ in range(3):
+        _request(app, "GET", "/api/alarms/state")
+    after = sdb.pool.stats()
+    assert after["acquired_total"] == before["acquired_total"] + 3
+    assert after["open"] <= after["size"]
+
+    with sdb.read_conn() as conn:
+        try:
+            conn.execute("DELETE FROM alarm_state")
+        except sqlite3.OperationalError:
+            pass
+        else:
+            raise AssertionError("pool connection must be read-only")
+
+    r = _request(app, "GET", "/api/health/db")
+    assert r.status_code == 200
+    assert {"wait_ms_avg", "wait_ms_max", "timeouts_total"} <= r.json().keys()
+
+
+def _query_plan(conn, sql, params):
+    return " | ".join(r[-1] for r in conn.execute("EXPLAIN QUERY PLAN " + sql, params))
+
+
+def test_history_indexes_bootstrapped(app, state_db, monkeypatch):
+    import state_db as sdb
+
+    # Okuma yolu DDL çalıştırmaz; şema/index lifespan ya da arka plan döngüsünde kurulur
+    calls = []
+    monkeypatch.setattr(sdb.pool, "_on_new_file", lambda path: calls.append(path) or False)
+    monkeypatch.setattr(sdb.pool, "_bootstrapped_inode", None)
+    assert _request(app, "GET", "/api/alarms/history").status_code == 200
+    assert calls == []
+    monkeypatch.undo()
+    assert sdb.pool.bootstrap()
+    # Fixture bağlantısı DDL'den önce açıldı; EXPLAIN şemayı kendisi yenilemez
+    state_db.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+
+    plan = _query_plan(
+        state_db,
+        "SELECT * FROM alarm_history WHERE cluster = ? AND namespace = ? ORDER BY event_ts DESC LIMIT ?",
+        ("c1", "ns1", 100),
+    )
+    assert "idx_alarm_history_cluster_ns_ts" in plan
+    assert "TEMP B-TREE" not in plan
+
+    plan = _query_plan(
+        state_db,
+        "SELECT * FROM alarm_history WHERE dedup_key = ? AND event_ts >= ? ORDER BY event_ts DESC LIMIT ?",
+        ("k", 0, 100),
+    )
+    assert "idx_alarm_history_dedup_ts" in plan
+
+    plan = _query_plan(
+        state_db,
+        "SELECT dedup_key, payload_json, last_change_ts FROM alarm_state "
+        "WHERE payload_json IS NOT NULL AND last_status = ? "
+        "ORDER BY last_change_ts DESC, dedup_key DESC LIMIT ?",
+        ("PROBLEM", 50),
+    )
+    assert "idx_alarm_state_status_change" in plan
+    assert "TEMP B-TREE" not in plan
+
+
+def _insert_history(conn, n, cluster="c1", namespace="ns1", start_ts=1000):
+    conn.executemany(
+        "INSERT INTO alarm_history(event_ts,event_type,dedup_key,alarm_name,status,cluster,namespace,payload_json) "
+        "VALUES(?,?,?,?,?,?,?,?)",
+        [
+            (start_ts + i // 3, "state_change", f"k{i}", f"a{i}", "PROBLEM" if i % 2 else "OK",
+             cluster, namespace, json.dumps({"i": i}))
+            for i in range(n)
+        ],
+    )
+    conn.commit()
+
+
+def test_history_export_ndjson_streams_all_rows(app, state_db, monkeypatch):
+    from routers import alarms
+
+    monkeypatch.setattr(alarms, "_EXPORT_BATCH", 7)
+    _insert_history(state_db, 50)
+    _insert_history(state_db, 5, cluster="other")
+
+    r = _request(app, "GET", "/api/alarms/history/export", params={"cluster": "c1"})
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(l) for l in r.text.splitlines()]
+    assert len(lines) == 50
+    assert len({l["id"] for l in lines}) == 50
+    assert [l["event_ts"] for l in lines] == sorted((l["event_ts"] for l in lines), reverse=True)
+    assert lines[0]["payload"]["i"] == 49
+
+
+def test_history_export_csv(app, state_db):
+    import csv
+    import io
+
+    _insert_history(state_db, 4)
+    r = _request(app, "GET", "/api/alarms/history/export", params={"format": "csv", "status": "PROBLEM"})
+    assert r.status_code == 200
+    rows = list(csv.DictReader(io.StringIO(r.text)))
+    assert len(rows) == 2
+    assert {row["status"] for row in rows} == {"PROBLEM"}
+
+
+def test_history_stats_incremental_rollup(app, state_db):
+    from routers import _rollup
+
+    base = 1_700_000_000 - 1_700_000_000 % 3600
+    _insert_history(state_db, 6, start_ts=base)          # 6 event, aynı saat
+    params = {"bucket": "1h", "group_by": "status", "since_ts": base - 3600}
+
+    # İstek yolu rollup'ı güncellemez; henüz işlenmemiş veri stale olarak bildirilir
+    data = _request(app, "GET", "/api/alarms/history/stats", params=params).json()
+    assert data["series"] == [] and data["stale"] is True and data["refreshed_at"] is None
+
+    assert _rollup.refresh() == 6
+    r = _request(app, "GET", "/api/alarms/history/stats", params=params)
+    assert r.status_code == 200
+    data = r.json()
+    assert data["series"] == [{"ts": base, "counts": {"OK": 3, "PROBLEM": 3}}]
+    assert data["stale"] is False and data["retention_sec"] == 90 * 86400
+    first_last_id = data["last_id"]
+
+    # Sadece yeni satırlar işlenir
+    _insert_history(state_db, 2, start_ts=base + 3600)
+    assert _rollup.refresh() == 2
+    assert _rollup.refresh() == 0
+
+    r = _request(app, "GET", "/api/alarms/history/stats", params=params)
+    data = r.json()
+    assert data["last_id"] == first_last_id + 2
+    assert data["series"] == [
+        {"ts": base, "counts": {"OK": 3, "PROBLEM": 3}},
+        {"ts": base + 3600, "counts": {"OK": 1, "PROBLEM": 1}},
+    ]
+
+    r = _request(app, "GET", "/api/alarms/history/stats",
+                 params={**params, "bucket": "1d", "group_by": "cluster"})
+    assert r.json()["series"][0]["counts"] == {"c1": 8}
+
+
+def test_history_rollup_buckets_are_pruned_per_size(app, state_db):
+    from routers import _rollup
+
+    day = 86400
+    now = 1_700_000_000 - 1_700_000_000 % day
+    state_db.executemany(
+        "INSERT INTO alarm_history(event_ts,event_type,dedup_key,status) VALUES(?,?,?,?)",
+        [(now - 20 * day, "STATE_CHANGE", "k", "OK"), (now - 5 * day, "STATE_CHANGE", "k", "PROBLEM"),
+         (now, "STATE_CHANGE", "k", "OK")],
+    )
+    state_db.commit()
+    assert _rollup.refresh() == 3
+
+    def series(bucket):
+        params = {"bucket": bucket, "since_ts": now - 30 * day}
+        return [p["ts"] for p in _request(app, "GET", "/api/alarms/history/stats", params=params).json()["series"]]
+
+    assert series("1m") == [now]                         # 2 gün
+    assert series("5m") == [now - 5 * day, now]          # 14 gün
+    assert series("1h") == [now - 20 * day, now - 5 * day, now]
+    assert len(series("1d")) == 3
+
+
+def test_alarm_metrics_from_history_event_types(app, state_db, monkeypatch):
+    from routers import _rollup
+
+    monkeypatch.setattr(_rollup, "NOTIFY_SUPPRESSED_TYPES", {"SUPPRESSED"})
+    rows = [
+        (100, "STATE_CHANGE", "k1", "OK", json.dumps({"evaluation_latency_ms": 40})),
+        (101, "STATE_CHANGE", "k2", "PROBLEM", json.dumps({"evaluation_latency_ms": 20})),
+        (102, "SUPPRESSED", "k2", "PROBLEM", "{}"),
+        (103, "STATE_CHANGE", "k2", "PROBLEM", "not json"),
+    ]
+    state_db.executemany(
+        "INSERT INTO alarm_history(event_ts,event_type,dedup_key,status,payload_json) VALUES(?,?,?,?,?)",
+        rows,
+    )
+    _insert_state(state_db, "k1", "OK", 100)
+    _insert_state(state_db, "k2", "PROBLEM", 101)
+    _insert_state(state_db, "k3", "OK", 90)
+    state_db.commit()
+
+    assert _rollup.refresh() == 4
+    data = _request(app, "GET", "/api/alarms/metrics").json()
+    # Önceki anlam korunur: alarm_state satır sayısı
+    assert data["rules_evaluated_total"] == data["evaluation_count_total"] == 3
+    assert data["notifications_sent_total"] == 3
+    assert data["notifications_suppressed_total"] == 1
+    assert data["evaluation_latency_ms_last"] == 20
+    assert data["evaluation_latency_ms_avg"] == 30
+    assert data["last_exit_code"] == 1
+    assert data["events_by_type"] == {"STATE_CHANGE": 3, "SUPPRESSED": 1}
+
+    # Endpoint sorgu çalıştırmaz; yeni satırlar bir sonraki refresh'te görünür
+    state_db.execute(
+        "INSERT INTO alarm_history(event_ts,event_type,dedup_key,status) VALUES(104,'STATE_CHANGE','k3','OK')"
+    )
+    state_db.commit()
+    assert _request(app, "GET", "/api/alarms/metrics").json()["notifications_sent_total"] == 3
+    assert _rollup.refresh() == 1
+    assert _request(app, "GET", "/api/alarms/metrics").json()["notifications_sent_total"] == 4
+
+
+def test_stream_broadcaster_fanout_and_replay(app, state_db):
+    import asyncio
+    from routers import _stream
+
+    _insert_history(state_db, 2)
+    first_ids = [r[0] for r in state_db.execute("SELECT id FROM alarm_history ORDER BY id")]
+
+    async def scenario():
+        b = _stream.AlarmBroadcaster(poll_interval=0.01)
+        s1, s2 = await b.subscribe(), await b.subscribe()
+        await asyncio.sleep(0.05)                 # poller başlangıç cursor'ını okusun
+
+        _insert_history(state_db, 3)
+        _insert_state(state_db, "st1", "PROBLEM", 500)
+        state_db.commit()
+
+        got = []
+        for sub in (s1, s2):
+            items = [await asyncio.wait_for(sub.queue.get(), 2) for _ in range(4)]
+            got.append(items)
+        b.unsubscribe(s1)
+        b.unsubscribe(s2)
+        await asyncio.sleep(0.05)
+        return got, b._task.done()
+
+    got, stopped = asyncio.run(scenario())
+    for items in got:
+        ids = [i for i, _ in items if i is not None]
+        assert len(ids) == 3 and min(ids) > max(first_ids)   # eski satırlar yayınlanmaz
+        assert sum(1 for _, m in items if m.startswith("event: state")) == 1
+    assert stopped                                            # son abone gidince poller durur
+
+    replay = _stream.replay_history(first_ids[0])
+    assert [i for i, _ in replay][0] == first_ids[1]
+    assert len(replay) == 4
+
+
+def test_stream_replay_reaches_live_cursor_or_resets(app, state_db, monkeypatch):
+    import asyncio
+    from routers import _stream
+
+    monkeypatch.setattr(_stream, "REPLAY_LIMIT", 2)
+    _insert_history(state_db, 5)
+    ids = [r[0] for r in state_db.execute("SELECT id FROM alarm_history ORDER BY id")]
+
+    async def collect(last_id):
+        return [item async for item in _stream.replay(last_id)]
+
+    # Parça sınırı replay'i kesmez; tablonun sonuna kadar okunur
+    got = asyncio.run(collect(ids[0] - 1))
+    assert [i for i, _ in got] == ids
+
+    # Çok gerideki istemci sessiz boşluk yerine reset alır
+    monkeypatch.setattr(_stream, "REPLAY_MAX_EVENTS", 3)
+    got = asyncio.run(collect(ids[0] - 1))
+    assert [i for i, _ in got] == ids[:4] + [None]
+    assert got[-1][1].startswith("event: reset")
+    assert f'"last_id":{ids[3]}' in got[-1][1]
+
+
+def test_stream_slow_subscriber_is_dropped(app):
+    import asyncio
+    from routers import _stream
+
+    async def scenario():
+        sub = _stream.Subscriber()
+        for i in range(_stream.QUEUE_SIZE + 1):
+            sub.offer((i, "x"))
+        return sub.dropped, sub.queue.qsize(), sub.queue.get_nowait()
+
+    assert asyncio.run(scenario()) == (True, 1, None)
+
+
+def test_alarms_fields_projection(app, state_db):
+    _insert_state(state_db, "a", "PROBLEM", 10, cluster="c9")
+    state_db.execute(
+        "INSERT INTO alarm_state(dedup_key,last_status,last_change_ts,payload_json) VALUES('bad','PROBLEM',5,'{oops')"
+    )
+    state_db.commit()
+
+    r = _request(app, "GET", "/api/alarms", params={"fields": "alarm_name,status,evidence.cluster"})
+    assert r.status_code == 200
+    assert r.json()[0] == {"alarm_name": "a", "status": "PROBLEM", "evidence": {"cluster": "c9"}}
+
+    # Bozuk payload filtrede hata vermez, sadece eşleşmez
+    r = _request(app, "GET", "/api/alarms", params={"cluster": "c9"})
+    assert [a["alarm_name"] for a in r.json()] == ["a"]
+
+    assert _request(app, "GET", "/api/alarms", params={"fields": "a;drop"}).status_code == 400
+
+
+def test_history_fields_projection(app, state_db):
+    _insert_history(state_db, 2)
+    r = _request(app, "GET", "/api/alarms/history", params={"fields": "id,status,payload.i"})
+    assert r.status_code == 200
+    rows = r.json()
+    assert set(rows[0]) == {"id", "status", "payload"}
+    assert rows[0]["payload"] == {"i": 1}
+
+    assert _request(app, "GET", "/api/alarms/history", params={"fields": "nope"}).status_code == 400
+
+
+def test_history_archive_is_transparent(app, state_db, _tmp_dirs, monkeypatch):
+    import shutil
+    from routers import _archive, _rollup
+
+    day = 86400
+    now = 1_710_000_000                      # 2024-03-09
+    old = [now - 40 * day, now - 70 * day]   # 2024-01 ve 2023-12 segmentleri
+    rows = [(ts + i, "state_change", f"old{i}", "PROBLEM", "c1", "ns1") for i, ts in enumerate(old)]
+    rows.append((now - day, "state_change", "new", "PROBLEM", "c1", "ns1"))
+    state_db.executemany(
+        "INSERT INTO alarm_history(event_ts,event_type,dedup_key,status,cluster,namespace) VALUES(?,?,?,?,?,?)",
+        rows,
+    )
+    state_db.commit()
+
+    try:
+        # Rollup'a işlenmemiş satırlar taşınmaz; archive_older_than önce rollup'ı yakalatır
+        with monkeypatch.context() as m:
+            m.setattr(_rollup, "refresh", lambda: 0)
+            assert _archive.archive_older_than(30, now=now)["moved"] == 0
+        assert state_db.execute("SELECT COUNT(*) FROM alarm_history").fetchone()[0] == 3
+
+        result = _archive.archive_older_than(30, now=now)
+        assert result["moved"] == 2
+        assert _rollup.high_water() == result["max_id"]
+        assert len(result["segments"]) == 2
+        assert state_db.execute("SELECT dedup_key FROM alarm_history").fetchall() == [("new",)]
+
+        r = _request(app, "GET", "/api/alarms/history", params={"cluster": "c1"})
+        assert [e["dedup_key"] for e in r.json()] == ["new", "old0", "old1"]
+
+        # limit sıcak tablodan dolarsa arşiv segmentleri okunmaz
+        r = _request(app, "GET", "/api/alarms/history", params={"limit": 1})
+        assert [e["dedup_key"] for e in r.json()] == ["new"]
+
+        # since_ts ile örtüşmeyen segment atlanır
+        assert [s.path.name for s in _archive.segments(now - 45 * day)] == ["alarm_history_2024-01.sqlite"]
+        r = _request(app, "GET", "/api/alarms/history", params={"since_ts": now - 45 * day})
+        assert [e["dedup_key"] for e in r.json()] == ["new", "old0"]
+
+        r = _request(app, "GET", "/api/alarms/history/export")
+        assert [json.loads(l)["dedup_key"] for l in r.text.splitlines()] == ["new", "old0", "old1"]
+
+        assert len(_request(app, "GET", "/api/alarms/history/archive").json()) == 2
+
+        # Segmente yazılıp sıcak tablodan silinmeden kesilen arşivleme: satır iki kez dönmez
+        seg = _archive.segments()[0]
+        with closing(seg.connect()) as seg_conn:
+            seg_row = seg_conn.execute(
+                "SELECT id,event_ts,event_type,dedup_key,status,cluster,namespace FROM alarm_history"
+            ).fetchone()
+        state_db.execute(
+            "INSERT INTO alarm_history(id,event_ts,event_type,dedup_key,status,cluster,namespace) VALUES(?,?,?,?,?,?,?)",
+            tuple(seg_row),
+        )
+        state_db.commit()
+        r = _request(app, "GET", "/api/alarms/history", params={"cluster": "c1"})
+        assert sorted(e["dedup_key"] for e in r.json()) == ["new", "old0", "old1"]
+        assert all("_id" not in e for e in r.json())
+        r = _request(app, "GET", "/api/alarms/history/export")
+        assert sorted(json.loads(l)["dedup_key"] for l in r.text.splitlines()) == ["new", "old0", "old1"]
+
+        for days in ("abc", None, 0, -1, 1.5):
+            r = _request(app, "POST", "/api/alarms/history/archive", json={"days": days})
+            assert r.status_code == 400, days
+    finally:
+        shutil.rmtree(_archive.ARCHIVE_DIR, ignore_errors=True)
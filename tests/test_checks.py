@@ -0,0 +1,306 @@
+"""
+/api/checks endpoint testleri — geçici config/checks ve config/generated üzerinde çalışır.
+"""
+import os
+
+import pytest
+import yaml
+
+from conftest import _request
+
+
+@pytest.fixture
+def generated(_tmp_dirs):
+    """generated/ altına çok sayıda check içeren bir dosya yazar, test sonunda siler."""
+    path = _tmp_dirs / "config" / "generated" / "catalog_probe.yaml"
+    checks = []
+    for ns in ("ns1", "ns2", "ns3"):
+        for cl in ("c1", "c2"):
+            checks.append({
+                "name": f"ocp_pod_health__{ns}__{cl}",
+                "type": "ocp_pod_health",
+                "enabled": ns != "ns3",
+                "params": {"namespace": ns, "cluster": cl},
+            })
+    checks.append({
+        "name": "snapshot__c1",
+        "type": "ocp_cluster_snapshot",
+        "params": {"cluster": "c1", "namespaces": [{"namespace": "ns1"}, {"namespace": "ns9"}]},
+    })
+    path.write_text(yaml.dump({"checks": checks}))
+    yield path
+    path.unlink(missing_ok=True)
+
+
+def _names(r):
+    assert r.status_code == 200, r.text
+    return [c["name"] for c in r.json()]
+
+
+def test_checks_filters_use_catalog_indexes(app, generated):
+    get = lambda **p: _names(_request(app, "GET", "/api/checks", params=p))
+
+    assert len(get()) == 7
+    assert get(type="ocp_cluster_snapshot") == ["snapshot__c1"]
+    assert get(cluster="c2", enabled="true") == ["ocp_pod_health__ns1__c2", "ocp_pod_health__ns2__c2"]
+    assert get(namespace="ns9") == ["snapshot__c1"]
+    assert get(namespace="ns1", cluster="c1") == ["ocp_pod_health__ns1__c1", "snapshot__c1"]
+    assert get(enabled="false", q="NS3__C1") == ["ocp_pod_health__ns3__c1"]
+    assert get(type="nope") == []
+
+
+def test_checks_cursor_pagination(app, generated):
+    seen, cursor = [], None
+    while True:
+        params = {"type": "ocp_pod_health", "limit": 4}
+        if cursor:
+            params["cursor"] = cursor
+        r = _request(app, "GET", "/api/checks", params=params)
+        seen += _names(r)
+        cursor = r.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert seen == sorted(seen) and len(seen) == 6
+
+    assert _request(app, "GET", "/api/checks", params={"limit": 2, "cursor": "%%%"}).status_code == 400
+
+
+def test_catalog_reparses_only_changed_files(app, generated, monkeypatch):
+    from routers import _check_catalog
+
+    cat = _check_catalog.CheckCatalog()
+    loads = []
+    real = cat._load
+    monkeypatch.setattr(cat, "_load", lambda p, fp: loads.append(p.name) or real(p, fp))
+
+    assert cat.get("snapshot__c1")["type"] == "ocp_cluster_snapshot"
+    assert "catalog_probe.yaml" in loads
+
+    loads.clear()
+    cat.refresh()
+    assert loads == []
+
+    other = generated.parent / "catalog_probe2.yaml"
+    other.write_text(yaml.dump({"checks": [{"name": "extra", "type": "ocp_pod_health"}]}))
+    try:
+        assert cat.locate("extra") == (other, 0)
+        assert loads == ["catalog_probe2.yaml"]
+    finally:
+        other.unlink()
+    assert cat.locate("extra") is None
+
+
+def test_check_crud_keeps_catalog_in_sync(app, generated):
+    name = "ocp_pod_health__ns2__c1"
+    chk = _request(app, "GET", f"/api/checks/{name}").json()
+    assert chk["_source_file"] == "generated/catalog_probe.yaml"
+
+    chk["enabled"] = False
+    assert _request(app, "PUT", f"/api/checks/{name}", json=chk).status_code == 200
+    assert _request(app, "GET", f"/api/checks/{name}").json()["enabled"] is False
+    assert name in _names(_request(app, "GET", "/api/checks", params={"enabled": "false"}))
+
+    assert _request(app, "DELETE", f"/api/checks/{name}").status_code == 200
+    assert _request(app, "GET", f"/api/checks/{name}").status_code == 404
+    assert name not in _names(_request(app, "GET", "/api/checks"))
+
+
+def test_concurrent_updates_to_one_file_are_not_lost(app, generated):
+    from concurrent.futures import ThreadPoolExecutor
+    from routers import _atomic, checks
+
+    names = [c["name"] for c in yaml.safe_load(generated.read_text())["checks"]]
+
+    def bump(name):
+        chk = dict(checks.catalog.get(name))
+        chk["params"] = {**chk["params"], "timeout_sec": "99"}
+        return checks._update_check(name, chk)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(bump, names))
+
+    on_disk = yaml.safe_load(generated.read_text())["checks"]
+    assert [c["params"].get("timeout_sec") for c in on_disk] == ["99"] * len(names)
+    assert not any("_version" in c or "_source_file" in c for c in on_disk)
+    assert not list(generated.parent.glob(".*.tmp"))
+    # Kilit dosyaları config dizininde değil, ALARMFW_STATE/locks altında
+    assert not list(generated.parent.glob(".*.lock"))
+    assert list(_atomic.LOCK_DIR.glob(f"{generated.name}.*.lock"))
+
+
+def test_check_update_and_delete_honour_if_match(app, generated):
+    name = "ocp_pod_health__ns1__c1"
+    r = _request(app, "GET", f"/api/checks/{name}")
+    etag, chk = r.headers["ETag"], r.json()
+    assert etag == f'"{chk["_version"]}"'
+
+    chk["enabled"] = False
+    r = _request(app, "PUT", f"/api/checks/{name}", json=chk, headers={"If-Match": etag})
+    assert r.status_code == 200
+    new_version = r.json()["version"]
+    assert new_version != chk["_version"]
+
+    # Eski sürümle ikinci yazma (body._version) ve silme reddedilir
+    chk["enabled"] = True
+    assert _request(app, "PUT", f"/api/checks/{name}", json=chk).status_code == 412
+    assert _request(app, "DELETE", f"/api/checks/{name}", headers={"If-Match": etag}).status_code == 412
+    assert _request(app, "GET", f"/api/checks/{name}").json()["enabled"] is False
+
+    assert _request(app, "DELETE", f"/api/checks/{name}", headers={"If-Match": f'"{new_version}"'}).status_code == 200
+
+
+def test_bulk_groups_by_file_and_writes_once(app, generated, monkeypatch):
+    from routers import checks
+
+    writes = []
+    real = checks.atomic_write_many
+    monkeypatch.setattr(checks, "atomic_write_many", lambda changes: writes.append(sorted(changes)) or real(changes))
+
+    v = _request(app, "GET", "/api/checks/snapshot__c1").json()["_version"]
+    ops = [{"op": "patch", "name": f"ocp_pod_health__{ns}__{cl}", "body": {"enabled": False, "params": {"timeout_sec": "5"}}}
+           for ns in ("ns1", "ns2") for cl in ("c1", "c2")]
+    ops += [
+        {"op": "delete", "name": "snapshot__c1", "version": v},
+        {"op": "create", "body": {"name": "bulk_new", "type": "ocp_pod_health",
+                                  "params": {"namespace": "ns7", "cluster": "c1"}}},
+    ]
+    r = _request(app, "POST", "/api/checks/bulk", json={"operations": ops})
+    assert r.status_code == 200, r.text
+    body = r.json()
+    assert body["applied"] is True
+    assert body["files_written"] == ["checks/bulk_new.yaml", "generated/catalog_probe.yaml"]
+    assert all(res["ok"] for res in body["results"])
+    assert len(writes) == 1
+
+    on_disk = {c["name"]: c for c in yaml.safe_load(generated.read_text())["checks"]}
+    assert "snapshot__c1" not in on_disk
+    assert on_disk["ocp_pod_health__ns1__c1"]["enabled"] is False
+    assert on_disk["ocp_pod_health__ns1__c1"]["params"] == {"namespace": "ns1", "cluster": "c1", "timeout_sec": "5"}
+    assert _request(app, "GET", "/api/checks/bulk_new").status_code == 200
+    assert _request(app, "DELETE", "/api/checks/bulk_new").status_code == 200
+
+
+def test_bulk_is_all_or_nothing(app, generated):
+    before = generated.read_text()
+    ops = [
+        {"op": "patch", "name": "ocp_pod_health__ns1__c1", "body": {"enabled": False}},
+        {"op": "delete", "name": "does_not_exist"},
+        {"op": "update", "name": "ocp_pod_health__ns2__c1", "version": "stale", "body": {"type": "x"}},
+        {"op": "explode"},
+    ]
+    r = _request(app, "POST", "/api/checks/bulk", json={"operations": ops})
+    assert r.status_code == 409
+    detail = r.json()["detail"]
+    assert detail["applied"] is False
+    assert [res.get("status") for res in detail["results"]] == [None, 404, 412, 400]
+    assert generated.read_text() == before
+
+    # Sürüm çakışması yoksa batch işlemlerin en belirgin hatasıyla döner
+    def status(*ops):
+        return _request(app, "POST", "/api/checks/bulk", json={"operations": list(ops)}).status_code
+
+    bad_body = {"op": "patch", "name": "ocp_pod_health__ns1__c1", "body": {"enabled": "nope"}}
+    assert status(ops[1]) == 404
+    assert status(ops[3]) == 400
+    assert status(ops[1], bad_body, ops[3]) == 422
+    assert status(ops[2], bad_body) == 409
+    assert generated.read_text() == before
+
+    r = _request(app, "POST", "/api/checks/bulk", json={"operations": ops[:1], "dry_run": True})
+    assert r.status_code == 200 and r.json()["applied"] is False
+    assert generated.read_text() == before
+
+
+def test_bulk_resolves_checks_created_earlier_in_the_batch(app, generated):
+    new = {"name": "bulk_chain", "type": "ocp_pod_health", "params": {"namespace": "ns7", "cluster": "c1"}}
+    ops = [
+        {"op": "create", "body": new},
+        {"op": "patch", "name": "bulk_chain", "body": {"enabled": False}},
+    ]
+    r = _request(app, "POST", "/api/checks/bulk", json={"operations": ops})
+    assert r.status_code == 200, r.text
+    assert r.json()["files_written"] == ["checks/bulk_chain.yaml"]
+    assert _request(app, "GET", "/api/checks/bulk_chain").json()["enabled"] is False
+
+    # create + delete aynı batch'te: dosya hiç oluşmaz
+    r = _request(app, "POST", "/api/checks/bulk", json={"operations": [
+        {"op": "create", "body": {**new, "name": "bulk_gone"}},
+        {"op": "delete", "name": "bulk_gone"},
+    ]})
+    assert r.status_code == 200, r.text
+    assert _request(app, "GET", "/api/checks/bulk_gone").status_code == 404
+
+    # op.name ile body.name çelişirse 400
+    r = _request(app, "POST", "/api/checks/bulk", json={"operations": [
+        {"op": "create", "name": "bulk_a", "body": {**new, "name": "bulk_b"}},
+    ]})
+    assert r.status_code == 400
+    assert _request(app, "DELETE", "/api/checks/bulk_chain").status_code == 200
+
+
+def test_bulk_rolls_back_files_when_a_rename_fails(app, generated, monkeypatch):
+    from routers import _atomic
+
+    before = generated.read_text()
+    real_replace = os.replace
+
+    def flaky_replace(src, dst):
+        if str(dst).endswith("bulk_rb.yaml"):
+            raise OSError("disk full")
+        return real_replace(src, dst)
+
+    monkeypatch.setattr(_atomic.os, "replace", flaky_replace)
+    ops = [
+        {"op": "patch", "name": "ocp_pod_health__ns1__c1", "body": {"enabled": False}},
+        {"op": "create", "body": {"name": "bulk_rb", "type": "ocp_pod_health",
+                                  "params": {"namespace": "ns7", "cluster": "c1"}}},
+    ]
+    with pytest.raises(OSError):
+        _request(app, "POST", "/api/checks/bulk", json={"operations": ops})
+    assert generated.read_text() == before
+    assert not list(generated.parent.glob(".*.tmp")) and not list(generated.parent.glob(".*.bak"))
+
+
+def test_check_writes_are_schema_validated(app, generated):
+    bad = {"name": "bad_check", "type": "ocp_pod_health", "params": {"cluster": "c1", "timeout_sec": "0"}}
+    r = _request(app, "POST", "/api/checks", json=bad)
+    assert r.status_code == 422
+    locs = {e["loc"] for e in r.json()["detail"]["errors"]}
+    assert locs == {"params.namespace", "params.timeout_sec"}
+
+    chk = _request(app, "GET", "/api/checks/snapshot__c1").json()
+    chk["params"]["namespaces"] = []
+    assert _request(app, "PUT", "/api/checks/snapshot__c1", json=chk).status_code == 422
+
+    r = _request(app, "POST", "/api/checks/bulk", json={"operations": [
+        {"op": "patch", "name": "ocp_pod_health__ns1__c1", "body": {"enabled": "nope"}},
+    ]})
+    assert r.status_code == 422
+    assert r.json()["detail"]["results"][0]["status"] == 422
+
+    # Bilinmeyen tip yalnızca ortak alanlardan doğrulanır
+    from routers._check_schema import validate_check
+    assert validate_check({"name": "x", "type": "custom_probe", "params": {"anything": 1}}) == []
+    assert validate_check({"name": "a/b", "type": "custom_probe"})[0]["loc"] == "name"
+
+
+def test_validate_endpoint_scans_whole_catalog(app, _tmp_dirs):
+    path = _tmp_dirs / "config" / "generated" / "validate_probe.yaml"
+    checks = [{
+        "name": f"ocp_pod_health__ns{i}__c{i % 7}",
+        "type": "ocp_pod_health",
+        "enabled": True,
+        "params": {"namespace": f"ns{i}", "cluster": f"c{i % 7}", "ocp_api": "https://api:6443",
+                   "ocp_insecure": "true", "timeout_sec": "30"},
+        "notify": {"primary": ["zabbix"], "fallback": ["dev_outbox"]},
+    } for i in range(500)]
+    checks[17]["params"]["timeout_sec"] = "soon"
+    checks[420]["enabled"] = "yes"
+    path.write_text(yaml.dump({"checks": checks}, Dumper=getattr(yaml, "CSafeDumper", yaml.SafeDumper)))
+    try:
+        body = _request(app, "GET", "/api/checks/validate").json()
+        assert body["checked"] >= 500
+        assert {r["name"] for r in body["results"]} == {checks[17]["name"], checks[420]["name"]}
+        assert "duration_ms" in body
+    finally:
+        path.unlink()
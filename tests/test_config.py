@@ -0,0 +1,321 @@
+"""
+/api/config testleri — conf.d ve observe.yaml geçici dizinlerde, generated/ocp_pod_health.yaml üretimi.
+"""
+import pytest
+import yaml
+
+from conftest import _request
+
+
+@pytest.fixture
+def conf_env(app, _tmp_dirs):
+    """İki cluster'lı observe.yaml kurar; test sonunda conf.d, observe.yaml ve üretilen dosyaları geri alır."""
+    from routers import config
+
+    observe = _tmp_dirs / "config" / "observe.yaml"
+    original = observe.read_text()
+    observe.write_text(yaml.dump({"clusters": [
+        {"name": "c1", "ocp_api": "https://c1.example:6443", "insecure": True},
+        {"name": "c2", "ocp_api": "https://c2.example:6443", "insecure": False},
+    ]}))
+    yield config
+    for f in config.CONF_D.glob("*.conf"):
+        f.unlink()
+    observe.write_text(original)
+    config.GENERATED.unlink(missing_ok=True)
+    config._generator.manifest_path.unlink(missing_ok=True)
+
+
+def _put_ns(app, name, **body):
+    body.setdefault("clusters", ["c1", "c2"])
+    r = _request(app, "PUT", f"/api/config/namespaces/{name}", json=body)
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+def test_generate_is_incremental_and_byte_stable(app, conf_env, monkeypatch):
+    from routers import _generator
+
+    for i in range(6):
+        _put_ns(app, f"ns{i}", zabbix_enabled=i % 2 == 0, clusters=["c1", "c2"] if i % 3 else ["c2"])
+    _put_ns(app, "off", namespace_enabled=False)
+
+    gen = conf_env._generator
+    text = conf_env.GENERATED.read_text()
+    # Parçaların birleşimi tek seferlik tam dump ile byte-byte aynı
+    obs = {c["name"]: c for c in yaml.safe_load((conf_env.ALARMFW_CONFIG / "observe.yaml").read_text())["clusters"]}
+    full = []
+    for f in sorted(conf_env.CONF_D.glob("*.conf")):
+        full += _generator.pod_health_checks(f.stem, conf_env._read_conf(f), obs)
+    assert text == yaml.dump({"checks": full}, allow_unicode=True, default_flow_style=False)
+    assert len(yaml.safe_load(text)["checks"]) == 10
+
+    rendered = []
+    real = _generator.pod_health_checks
+    monkeypatch.setattr(_generator, "pod_health_checks", lambda ns, *a: rendered.append(ns) or real(ns, *a))
+
+    # Değişiklik yoksa hiçbir şey render edilmez, dosyaya yazılmaz
+    mtime = conf_env.GENERATED.stat().st_mtime_ns
+    r = _request(app, "POST", "/api/config/generate")
+    assert r.json() == {"ok": True, "generated_checks": 10, "written": False,
+                        "rendered_namespaces": 0, "removed_namespaces": 0, "files": []}
+    assert rendered == [] and conf_env.GENERATED.stat().st_mtime_ns == mtime
+
+    # Tek namespace değişince yalnızca o render edilir, diğer satırlar aynı kalır
+    _put_ns(app, "ns4", severity="1", zabbix_enabled=True)
+    assert rendered == ["ns4"]
+    new = conf_env.GENERATED.read_text()
+    changed = [(a, b) for a, b in zip(text.splitlines(), new.splitlines()) if a != b]
+    assert changed == [("    severity: '5'", "    severity: '1'")] * 2
+
+    # Cluster girdisi değişince yalnızca o cluster'ı kullanan namespace'ler
+    rendered.clear()
+    _request(app, "PUT", "/api/config/clusters/c1", json={"ocp_api": "https://c1-new.example:6443"})
+    _request(app, "POST", "/api/config/generate")
+    assert sorted(rendered) == ["ns1", "ns2", "ns4", "ns5"]
+    assert "c1-new.example" in conf_env.GENERATED.read_text()
+
+    # Silinen namespace manifest'ten de düşer
+    r = _request(app, "DELETE", "/api/config/namespaces/ns1")
+    assert r.json()["generated_checks"] == 8
+    assert "ns1" not in gen._entries
+
+
+def test_generate_survives_restart_and_manual_edits(app, conf_env):
+    from routers._generator import PodHealthGenerator
+
+    _put_ns(app, "alpha")
+    _put_ns(app, "beta")
+    gen = conf_env._generator
+    expected = conf_env.GENERATED.read_text()
+
+    # Yeni süreç: manifest diskten okunur, hiçbir namespace yeniden render edilmez
+    fresh = PodHealthGenerator(gen.conf_d, gen.observe_path, gen.output)
+    result = fresh.generate()
+    assert (result.rendered, result.written, result.count) == ([], False, 4)
+
+    # Üretilen dosya elle bozulursa manifest'ten yeniden yazılır
+    conf_env.GENERATED.write_text("checks: []\n")
+    result = fresh.generate()
+    assert result.written and result.rendered == []
+    assert conf_env.GENERATED.read_text() == expected
+
+    result = fresh.generate(full=True)
+    assert sorted(result.rendered) == ["alpha", "beta"] and not result.written
+
+
+def test_sharded_layout_rewrites_only_affected_shards_and_migrates(app, conf_env):
+    from routers._check_catalog import catalog
+    from routers._generator import PodHealthGenerator
+
+    _put_ns(app, "alpha")
+    _put_ns(app, "beta", clusters=["c2"])
+    single = conf_env.GENERATED.read_text()
+    gen = conf_env._generator
+
+    # single → sharded: shard'lar yazılır, tek dosya aynı adımda silinir
+    sharded = PodHealthGenerator(gen.conf_d, gen.observe_path, gen.output, layout="sharded")
+    result = sharded.generate()
+    assert result.rendered == [] and result.files == [
+        "ocp_pod_health.yaml", "ocp_pod_health/c1.yaml", "ocp_pod_health/c2.yaml"]
+    assert not conf_env.GENERATED.exists()
+    shard_c1, shard_c2 = sharded.shard_dir / "c1.yaml", sharded.shard_dir / "c2.yaml"
+    assert [c["name"] for c in yaml.safe_load(shard_c2.read_text())["checks"]] == [
+        "ocp_pod_health__alpha__c2", "ocp_pod_health__beta__c2"]
+    assert catalog.locate("ocp_pod_health__alpha__c1")[0] == shard_c1
+    assert catalog.locate("ocp_pod_health__beta__c2")[0] == shard_c2
+
+    # Yalnızca c2'deki namespace değişirse c1 shard'ına dokunulmaz
+    c1_mtime = shard_c1.stat().st_mtime_ns
+    (conf_env.CONF_D / "beta.conf").write_text('CLUSTERS="c2"\nNAMESPACE_ENABLED="true"\nSEVERITY="2"\n')
+    result = sharded.generate()
+    assert result.rendered == ["beta"] and result.files == ["ocp_pod_health/c2.yaml"]
+    assert shard_c1.stat().st_mtime_ns == c1_mtime
+
+    # /api/checks bir shard'ı kilitliyken üretim o shard'ı yazmadan bekler
+    import threading
+    from routers._atomic import file_lock
+
+    (conf_env.CONF_D / "beta.conf").write_text('CLUSTERS="c2"\nNAMESPACE_ENABLED="true"\nSEVERITY="3"\n')
+    done = threading.Event()
+    with file_lock(shard_c2):
+        worker = threading.Thread(target=lambda: sharded.generate() and done.set())
+        worker.start()
+        assert not done.wait(0.3)
+        before = shard_c2.read_text()
+    worker.join(5)
+    assert done.is_set() and shard_c2.read_text() != before
+
+    r = _request(app, "GET", "/api/monitor/namespaces")
+    assert r.status_code == 200
+
+    # sharded → single (uygulamanın varsayılan düzeni): tek dosya geri gelir, shard'lar silinir
+    _put_ns(app, "beta", clusters=["c2"])
+    assert not shard_c1.exists() and not shard_c2.exists()
+    assert conf_env.GENERATED.read_text() == single
+
+
+def test_cluster_snapshot_mode_groups_namespaces_per_cluster(app, conf_env, monkeypatch):
+    from routers import _generator
+    from routers._check_schema import validate_check
+
+    _put_ns(app, "alpha", zabbix_enabled=True, severity="2")
+    _put_ns(app, "beta", clusters=["c2"], mail_enabled=True)
+    _put_ns(app, "gamma", namespace_enabled=False)
+    gen = conf_env._generator
+
+    snap = _generator.PodHealthGenerator(gen.conf_d, gen.observe_path, gen.output, mode="cluster_snapshot")
+    result = snap.generate()
+    assert result.count == 2 and sorted(result.rendered) == ["alpha", "beta", "gamma"]
+    checks = yaml.safe_load(conf_env.GENERATED.read_text())["checks"]
+    assert [c["name"] for c in checks] == ["ocp_cluster_snapshot__c1", "ocp_cluster_snapshot__c2"]
+    assert all(validate_check(c) == [] for c in checks)
+    c2 = checks[1]["params"]
+    assert (c2["cluster"], c2["ocp_insecure"]) == ("c2", "false")
+    assert [(m["namespace"], m["severity"], m["notify"]["primary"]) for m in c2["namespaces"]] == [
+        ("alpha", "2", ["zabbix"]), ("beta", "5", ["smtp"])]
+
+    # Tek namespace değişince yalnızca onun cluster'larının snapshot check'i yeniden render edilir
+    rendered = []
+    real = _generator.cluster_snapshot_check
+    monkeypatch.setattr(_generator, "cluster_snapshot_check", lambda cl, *a: rendered.append(cl) or real(cl, *a))
+    (conf_env.CONF_D / "beta.conf").write_text(
+        (conf_env.CONF_D / "beta.conf").read_text().replace('SEVERITY="5"', 'SEVERITY="1"'))
+    result = snap.generate()
+    assert result.rendered == ["beta"] and rendered == ["c2"]
+    assert snap.generate().written is False
+
+    # per_namespace'e dönüş: manifest'teki snapshot parçaları kullanılmaz, eski çıktı üzerine yazılır
+    r = _request(app, "POST", "/api/config/generate")
+    assert r.json()["generated_checks"] == 3 and r.json()["rendered_namespaces"] == 3
+
+
+def test_bulk_onboarding_writes_everything_and_generates_once(app, conf_env, _tmp_dirs, monkeypatch):
+    import os
+
+    calls = []
+    real = conf_env.generation._generate
+    monkeypatch.setattr(conf_env.generation, "_generate", lambda *a, **k: calls.append(1) or real(*a, **k))
+
+    body = {
+        "clusters": [{"name": "c3", "ocp_api": "https://c3.example:6443", "insecure": False, "token": "sha256~abc"}],
+        "namespaces": [{"name": f"team{i:03d}", "clusters": ["c1", "c3"], "severity": "3"} for i in range(150)],
+    }
+    r = _request(app, "POST", "/api/config/bulk", params={"dry_run": "true"}, json=body)
+    assert r.json()["dry_run"] is True and not calls
+    assert not (conf_env.CONF_D / "team000.conf").exists()
+
+    r = _request(app, "POST", "/api/config/bulk", json=body)
+    assert r.status_code == 200, r.text
+    out = r.json()
+    assert (out["namespaces"], out["tokens"], out["generated_checks"]) == (150, 1, 300)
+    assert calls == [1]
+    token = _tmp_dirs / "secrets" / "c3.token"
+    assert token.read_text() == "sha256~abc" and os.stat(token).st_mode & 0o777 == 0o600
+    names = {c["name"] for c in yaml.safe_load(conf_env.GENERATED.read_text())["checks"]}
+    assert "ocp_pod_health__team149__c3" in names
+
+    # Export → aynı gövdeyle geri import: hiçbir conf içeriği değişmez
+    exported = _request(app, "GET", "/api/config/bulk/export").json()
+    assert [c["name"] for c in exported["clusters"]] == ["c1", "c2", "c3"]
+    assert exported["namespaces"][0]["clusters"] == ["c1", "c3"]
+    before = (conf_env.CONF_D / "team007.conf").read_text()
+    r = _request(app, "POST", "/api/config/bulk", json=exported)
+    assert r.status_code == 200 and r.json()["rendered_namespaces"] == 0
+    assert (conf_env.CONF_D / "team007.conf").read_text() == before
+
+    r = _request(app, "POST", "/api/config/bulk", json={"delete_namespaces": [f"team{i:03d}" for i in range(100)]})
+    assert r.json()["generated_checks"] == 100 and len(calls) == 3
+    token.unlink()
+
+
+def test_bulk_csv_roundtrip_and_validation(app, conf_env):
+    csv_body = (
+        "name,clusters,zabbix_enabled,severity\n"
+        "alpha,c1;c2,true,2\n"
+        "beta,c2,false,\n"
+    )
+    r = _request(app, "POST", "/api/config/bulk", content=csv_body, headers={"Content-Type": "text/csv"})
+    assert r.status_code == 200, r.text
+    assert r.json()["generated_checks"] == 3
+
+    exported = _request(app, "GET", "/api/config/bulk/export", params={"format": "csv"})
+    assert exported.headers["content-type"].startswith("text/csv")
+    lines = exported.text.splitlines()
+    assert lines[0].startswith("name,clusters,namespace_enabled,zabbix_enabled")
+    assert lines[1].startswith("alpha,c1;c2,true,true,false,2,OCP,")
+
+    yaml_body = _request(app, "GET", "/api/config/bulk/export", params={"format": "yaml"}).text
+    r = _request(app, "POST", "/api/config/bulk", content=yaml_body, headers={"Content-Type": "application/yaml"})
+    assert r.status_code == 200 and r.json()["rendered_namespaces"] == 0
+
+    bad = {
+        "clusters": [{"name": "bad/name"}, {"name": "c9", "ocp_api": "ftp://x"}],
+        "namespaces": [{"name": "alpha"}, {"name": "alpha"}],
+        "delete_namespaces": ["alpha"],
+    }
+    r = _request(app, "POST", "/api/config/bulk", json=bad)
+    assert r.status_code == 422
+    locs = [e["loc"] for e in r.json()["detail"]["errors"]]
+    assert locs == ["clusters.0.name", "namespaces.1.name", "clusters.1.ocp_api", "delete_namespaces"]
+    assert _request(app, "POST", "/api/config/bulk", json={"delete_namespaces": ["nope"]}).status_code == 404
+
+
+def test_single_cluster_writes_and_bulk_import_do_not_lose_updates(app, conf_env):
+    from concurrent.futures import ThreadPoolExecutor
+
+    def single(i):
+        return _request(app, "PUT", f"/api/config/clusters/s{i}", json={"ocp_api": f"https://s{i}.example:6443"})
+
+    def bulk(i):
+        body = {"clusters": [{"name": f"b{i}", "ocp_api": f"https://b{i}.example:6443"}]}
+        return _request(app, "POST", "/api/config/bulk", json=body)
+
+    with ThreadPoolExecutor(8) as pool:
+        futures = [pool.submit(fn, i) for i in range(8) for fn in (single, bulk)]
+        assert all(f.result().status_code == 200 for f in futures)
+
+    names = {c["name"] for c in yaml.safe_load((conf_env.ALARMFW_CONFIG / "observe.yaml").read_text())["clusters"]}
+    assert names == {"c1", "c2", *(f"s{i}" for i in range(8)), *(f"b{i}" for i in range(8))}
+
+
+def test_generation_worker_coalesces_bursts(app, conf_env, monkeypatch):
+    import asyncio
+    from conftest import _request_async
+
+    worker = conf_env.generation
+    calls = []
+    real = worker._generate
+    monkeypatch.setattr(worker, "_generate", lambda *a, **k: calls.append(1) or real(*a, **k))
+    monkeypatch.setattr(worker, "debounce", 0.3)
+    monkeypatch.setattr(worker, "max_delay", 5.0)
+
+    async def scenario():
+        task = asyncio.create_task(worker.run())
+        for _ in range(50):                       # açılış üretimi
+            await asyncio.sleep(0.02)
+            if worker.status()["runs"] and not worker.status()["pending"]:
+                break
+        calls.clear()
+
+        for i in range(10):
+            r = await _request_async(app, "PUT", f"/api/config/namespaces/burst{i}", json={"clusters": ["c1"]})
+            assert r.json() == {"ok": True, "name": f"burst{i}", "generation": "pending"}
+        status = (await _request_async(app, "GET", "/api/config/generate/status")).json()
+        assert status["mode"] == "debounced" and status["pending_changes"] == 10
+        assert not conf_env.GENERATED.exists() or "burst" not in conf_env.GENERATED.read_text()
+
+        await asyncio.sleep(0.8)
+        status = (await _request_async(app, "GET", "/api/config/generate/status")).json()
+        assert calls == [1] and not status["pending"]
+        assert status["last"]["coalesced"] == 10 and status["last"]["generated_checks"] == 10
+        assert status["last"]["trigger"] == "debounced" and status["last"]["duration_ms"] >= 0
+
+        # Kapanışta bekleyen değişiklik yazılır
+        await _request_async(app, "DELETE", "/api/config/namespaces/burst0")
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(scenario())
+    assert worker.status()["last"]["trigger"] == "shutdown" and worker.status()["mode"] == "sync"
+    assert "burst0" not in conf_env.GENERATED.read_text()
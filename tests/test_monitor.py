@@ -0,0 +1,233 @@
+"""
+/api/monitor endpoint testleri — geçici alarmfw.sqlite üzerinde çalışır.
+"""
+import json
+
+from conftest import _request
+
+
+def _insert_snapshot(conn, key, status, cluster, namespace, pods, ts=1):
+    payload = {
+        "alarm_name": key,
+        "status": status,
+        "severity": "3",
+        "timestamp_utc": "2024-01-01T00:00:00Z",
+        "evidence": {"cluster": cluster, "namespace": namespace, "pods": pods},
+    }
+    conn.execute(
+        "INSERT INTO alarm_state(dedup_key,last_status,last_change_ts,alarm_name,payload_json) VALUES(?,?,?,?,?)",
+        (key, status, ts, key, json.dumps(payload)),
+    )
+
+
+def test_pods_fields_projection(app, state_db):
+    _insert_snapshot(state_db, "a", "PROBLEM", "c1", "ns1", [{"name": "p1"}])
+    _insert_snapshot(state_db, "b", "OK", "c1", "ns2", [])
+    state_db.commit()
+
+    r = _request(app, "GET", "/api/monitor/pods", params={"fields": "namespace,status"})
+    assert r.status_code == 200
+    assert r.json() == [{"namespace": "ns1", "status": "PROBLEM"}]
+
+    r = _request(app, "GET", "/api/monitor/pods", params={"fields": "pods"})
+    assert r.json() == [{"pods": [{"name": "p1"}]}]
+
+    assert _request(app, "GET", "/api/monitor/pods", params={"fields": "secret"}).status_code == 400
+
+
+def test_monitor_lists_include_db_entries(app, state_db):
+    _insert_snapshot(state_db, "a", "PROBLEM", "c1", "ns1", [])
+    _insert_snapshot(state_db, "b", "OK", "c2", "ns2", [])
+    state_db.commit()
+
+    assert _request(app, "GET", "/api/monitor/namespaces").json() == ["ns1", "ns2"]
+    assert _request(app, "GET", "/api/monitor/clusters").json() == ["c1", "c2"]
+
+
+def test_conditional_get_returns_304_until_db_or_config_changes(app, state_db, _tmp_dirs):
+    _insert_snapshot(state_db, "a", "PROBLEM", "c1", "ns1", [])
+    state_db.commit()
+
+    for path in ("/api/monitor/pods", "/api/monitor/namespaces", "/api/alarms/state"):
+        r = _request(app, "GET", path)
+        etag = r.headers["ETag"]
+        r2 = _request(app, "GET", path, headers={"If-None-Match": etag})
+        assert r2.status_code == 304, path
+        assert r2.content == b""
+
+    r = _request(app, "GET", "/api/monitor/clusters")
+    etag = r.headers["ETag"]
+
+    # DB commit → yeni ETag
+    _insert_snapshot(state_db, "b", "PROBLEM", "c2", "ns2", [], ts=2)
+    state_db.commit()
+    r = _request(app, "GET", "/api/monitor/clusters", headers={"If-None-Match": etag})
+    assert r.status_code == 200
+    assert r.json() == ["c1", "c2"]
+    etag = r.headers["ETag"]
+
+    # generated/ altındaki config değişikliği → yeni ETag
+    gen = _tmp_dirs / "config" / "generated" / "etag_probe.yaml"
+    gen.write_text("checks: []\n")
+    try:
+        r = _request(app, "GET", "/api/monitor/clusters", headers={"If-None-Match": etag})
+        assert r.status_code == 200
+    finally:
+        gen.unlink()
+
+
+def test_snapshot_index_refreshes_only_changed_rows(app, state_db, monkeypatch):
+    from routers import _monitor_index
+
+    _insert_snapshot(state_db, "a", "PROBLEM", "c1", "ns1", [])
+    _insert_snapshot(state_db, "b", "PROBLEM", "c1", "ns2", [])
+    state_db.commit()
+
+    decoded = []
+    real = _monitor_index.row_from_payload
+    monkeypatch.setattr(_monitor_index, "row_from_payload",
+                        lambda st, pj: decoded.append(json.loads(pj)["alarm_name"]) or real(st, pj))
+    idx = _monitor_index.SnapshotIndex()
+
+    assert sorted(r["namespace"] for r in idx.rows("c1")) == ["ns1", "ns2"]
+    assert sorted(decoded) == ["a", "b"]
+
+    decoded.clear()
+    assert idx.refresh() is False          # DB değişmedi → hiçbir şey okunmaz
+    assert decoded == []
+
+    state_db.execute(
+        "UPDATE alarm_state SET last_status='OK', last_change_ts=2, payload_json=? WHERE dedup_key='a'",
+        (json.dumps({"alarm_name": "a", "status": "OK",
+                     "evidence": {"cluster": "c2", "namespace": "ns1"}}),),
+    )
+    state_db.execute("DELETE FROM alarm_state WHERE dedup_key='b'")
+    state_db.commit()
+
+    assert idx.refresh() is True
+    assert decoded == ["a"]
+    assert idx.rows("c1") == []
+    assert [r["status"] for r in idx.rows("c2", "ns1")] == ["OK"]
+    assert idx.pairs() == {("c2", "ns1")}
+
+    # Sürümü aynı kalan (aynı uzunlukta) payload değişikliği tam taramada yakalanır
+    decoded.clear()
+    state_db.execute(
+        "UPDATE alarm_state SET payload_json=replace(payload_json, '\"ns1\"', '\"nsX\"') WHERE dedup_key='a'"
+    )
+    state_db.commit()
+    assert idx.refresh() is False and decoded == []
+    idx.full_scan_sec = 0
+    assert idx.refresh() is True and decoded == ["a"]
+    assert idx.pairs() == {("c2", "nsX")}
+
+
+def test_snapshot_index_skips_non_dict_evidence(app, state_db):
+    from routers import _monitor_index
+
+    _insert_snapshot(state_db, "good", "PROBLEM", "c1", "ns1", [])
+    for key, evidence in (("list", ["x"]), ("text", "oops")):
+        state_db.execute(
+            "INSERT INTO alarm_state(dedup_key,last_status,last_change_ts,payload_json) VALUES(?,?,?,?)",
+            (key, "PROBLEM", 1, json.dumps({"alarm_name": key, "evidence": evidence})),
+        )
+    state_db.commit()
+
+    assert _monitor_index.row_from_payload("PROBLEM", json.dumps({"evidence": ["x"]})) is None
+    idx = _monitor_index.SnapshotIndex()
+    assert [r["alarm_name"] for r in idx.rows()] == ["good"]
+    assert _request(app, "GET", "/api/monitor/namespaces").status_code == 200
+
+
+def test_pods_server_side_pod_filters_and_paging(app, state_db):
+    pods = [
+        {"name": "api-1", "phase": "Running", "ready": "1/1", "restarts": 0},
+        {"name": "api-2", "phase": "Running", "ready": "0/1", "restarts": 7},
+        {"name": "api-3", "phase": "Pending", "ready": False, "restarts": 0},
+        {"name": "worker-1", "phase": "Failed", "ready": False, "restart_count": 12},
+    ]
+    _insert_snapshot(state_db, "a", "PROBLEM", "c1", "ns1", pods)
+    state_db.commit()
+
+    def names(params):
+        r = _request(app, "GET", "/api/monitor/pods", params=params)
+        assert r.status_code == 200
+        (row,) = r.json()
+        return [p["name"] for p in row["pods"]], row["pods_total"]
+
+    assert names({"pod_not_ready": "true"}) == (["api-2", "api-3", "worker-1"], 3)
+    assert names({"pod_phase": "pending,failed"}) == (["api-3", "worker-1"], 2)
+    assert names({"pod_restarts_gt": 5}) == (["api-2", "worker-1"], 2)
+    assert names({"pod_name_prefix": "api-", "pod_not_ready": "true"}) == (["api-2", "api-3"], 2)
+    assert names({"pod_not_ready": "true", "pod_limit": 2, "pod_offset": 1}) == (["api-3", "worker-1"], 3)
+
+    r = _request(app, "GET", "/api/monitor/pods", params={"fields": "namespace,pods", "pod_limit": 1})
+    assert r.json() == [{"namespace": "ns1", "pods": [pods[0]], "pods_total": 4}]
+
+    # Filtre yokken yanıt şekli değişmez
+    assert "pods_total" not in _request(app, "GET", "/api/monitor/pods").json()[0]
+
+
+def test_matrix_is_dense_and_cached_per_data_change(app, state_db, _tmp_dirs, monkeypatch):
+    from routers import monitor
+
+    gen = _tmp_dirs / "config" / "generated" / "matrix_probe.yaml"
+    gen.write_text(
+        "checks:\n"
+        "  - name: x\n    type: ocp_pod_health\n    params: {cluster: c3, namespace: ns1}\n"
+    )
+    healthy = {"phase": "Running", "ready": "1/1", "restarts": 0}
+    _insert_snapshot(state_db, "a", "PROBLEM", "c1", "ns1", [
+        {"name": "p1", **healthy},
+        {"name": "p2", "phase": "Running", "ready": "0/1", "restarts": 0},
+        {"name": "p3", "phase": "Pending", "ready": False},
+        {"name": "p4", "phase": "Running", "ready": "1/1", "restart_count": 4},
+        {"name": "p5", "phase": "Succeeded", "restarts": 0},
+        {"name": "p6"},
+    ])
+    _insert_snapshot(state_db, "b", "ERROR", "c1", "ns1", [{"name": "p7", "phase": "Failed"}, {"name": "p8", **healthy}])
+    _insert_snapshot(state_db, "c", "OK", "c2", "ns2", [{"name": "p9", "phase": "Failed"}])
+    # Aynı en kötü statüde en yüksek severity kazanır (satır sırasından bağımsız)
+    for key, sev in (("d1", "2"), ("d2", "4"), ("d3", "3")):
+        state_db.execute(
+            "INSERT INTO alarm_state(dedup_key,last_status,last_change_ts,payload_json) VALUES(?,?,?,?)",
+            (key, "PROBLEM", 1, json.dumps({"alarm_name": key, "status": "PROBLEM", "severity": sev,
+                                             "evidence": {"cluster": "c2", "namespace": "ns1", "pods": []}})),
+        )
+    state_db.commit()
+
+    builds = []
+    real = monitor._build_matrix
+    monkeypatch.setattr(monitor, "_build_matrix", lambda: builds.append(1) or real())
+    try:
+        body = _request(app, "GET", "/api/monitor/matrix").json()
+        assert body["clusters"] == ["c1", "c2", "c3"]
+        assert body["namespaces"] == ["ns1", "ns2"]
+        assert body["cell_fields"] == ["status", "severity", "problem_pods"]
+        assert body["cells"] == [
+            [["ERROR", "3", 4], None],
+            [["PROBLEM", "4", 0], ["OK", "3", 0]],
+            [[None, None, 0], None],
+        ]
+
+        _request(app, "GET", "/api/monitor/matrix")
+        assert len(builds) == 1
+
+        state_db.execute("DELETE FROM alarm_state WHERE dedup_key='b'")
+        state_db.commit()
+        body = _request(app, "GET", "/api/monitor/matrix").json()
+        assert body["cells"][0][0] == ["PROBLEM", "3", 3]
+        assert len(builds) == 2
+    finally:
+        gen.unlink()
+
+
+def test_pods_fast_json_keeps_etag(app, state_db):
+    _insert_snapshot(state_db, "a", "PROBLEM", "c1", "ns1", [{"name": "p1"}])
+    state_db.commit()
+
+    r = _request(app, "GET", "/api/monitor/pods")
+    assert r.headers["content-type"] == "application/json"
+    assert r.json()[0]["pods"] == [{"name": "p1"}]
+    assert _request(app, "GET", "/api/monitor/pods",
+                    headers={"If-None-Match": r.headers["ETag"]}).status_code == 304
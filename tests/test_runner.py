@@ -0,0 +1,86 @@
+"""
+/api/run kuyruğu testleri — docker yerine sahte executor ile.
+"""
+import threading
+import time
+
+import pytest
+
+from conftest import _request
+
+
+@pytest.fixture
+def queue(app, tmp_path, monkeypatch):
+    """Geçici runs.sqlite'lı kuyruk; executor testin kontrolündeki event'leri bekler."""
+    from routers import runner
+    from routers._run_queue import RunQueue
+
+    gates = {}
+    running = []
+
+    def execute(config):
+        running.append(config)
+        gates.setdefault(config, threading.Event()).wait(5)
+        running.remove(config)
+        return {"status": "done", "exit_code": 0 if config != "bad" else 2,
+                "stdout": f"ran {config}\n" + "x" * 2000, "stderr": ""}
+
+    q = RunQueue(tmp_path / "runs.sqlite", execute, max_concurrent=2, keep=100)
+    q.gates, q.running = gates, running
+    monkeypatch.setattr(runner, "run_queue", q)
+    yield q
+    for gate in gates.values():
+        gate.set()
+
+
+def _wait(pred, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not pred():
+        assert time.monotonic() < deadline, "timeout"
+        time.sleep(0.01)
+
+
+def test_runs_are_queued_with_ids_and_bounded_concurrency(app, queue):
+    for name in ("a", "b", "c"):
+        queue.gates[name] = threading.Event()
+    ids = [_request(app, "POST", "/api/run", json={"config": c}).json()["id"] for c in ("a", "a", "b", "c")]
+    # İlk "a" hemen başladığı için ikinci "a" birleşmez, yeni run olarak kuyruğa girer
+    assert len(set(ids)) == 4 and ids == sorted(ids)
+
+    # En çok 2 run, aynı config için en çok 1
+    _wait(lambda: sorted(queue.running) == ["a", "b"])
+    assert _request(app, "GET", f"/api/run/{ids[1]}").json()["status"] == "queued"
+    dup = _request(app, "POST", "/api/run", json={"config": "a"}).json()
+    assert dup["id"] == ids[1] and dup["message"] == "Run already queued"
+
+    queue.gates["a"].set()
+    _wait(lambda: _request(app, "GET", f"/api/run/{ids[1]}").json()["status"] == "done")
+    queue.gates["b"].set()
+    queue.gates["c"].set()
+    _wait(lambda: queue.stats()["done"] == 4)
+
+    run = _request(app, "GET", f"/api/run/{ids[0]}").json()
+    assert run["exit_code"] == 0 and run["duration_sec"] >= 0 and run["stdout"].startswith("ran a")
+    history = _request(app, "GET", "/api/run", params={"limit": 3}).json()
+    assert [r["id"] for r in history] == [ids[3], ids[2], ids[1]]
+    assert len(history[0]["stdout"]) <= 501
+    assert _request(app, "GET", "/api/run/last").json()["id"] == ids[3]
+    assert _request(app, "GET", "/api/run/99999").status_code == 404
+
+
+def test_queue_survives_restart(app, queue, tmp_path):
+    from routers._run_queue import RunQueue
+
+    queue.gates["slow"] = threading.Event()
+    first = queue.submit("slow")
+    _wait(lambda: queue.running == ["slow"])
+    second = queue.submit("slow")
+    assert second["status"] == "queued" and second["position"] == 0
+
+    # Yeni süreç: yarım kalan run interrupted, kuyruktaki run başlatılır
+    done = []
+    fresh = RunQueue(queue.db_path, lambda c: done.append(c) or {"status": "done", "exit_code": 0}, 2)
+    fresh.start()
+    _wait(lambda: (fresh.get(second["id"]) or {}).get("status") == "done")
+    assert fresh.get(first["id"])["status"] == "interrupted"
+    assert done == ["slow"]
@@ -3,54 +3,7 @@ alarmfw-api smoke tests
 Gerçek DB/dosya olmadan ASGI transport üzerinden temel endpoint'leri kontrol eder.
 Çalıştır: cd alarmfw-api && .venv/bin/pytest tests/test_smoke.py -v
 """
-import os
-import sys
-import asyncio
-from pathlib import Path
-
-import httpx
-import pytest
-
-# alarmfw-api kök dizinini path'e ekle
-sys.path.insert(0, str(Path(__file__).parent.parent))
-
-# Env'i test için ayarla — gerçek dosyalara dokunmadan çalışsın
-@pytest.fixture(scope="session", autouse=True)
-def _tmp_dirs(tmp_path_factory):
-    tmp = tmp_path_factory.mktemp("alarmfw_test")
-    state = tmp / "state"
-    config = tmp / "config"
-    secrets = tmp / "secrets"
-    for d in (state, config, secrets, config / "generated", config / "policies",
-              config / "notifiers", tmp / "legacy" / "podhealthalarm" / "conf.d"):
-        d.mkdir(parents=True, exist_ok=True)
-
-    # Minimal observe.yaml
-    (config / "observe.yaml").write_text("clusters: []\n")
-    # Minimal maintenance.yaml
-    (config / "policies" / "maintenance.yaml").write_text("silences: []\n")
-
-    os.environ["ALARMFW_ROOT"]    = str(tmp)
-    os.environ["ALARMFW_CONFIG"]  = str(config)
-    os.environ["ALARMFW_STATE"]   = str(state)
-    os.environ["ALARMFW_SECRETS"] = str(secrets)
-    os.environ["ALARMFW_API_KEY"] = ""   # auth kapalı
-
-
-@pytest.fixture(scope="session")
-def app(_tmp_dirs):
-    from main import app
-    return app
-
-
-async def _request_async(app, method: str, path: str, **kwargs):
-    transport = httpx.ASGITransport(app=app)
-    async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
-        return await client.request(method, path, **kwargs)
-
-
-def _request(app, method: str, path: str, **kwargs):
-    return asyncio.run(_request_async(app, method, path, **kwargs))
+from conftest import _request
 
 
 def test_health(app):
@@ -127,3 +80,73 @@ def test_cluster_upsert_and_delete(app):
     r = _request(app, "GET", "/api/config/clusters")
     names = [c["name"] for c in r.json()]
     assert "smoke-cluster" not in names
+
+
+# ── Event loop — sync handler'lar executor'da çalışır, lag izleyicisi bloke edeni raporlar ──
+def test_sync_handlers_run_off_loop(app, monkeypatch):
+    import threading
+    from routers import checks
+
+    seen = []
+    monkeypatch.setattr(checks, "_check_files", lambda: seen.append(threading.current_thread().name) or [])
+    assert _request(app, "GET", "/api/checks").json() == []
+    assert seen and seen[0].startswith("alarmfw-api")
+
+
+def test_loop_lag_monitor_reports_blocking_frame():
+    import asyncio
+    import time
+    from loop_monitor import LoopLagMonitor
+
+    monitor = LoopLagMonitor(interval=0.02, threshold=0.05)
+
+    def _blocking_handler():
+        time.sleep(0.2)
+
+    async def scenario():
+        task = asyncio.create_task(monitor.run())
+        await asyncio.sleep(0.05)
+        _blocking_handler()
+        await asyncio.sleep(0.05)
+        task.cancel()
+
+    asyncio.run(scenario())
+    stats = monitor.stats()
+    assert stats["slow"] >= 1
+    assert stats["max_lag_ms"] >= 150
+    assert any("_blocking_handler" in frame for e in stats["recent"] for frame in e["culprit"])
+
+
+# ── Cevap sıkıştırma + hızlı JSON ─────────────────────────────────────────────
+def test_accept_encoding_negotiation():
+    from compression import negotiate
+
+    assert negotiate("gzip, deflate, br", ("br", "gzip")) == "br"
+    assert negotiate("br;q=0.5, gzip", ("br", "gzip")) == "gzip"
+    assert negotiate("br;q=0, *;q=0.1", ("br", "gzip")) == "gzip"
+    assert negotiate("identity", ("br", "gzip")) is None
+    assert negotiate("", ("gzip",)) is None
+
+
+def test_large_responses_are_compressed_small_ones_not(app, _tmp_dirs):
+    import json
+
+    f = _tmp_dirs / "config" / "generated" / "compress_probe.yaml"
+    f.write_text("checks:\n" + "".join(
+        f"  - name: chk{i}\n    type: ocp_pod_health\n    enabled: false\n    params: {{cluster: c{i}, namespace: ns}}\n"
+        for i in range(200)
+    ))
+    try:
+        r = _request(app, "GET", "/api/checks", headers={"Accept-Encoding": "gzip"})
+        assert r.headers["content-encoding"] == "gzip"
+        assert "Accept-Encoding" in r.headers["vary"]
+        assert len(r.json()) == 200                      # httpx gzip'i açar
+        assert int(r.headers["content-length"]) < len(json.dumps(r.json()))
+
+        r = _request(app, "GET", "/api/health", headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in r.headers
+
+        r = _request(app, "GET", "/api/checks", headers={"Accept-Encoding": "identity"})
+        assert "content-encoding" not in r.headers
+    finally:
+        f.unlink()